@@ -1,17 +1,24 @@
 from datetime import datetime, time
+import asyncio
+import json
 import os
+import re
 
 import requests
-from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi import APIRouter, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from app.errors import RestRateLimitCooldownError
 from app.schemas.order import OrderAccepted, OrderRequest
 from app.schemas.portfolio import Balance, Position
+from app.schemas.quote import QuoteSnapshot
 from app.schemas.risk import RiskCheckRequest
 from app.schemas.session import LiveReadinessResponse
 from app.services.order_queue import order_queue
 from app.services.quote_cache import quote_ingest_worker
+from app.services.quote_stream import quote_delta
 from app.services.risk_policy import (
     evaluate_trade_risk,
     get_available_sell_qty,
@@ -25,6 +32,9 @@ _TRADING_START = time(9, 0)
 _TRADING_END = time(15, 30)
 
 
+_STREAM_HEARTBEAT_SEC = 15.0
+_SYMBOL_PATTERN = re.compile(r'\d{6}')
+
 _ALLOWED_SIDES = {"BUY", "SELL"}
 _ALLOWED_ORDER_TYPES = {"LIMIT", "MARKET"}
 
@@ -96,6 +106,11 @@ def _validate_order_contract(req: OrderRequest) -> str | None:
     return None
 
 
+def _quote_response(row) -> dict:
+    # internal cache rows are plain slotted records; validate into the public schema only here
+    return QuoteSnapshot.model_validate(row, from_attributes=True).model_dump()
+
+
 @router.get('/session/status')
 def get_session_status():
     return session_orchestrator.status().model_dump()
@@ -142,13 +157,28 @@ def get_live_readiness():
     }
 
 @router.get('/quotes/{symbol}')
-def get_quote(symbol: str, request: Request):
+async def get_quote(symbol: str, request: Request):
     service = request.app.state.quote_gateway_service
     try:
-        row = service.get_quote(symbol)
+        if getattr(service, 'async_rest_client', None) is not None:
+            row = await service.get_quote_async(symbol)
+        else:
+            # sync REST client: keep the blocking round trip off the event loop
+            row = await run_in_threadpool(service.get_quote, symbol)
     except RestRateLimitCooldownError as exc:
         raise HTTPException(status_code=503, detail='REST_RATE_LIMIT_COOLDOWN') from exc
-    return row.model_dump()
+    return _quote_response(row)
+
+
+@router.get('/quotes/{symbol}/ticks')
+def get_quote_ticks(symbol: str, request: Request, since: int | None = None):
+    cache = request.app.state.quote_gateway_service.quote_cache
+    if getattr(cache, 'tick_history', None) is None:
+        raise HTTPException(status_code=503, detail='TICK_HISTORY_NOT_CONFIGURED')
+    ticks = cache.ticks(symbol, since)
+    if ticks is None:
+        raise HTTPException(status_code=404, detail='symbol not found')
+    return {'symbol': symbol, 'depth': cache.tick_history.depth, 'ticks': ticks}
 
 
 @router.get('/quotes')
@@ -156,7 +186,7 @@ def get_quotes(symbols: str, request: Request):
     service = request.app.state.quote_gateway_service
     req = [s.strip() for s in symbols.split(',') if s.strip()]
     out, meta = service.get_quotes(req)
-    rows = [row.model_dump() for row in out]
+    rows = [_quote_response(row) for row in out]
     if meta.missing_count > 0:
         return {
             'quotes': rows,
@@ -171,6 +201,120 @@ def get_quotes(symbols: str, request: Request):
     return rows
 
 
+def _parse_stream_symbols(symbols: str | None) -> list[str] | None:
+    # omitted or '*' streams every symbol the gateway ingests
+    if symbols is None or symbols.strip() == '*':
+        return None
+    return [s.strip() for s in symbols.split(',') if s.strip()]
+
+
+def _stream_snapshot(cache, symbols: list[str] | None) -> list[dict]:
+    rows = cache.list_all() if symbols is None else cache.list_many(symbols)
+    return [quote_delta(row) for row in rows]
+
+
+@router.websocket('/stream/quotes')
+async def stream_quotes(websocket: WebSocket, symbols: str | None = None):
+    hub = websocket.app.state.quote_stream_hub
+    cache = websocket.app.state.quote_gateway_service.quote_cache
+    requested = _parse_stream_symbols(symbols)
+    await websocket.accept()
+    sub = hub.subscribe(requested)
+
+    async def _receive_controls() -> None:
+        # {"action": "subscribe"|"unsubscribe", "symbols": [...]} adjusts the filter in place
+        while True:
+            msg = await websocket.receive_json()
+            if sub.symbols is None:
+                continue  # already streaming every symbol
+            wanted = set(sub.symbols)
+            changed = {str(s) for s in msg.get('symbols', [])}
+            if msg.get('action') == 'subscribe':
+                sub.set_symbols(wanted | changed)
+            elif msg.get('action') == 'unsubscribe':
+                sub.set_symbols(wanted - changed)
+
+    receiver = asyncio.create_task(_receive_controls())
+    try:
+        await websocket.send_json({'type': 'snapshot', 'quotes': _stream_snapshot(cache, requested)})
+        while not receiver.done():
+            batch_task = asyncio.create_task(sub.next_batch(timeout=_STREAM_HEARTBEAT_SEC))
+            await asyncio.wait({batch_task, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if not batch_task.done():
+                batch_task.cancel()
+                break
+            batch = batch_task.result()
+            if batch:
+                await websocket.send_json({'type': 'quotes', 'quotes': batch})
+            else:
+                await websocket.send_json({'type': 'heartbeat'})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(sub)
+        receiver.cancel()
+        try:
+            await receiver
+        except (asyncio.CancelledError, Exception):
+            # disconnects and malformed control frames both end the stream
+            pass
+
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@router.get('/stream/quotes/sse')
+async def stream_quotes_sse(request: Request, symbols: str | None = None):
+    hub = request.app.state.quote_stream_hub
+    cache = request.app.state.quote_gateway_service.quote_cache
+    requested = _parse_stream_symbols(symbols)
+
+    async def _events():
+        sub = hub.subscribe(requested)
+        try:
+            yield _sse_event('snapshot', _stream_snapshot(cache, requested))
+            while not await request.is_disconnected():
+                batch = await sub.next_batch(timeout=_STREAM_HEARTBEAT_SEC)
+                yield _sse_event('quotes', batch) if batch else ': heartbeat\n\n'
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(_events(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+def _subscription_client(request: Request):
+    ws_client = getattr(request.app.state, 'ws_client', None)
+    if ws_client is None or not hasattr(ws_client, 'subscribe'):
+        raise HTTPException(status_code=503, detail='WS_CLIENT_NOT_CONFIGURED')
+    return ws_client
+
+
+@router.get('/subscriptions')
+def list_subscriptions(request: Request):
+    ws_client = _subscription_client(request)
+    return {'symbols': ws_client.active_symbols()}
+
+
+@router.post('/subscriptions/{symbol}')
+def add_subscription(symbol: str, request: Request):
+    ws_client = _subscription_client(request)
+    if not _SYMBOL_PATTERN.fullmatch(symbol):
+        raise HTTPException(status_code=400, detail='INVALID_SYMBOL')
+    # already-active symbols are not re-registered; sent=False tells the caller nothing went out
+    sent = False if symbol in ws_client.active_symbols() else ws_client.subscribe(symbol)
+    return {'symbol': symbol, 'active': True, 'sent': sent, 'active_count': len(ws_client.active_symbols())}
+
+
+@router.delete('/subscriptions/{symbol}')
+def remove_subscription(symbol: str, request: Request):
+    ws_client = _subscription_client(request)
+    if symbol not in ws_client.active_symbols():
+        raise HTTPException(status_code=404, detail='subscription not found')
+    sent = ws_client.unsubscribe(symbol)
+    return {'symbol': symbol, 'active': False, 'sent': sent, 'active_count': len(ws_client.active_symbols())}
+
+
 @router.post('/risk/check')
 def check_risk(req: RiskCheckRequest, request: Request):
     if req.qty < 1:
@@ -241,9 +385,46 @@ def create_order(req: OrderRequest, request: Request, idempotency_key: str | Non
         raise
 
 
+@router.get('/orders')
+def list_orders(
+    status: str | None = None,
+    account_id: str | None = None,
+    symbol: str | None = None,
+    updated_since: int | None = None,
+    limit: int = 100,
+):
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail='INVALID_LIMIT')
+
+    jobs = order_queue.list_jobs(
+        status=status.upper() if status else None,
+        account_id=account_id,
+        symbol=symbol,
+        updated_since=updated_since,
+        limit=limit,
+    )
+    return [
+        {
+            'order_id': job['order_id'],
+            'account_id': job['request'].get('account_id'),
+            'symbol': job['request'].get('symbol'),
+            'side': job['request'].get('side'),
+            'qty': job['request'].get('qty'),
+            'price': job['request'].get('price'),
+            'status': job['status'],
+            'error': job['error'],
+            'broker_order_id': job.get('broker_order_id'),
+            'created_at': job.get('created_at'),
+            'updated_at': job['updated_at'],
+            'terminal': job.get('terminal', False),
+        }
+        for job in jobs
+    ]
+
+
 @router.get('/orders/{order_id}')
 def get_order_status(order_id: str):
-    job = order_queue.jobs.get(order_id)
+    job = order_queue.get_job(order_id)
     if not job:
         raise HTTPException(status_code=404, detail='order not found')
 
@@ -261,7 +442,7 @@ def get_order_status(order_id: str):
 
 @router.get('/orders/{order_id}/state')
 def get_order_state(order_id: str):
-    job = order_queue.jobs.get(order_id)
+    job = order_queue.get_job(order_id)
     if not job:
         raise HTTPException(status_code=404, detail='order not found')
 
@@ -272,13 +453,14 @@ def get_order_state(order_id: str):
         'updated_at': job['updated_at'],
         'attempts': job.get('attempts', 0),
         'max_attempts': job.get('max_attempts', 0),
+        'next_attempt_at': job.get('next_attempt_at'),
         'terminal': job.get('terminal', False),
     }
 
 
 @router.post('/orders/{order_id}/cancel', response_model=OrderAccepted)
 def cancel_order(order_id: str):
-    job = order_queue.jobs.get(order_id)
+    job = order_queue.get_job(order_id)
     if not job:
         raise HTTPException(status_code=404, detail='order not found')
 
@@ -306,7 +488,7 @@ def modify_order(order_id: str, req: OrderModifyRequest):
     if req.qty < 1:
         raise HTTPException(status_code=400, detail='INVALID_QTY')
 
-    job = order_queue.jobs.get(order_id)
+    job = order_queue.get_job(order_id)
     if not job:
         raise HTTPException(status_code=404, detail='order not found')
 
@@ -340,31 +522,61 @@ def _map_portfolio_provider_call(callable_fn):
         raise HTTPException(status_code=503, detail='PORTFOLIO_PROVIDER_UNAVAILABLE') from exc
 
 
+async def _call_portfolio_provider(request: Request, method_name: str, account_id: str):
+    service = request.app.state.quote_gateway_service
+    async_client = getattr(service, 'async_rest_client', None)
+    if async_client is not None:
+        try:
+            return await getattr(async_client, method_name)(account_id)
+        except (requests.exceptions.RequestException, RuntimeError) as exc:
+            raise HTTPException(status_code=503, detail='PORTFOLIO_PROVIDER_UNAVAILABLE') from exc
+
+    rest_client = service.rest_client
+    if not hasattr(rest_client, method_name):
+        raise HTTPException(status_code=503, detail='PORTFOLIO_PROVIDER_NOT_CONFIGURED')
+    method = getattr(rest_client, method_name)
+    return await run_in_threadpool(_map_portfolio_provider_call, lambda: method(account_id))
+
+
 @router.get('/balances', response_model=list[Balance])
-def get_balances(account_id: str, request: Request):
+async def get_balances(account_id: str, request: Request):
     if request is None:
         return None
-    rest_client = request.app.state.quote_gateway_service.rest_client
-    if not hasattr(rest_client, 'get_balances'):
-        raise HTTPException(status_code=503, detail='PORTFOLIO_PROVIDER_NOT_CONFIGURED')
-    return _map_portfolio_provider_call(lambda: rest_client.get_balances(account_id))
+    return await _call_portfolio_provider(request, 'get_balances', account_id)
 
 
 @router.get('/positions', response_model=list[Position])
-def get_positions(account_id: str, request: Request):
+async def get_positions(account_id: str, request: Request):
     if request is None:
         return None
-    rest_client = request.app.state.quote_gateway_service.rest_client
-    if not hasattr(rest_client, 'get_positions'):
-        raise HTTPException(status_code=503, detail='PORTFOLIO_PROVIDER_NOT_CONFIGURED')
-    return _map_portfolio_provider_call(lambda: rest_client.get_positions(account_id))
+    return await _call_portfolio_provider(request, 'get_positions', account_id)
 
 
 @router.get('/metrics/quote')
 def quote_metrics(request: Request):
     metrics = quote_ingest_worker.metrics()
+    ws_client = getattr(request.app.state, 'ws_client', None)
+    if hasattr(ws_client, 'metrics'):
+        metrics.update(ws_client.metrics())
     service = request.app.state.quote_gateway_service
     metrics.update(service.metrics())
+    if hasattr(service.quote_cache, 'metrics'):
+        metrics.update(service.quote_cache.metrics())
+    rate_limiter = getattr(service.rest_client, 'rate_limiter', None)
+    if rate_limiter is not None:
+        metrics.update(rate_limiter.metrics())
+    http_session = getattr(service.rest_client, 'session', None)
+    if hasattr(http_session, 'metrics'):
+        metrics.update(http_session.metrics())
+    token_manager = getattr(service.rest_client, 'token_manager', None)
+    if token_manager is not None:
+        metrics.update(token_manager.metrics())
+    hub = getattr(request.app.state, 'quote_stream_hub', None)
+    if hub is not None:
+        metrics.update(hub.metrics())
+    bus = getattr(request.app.state, 'quote_bus', None)
+    if bus is not None:
+        metrics.update(bus.metrics())
     return metrics
 
 
@@ -0,0 +1,59 @@
+"""Standalone KIS quote ingest process for multi-worker deployments.
+
+Run once per host next to ``uvicorn --workers N``, both with ``QUOTE_CACHE_MODE=shm``:
+
+    QUOTE_SHM_ROLE=writer python -m app.ingest
+    QUOTE_SHM_ROLE=reader uvicorn app.main:app --workers 4
+
+This process owns the single KIS websocket session and writes every tick into the shared
+quote table; API workers only read it. It runs only the quote side of the app lifespan
+(WS client, shards, token cache and the quote bus); orders and reconciliation belong to the
+API workers and are never started here.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+from contextlib import asynccontextmanager
+
+# importing app.main builds the order queue singleton; keep it in memory so this process
+# never opens (and locks) the API workers' ORDER_WAL_DIR or ORDER_STORE_PATH
+os.environ['ORDER_WAL_DIR'] = ''
+os.environ['ORDER_STORE'] = 'memory'
+
+from fastapi import FastAPI  # noqa: E402
+
+from app.main import app, start_quote_runtime, stop_quote_runtime  # noqa: E402
+from app.services.quote_cache import quote_cache  # noqa: E402
+
+
+@asynccontextmanager
+async def ingest_lifespan(app: FastAPI):
+    runtime = start_quote_runtime(app)
+    try:
+        yield
+    finally:
+        await stop_quote_runtime(app, runtime)
+
+
+async def _run() -> None:
+    if getattr(quote_cache, 'role', None) != 'writer':
+        raise SystemExit('app.ingest requires QUOTE_CACHE_MODE=shm and QUOTE_SHM_ROLE=writer')
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    async with ingest_lifespan(app):
+        print(f"[INGEST][start] path={quote_cache.path} pid={os.getpid()}", flush=True)
+        await stop_event.wait()
+    print("[INGEST][stop]", flush=True)
+
+
+def main() -> None:
+    asyncio.run(_run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PooledSession(requests.Session):
+    """Keep-alive ``requests.Session`` sized for the KIS REST host.
+
+    Connections are pooled per host (``pool_maxsize`` sockets kept open, blocking callers
+    are never refused because ``pool_block`` is off). Only connection-establishment failures
+    are retried here: the request never left the process, so this is safe for order POSTs;
+    read/status retries stay with the callers (``QuoteGatewayService`` backoff, order retry
+    policy) so nothing is sent twice.
+    """
+
+    def __init__(
+        self,
+        *,
+        pool_connections: int = 2,
+        pool_maxsize: int = 16,
+        connect_retries: int = 2,
+        backoff_factor: float = 0.1,
+    ) -> None:
+        super().__init__()
+        retry = Retry(
+            total=connect_retries,
+            connect=connect_retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=backoff_factor,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.pool_maxsize = pool_maxsize
+
+    def _pools(self) -> list[Any]:
+        seen: set[int] = set()
+        pools = []
+        for adapter in self.adapters.values():
+            if id(adapter) in seen or not isinstance(adapter, HTTPAdapter):
+                continue
+            seen.add(id(adapter))
+            container = adapter.poolmanager.pools
+            # RecentlyUsedContainer only supports snapshotting keys under its lock
+            pools.extend(pool for pool in (container.get(key) for key in container.keys()) if pool is not None)
+        return pools
+
+    def metrics(self) -> Dict[str, Any]:
+        requests_sent = 0
+        connections_opened = 0
+        for pool in self._pools():
+            requests_sent += pool.num_requests
+            connections_opened += pool.num_connections
+        reused = max(0, requests_sent - connections_opened)
+        return {
+            "http_pool_maxsize": self.pool_maxsize,
+            "http_pool_requests": requests_sent,
+            "http_pool_connections_opened": connections_opened,
+            "http_pool_connections_reused": reused,
+            "http_pool_reuse_ratio": round(reused / requests_sent, 3) if requests_sent else None,
+        }
@@ -3,11 +3,19 @@ from __future__ import annotations
 import time
 from typing import Any, Dict, Optional
 
-import requests
+from app.integrations.http_session import PooledSession
+from app.integrations.rate_limiter import PRIORITY_ACCOUNT, PRIORITY_ORDER, PRIORITY_QUOTE, RestRateLimiter
+
+# (http method, url, keyword arguments for the HTTP client)
+KisRequest = tuple[str, str, Dict[str, Any]]
 
 
 class KisRestClient:
-    """Minimal KIS REST quote client with token issuance and quote retrieval."""
+    """Minimal KIS REST quote client with token issuance and quote retrieval.
+
+    Each call is split into a ``_*_request`` builder and a ``_parse_*`` step so the
+    transport can be swapped (see ``AsyncKisRestClient``) without duplicating the KIS contract.
+    """
 
     _BASE_URLS = {
         "mock": "https://openapivts.koreainvestment.com:29443",
@@ -31,6 +39,9 @@ class KisRestClient:
         env: str = "mock",
         session: Optional[Any] = None,
         base_url: Optional[str] = None,
+        rate_limiter: Optional[RestRateLimiter] = None,
+        token_manager: Optional[Any] = None,
+        approval_key_slot: str = "default",
     ) -> None:
         if env not in self._BASE_URLS and base_url is None:
             raise ValueError("env must be one of: mock, live")
@@ -39,24 +50,42 @@ class KisRestClient:
         self.app_secret = app_secret
         self.env = env
         self.base_url = base_url or self._BASE_URLS[env]
-        self.session = session or requests
+        # keep-alive pool; pass one PooledSession to several clients to share its sockets
+        self.session = session if session is not None else self._default_session()
         self._access_token: Optional[str] = None
         self._token_expires_at: float = 0.0
+        # shared token bucket for the per-second API quota; token/approval issuance is not paced
+        self.rate_limiter = rate_limiter
+        # optional KisTokenManager: one token (and persisted approval keys) for every client
+        self.token_manager = token_manager
+        self.approval_key_slot = approval_key_slot
+
+    def _default_session(self) -> Any:
+        return PooledSession()
+
+    def _send(self, request: KisRequest) -> Dict[str, Any]:
+        method, url, kwargs = request
+        sender = self.session.get if method == "GET" else self.session.post
+        response = sender(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
 
-    def _issue_token(self) -> str:
-        response = self.session.post(
+    def _token_request(self) -> KisRequest:
+        return (
+            "POST",
             f"{self.base_url}/oauth2/tokenP",
-            headers={"content-type": "application/json; charset=utf-8"},
-            json={
-                "grant_type": "client_credentials",
-                "appkey": self.app_key,
-                "appsecret": self.app_secret,
+            {
+                "headers": {"content-type": "application/json; charset=utf-8"},
+                "json": {
+                    "grant_type": "client_credentials",
+                    "appkey": self.app_key,
+                    "appsecret": self.app_secret,
+                },
+                "timeout": 5,
             },
-            timeout=5,
         )
-        response.raise_for_status()
-        payload = response.json()
 
+    def _store_token(self, payload: Dict[str, Any]) -> str:
         token = payload["access_token"]
         expires_in = int(payload.get("expires_in", 3600))
         self._access_token = token
@@ -67,31 +96,50 @@ class KisRestClient:
         self._token_expires_at = issued_at + refresh_ttl
         return token
 
+    def _issue_token(self) -> str:
+        return self._store_token(self._send(self._token_request()))
 
-    def issue_approval_key(self) -> str:
-        response = self.session.post(
+    def _approval_request(self) -> KisRequest:
+        return (
+            "POST",
             f"{self.base_url}/oauth2/Approval",
-            headers={"content-type": "application/json; charset=utf-8"},
-            json={
-                "grant_type": "client_credentials",
-                "appkey": self.app_key,
-                "secretkey": self.app_secret,
+            {
+                "headers": {"content-type": "application/json; charset=utf-8"},
+                "json": {
+                    "grant_type": "client_credentials",
+                    "appkey": self.app_key,
+                    "secretkey": self.app_secret,
+                },
+                "timeout": 5,
             },
-            timeout=5,
         )
-        response.raise_for_status()
-        payload = response.json()
 
+    @staticmethod
+    def _parse_approval_key(payload: Dict[str, Any]) -> str:
         approval_key = payload.get("approval_key")
         if not approval_key:
             raise ValueError("missing approval_key in response")
         return str(approval_key)
 
+    def issue_approval_key(self) -> str:
+        if self.token_manager is not None:
+            return self.token_manager.get_approval_key(self.approval_key_slot)
+        return self._parse_approval_key(self._send(self._approval_request()))
+
+    def _token_is_valid(self) -> bool:
+        return bool(self._access_token) and time.time() < self._token_expires_at
+
     def get_access_token(self) -> str:
-        if self._access_token and time.time() < self._token_expires_at:
+        if self.token_manager is not None:
+            return self.token_manager.get_access_token()
+        if self._token_is_valid():
             return self._access_token
         return self._issue_token()
 
+    def _throttle(self, priority: str) -> None:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(priority)
+
     @staticmethod
     def _to_float(value: Any, default: float = 0.0) -> float:
         try:
@@ -122,24 +170,29 @@ class KisRestClient:
             raise RuntimeError("AUTH")
         raise RuntimeError("INVALID_ORDER")
 
-    def get_quote(self, symbol: str) -> Dict[str, Any]:
-        token = self.get_access_token()
+    def _auth_headers(self, token: str, tr_id: str) -> Dict[str, str]:
+        return {
+            "authorization": f"Bearer {token}",
+            "appkey": self.app_key,
+            "appsecret": self.app_secret,
+            "tr_id": tr_id,
+        }
+
+    # -- quotes -----------------------------------------------------------------------------
 
-        response = self.session.get(
+    def _quote_request(self, token: str, symbol: str) -> KisRequest:
+        return (
+            "GET",
             f"{self.base_url}/uapi/domestic-stock/v1/quotations/inquire-price",
-            headers={
-                "authorization": f"Bearer {token}",
-                "appkey": self.app_key,
-                "appsecret": self.app_secret,
-                "tr_id": "FHKST01010100",
+            {
+                "headers": self._auth_headers(token, "FHKST01010100"),
+                "params": {"fid_cond_mrkt_div_code": "J", "fid_input_iscd": symbol},
+                "timeout": 5,
             },
-            params={"fid_cond_mrkt_div_code": "J", "fid_input_iscd": symbol},
-            timeout=5,
         )
-        response.raise_for_status()
-        payload = response.json()
-        output = payload.get("output", {})
 
+    def _parse_quote(self, symbol: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        output = payload.get("output", {})
         return {
             "symbol": symbol,
             "price": self._to_float(output.get("stck_prpr")),
@@ -149,43 +202,49 @@ class KisRestClient:
             "ts": int(time.time()),
         }
 
-    def place_order(
+    def get_quote(self, symbol: str) -> Dict[str, Any]:
+        token = self.get_access_token()
+        self._throttle(PRIORITY_QUOTE)
+        return self._parse_quote(symbol, self._send(self._quote_request(token, symbol)))
+
+    # -- orders -----------------------------------------------------------------------------
+
+    def _place_order_request(
         self,
+        token: str,
         account_id: str,
         symbol: str,
         side: str,
         qty: int,
         price: float | None,
-        order_type: str = "LIMIT",
-    ) -> Dict[str, Any]:
+        order_type: str,
+    ) -> KisRequest:
         side = side.upper()
         order_type = order_type.upper()
         cano, acnt_prdt_cd = self._split_account(account_id)
-        token = self.get_access_token()
-
-        response = self.session.post(
+        return (
+            "POST",
             f"{self.base_url}/uapi/domestic-stock/v1/trading/order-cash",
-            headers={
-                "authorization": f"Bearer {token}",
-                "appkey": self.app_key,
-                "appsecret": self.app_secret,
-                "tr_id": self._ORDER_TR_ID[self.env][side],
-                "custtype": "P",
-                "content-type": "application/json; charset=utf-8",
-            },
-            json={
-                "CANO": cano,
-                "ACNT_PRDT_CD": acnt_prdt_cd,
-                "PDNO": symbol,
-                "ORD_DVSN": self._KIS_ORDER_TYPE.get(order_type, "00"),
-                "ORD_QTY": str(qty),
-                "ORD_UNPR": "0" if price is None else str(int(price)),
-                "SLL_BUY_DVSN_CD": self._KIS_SIDE[side],
+            {
+                "headers": {
+                    **self._auth_headers(token, self._ORDER_TR_ID[self.env][side]),
+                    "custtype": "P",
+                    "content-type": "application/json; charset=utf-8",
+                },
+                "json": {
+                    "CANO": cano,
+                    "ACNT_PRDT_CD": acnt_prdt_cd,
+                    "PDNO": symbol,
+                    "ORD_DVSN": self._KIS_ORDER_TYPE.get(order_type, "00"),
+                    "ORD_QTY": str(qty),
+                    "ORD_UNPR": "0" if price is None else str(int(price)),
+                    "SLL_BUY_DVSN_CD": self._KIS_SIDE[side],
+                },
+                "timeout": 5,
             },
-            timeout=5,
         )
-        response.raise_for_status()
-        payload = response.json()
+
+    def _parse_place_order(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         self._raise_if_kis_error(payload)
         output = payload.get("output", {})
 
@@ -196,28 +255,40 @@ class KisRestClient:
             "raw": payload,
         }
 
-    def get_order_status(self, account_id: str, broker_order_id: str) -> Dict[str, Any]:
-        cano, acnt_prdt_cd = self._split_account(account_id)
+    def place_order(
+        self,
+        account_id: str,
+        symbol: str,
+        side: str,
+        qty: int,
+        price: float | None,
+        order_type: str = "LIMIT",
+    ) -> Dict[str, Any]:
         token = self.get_access_token()
+        self._throttle(PRIORITY_ORDER)
+        request = self._place_order_request(token, account_id, symbol, side, qty, price, order_type)
+        return self._parse_place_order(self._send(request))
 
-        response = self.session.get(
+    def _order_status_request(self, token: str, account_id: str, broker_order_id: str) -> KisRequest:
+        cano, acnt_prdt_cd = self._split_account(account_id)
+        return (
+            "GET",
             f"{self.base_url}/uapi/domestic-stock/v1/trading/inquire-daily-ccld",
-            headers={
-                "authorization": f"Bearer {token}",
-                "appkey": self.app_key,
-                "appsecret": self.app_secret,
-                "tr_id": "VTTC8001R" if self.env == "mock" else "TTTC8001R",
-                "custtype": "P",
-            },
-            params={
-                "CANO": cano,
-                "ACNT_PRDT_CD": acnt_prdt_cd,
-                "ODNO": broker_order_id,
+            {
+                "headers": {
+                    **self._auth_headers(token, "VTTC8001R" if self.env == "mock" else "TTTC8001R"),
+                    "custtype": "P",
+                },
+                "params": {
+                    "CANO": cano,
+                    "ACNT_PRDT_CD": acnt_prdt_cd,
+                    "ODNO": broker_order_id,
+                },
+                "timeout": 5,
             },
-            timeout=5,
         )
-        response.raise_for_status()
-        payload = response.json()
+
+    def _parse_order_status(self, broker_order_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         self._raise_if_kis_error(payload)
 
         output = payload.get("output1", [])
@@ -228,94 +299,105 @@ class KisRestClient:
             "raw": payload,
         }
 
-
-    def cancel_order(self, account_id: str, broker_order_id: str) -> Dict[str, Any]:
-        cano, acnt_prdt_cd = self._split_account(account_id)
+    def get_order_status(self, account_id: str, broker_order_id: str) -> Dict[str, Any]:
         token = self.get_access_token()
+        self._throttle(PRIORITY_ACCOUNT)
+        request = self._order_status_request(token, account_id, broker_order_id)
+        return self._parse_order_status(broker_order_id, self._send(request))
 
-        response = self.session.post(
+    def _revise_cancel_request(
+        self, token: str, tr_id: str, account_id: str, broker_order_id: str, body: Dict[str, str]
+    ) -> KisRequest:
+        cano, acnt_prdt_cd = self._split_account(account_id)
+        return (
+            "POST",
             f"{self.base_url}/uapi/domestic-stock/v1/trading/order-rvsecncl",
-            headers={
-                "authorization": f"Bearer {token}",
-                "appkey": self.app_key,
-                "appsecret": self.app_secret,
-                "tr_id": self._ORDER_CANCEL_TR_ID[self.env],
-                "custtype": "P",
-                "content-type": "application/json; charset=utf-8",
-            },
-            json={
-                "CANO": cano,
-                "ACNT_PRDT_CD": acnt_prdt_cd,
-                "KRX_FWDG_ORD_ORGNO": "",
-                "ORGN_ODNO": broker_order_id,
-                "RVSE_CNCL_DVSN_CD": "02",
-                "ORD_QTY": "0",
-                "ORD_UNPR": "0",
+            {
+                "headers": {
+                    **self._auth_headers(token, tr_id),
+                    "custtype": "P",
+                    "content-type": "application/json; charset=utf-8",
+                },
+                "json": {
+                    "CANO": cano,
+                    "ACNT_PRDT_CD": acnt_prdt_cd,
+                    "KRX_FWDG_ORD_ORGNO": "",
+                    "ORGN_ODNO": broker_order_id,
+                    **body,
+                },
+                "timeout": 5,
             },
-            timeout=5,
         )
-        response.raise_for_status()
-        payload = response.json()
+
+    def _cancel_order_request(self, token: str, account_id: str, broker_order_id: str) -> KisRequest:
+        return self._revise_cancel_request(
+            token,
+            self._ORDER_CANCEL_TR_ID[self.env],
+            account_id,
+            broker_order_id,
+            {"RVSE_CNCL_DVSN_CD": "02", "ORD_QTY": "0", "ORD_UNPR": "0"},
+        )
+
+    def _parse_cancel_order(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         self._raise_if_kis_error(payload)
         return {"status": "CANCEL_PENDING", "raw": payload}
 
-    def modify_order(self, account_id: str, broker_order_id: str, qty: int, price: float | None) -> Dict[str, Any]:
-        cano, acnt_prdt_cd = self._split_account(account_id)
+    def cancel_order(self, account_id: str, broker_order_id: str) -> Dict[str, Any]:
         token = self.get_access_token()
-
-        response = self.session.post(
-            f"{self.base_url}/uapi/domestic-stock/v1/trading/order-rvsecncl",
-            headers={
-                "authorization": f"Bearer {token}",
-                "appkey": self.app_key,
-                "appsecret": self.app_secret,
-                "tr_id": self._ORDER_MODIFY_TR_ID[self.env],
-                "custtype": "P",
-                "content-type": "application/json; charset=utf-8",
-            },
-            json={
-                "CANO": cano,
-                "ACNT_PRDT_CD": acnt_prdt_cd,
-                "KRX_FWDG_ORD_ORGNO": "",
-                "ORGN_ODNO": broker_order_id,
+        self._throttle(PRIORITY_ORDER)
+        return self._parse_cancel_order(self._send(self._cancel_order_request(token, account_id, broker_order_id)))
+
+    def _modify_order_request(
+        self, token: str, account_id: str, broker_order_id: str, qty: int, price: float | None
+    ) -> KisRequest:
+        return self._revise_cancel_request(
+            token,
+            self._ORDER_MODIFY_TR_ID[self.env],
+            account_id,
+            broker_order_id,
+            {
                 "RVSE_CNCL_DVSN_CD": "01",
                 "ORD_QTY": str(qty),
                 "ORD_UNPR": "0" if price is None else str(int(price)),
             },
-            timeout=5,
         )
-        response.raise_for_status()
-        payload = response.json()
+
+    def _parse_modify_order(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         self._raise_if_kis_error(payload)
         return {"status": "MODIFY_PENDING", "raw": payload}
 
-
-    def get_balances(self, account_id: str) -> list[Dict[str, Any]]:
-        cano, acnt_prdt_cd = self._split_account(account_id)
+    def modify_order(self, account_id: str, broker_order_id: str, qty: int, price: float | None) -> Dict[str, Any]:
         token = self.get_access_token()
+        self._throttle(PRIORITY_ORDER)
+        request = self._modify_order_request(token, account_id, broker_order_id, qty, price)
+        return self._parse_modify_order(self._send(request))
+
+    # -- portfolio --------------------------------------------------------------------------
 
-        response = self.session.get(
+    def _balances_request(self, token: str, account_id: str) -> KisRequest:
+        cano, acnt_prdt_cd = self._split_account(account_id)
+        return (
+            "GET",
             f"{self.base_url}/uapi/domestic-stock/v1/trading/inquire-psbl-order",
-            headers={
-                "authorization": f"Bearer {token}",
-                "appkey": self.app_key,
-                "appsecret": self.app_secret,
-                "tr_id": "VTTC8908R" if self.env == "mock" else "TTTC8908R",
-                "custtype": "P",
-            },
-            params={
-                "CANO": cano,
-                "ACNT_PRDT_CD": acnt_prdt_cd,
-                "PDNO": "005930",
-                "ORD_UNPR": "0",
-                "ORD_DVSN": "01",
-                "CMA_EVLU_AMT_ICLD_YN": "N",
-                "OVRS_ICLD_YN": "N",
+            {
+                "headers": {
+                    **self._auth_headers(token, "VTTC8908R" if self.env == "mock" else "TTTC8908R"),
+                    "custtype": "P",
+                },
+                "params": {
+                    "CANO": cano,
+                    "ACNT_PRDT_CD": acnt_prdt_cd,
+                    "PDNO": "005930",
+                    "ORD_UNPR": "0",
+                    "ORD_DVSN": "01",
+                    "CMA_EVLU_AMT_ICLD_YN": "N",
+                    "OVRS_ICLD_YN": "N",
+                },
+                "timeout": 5,
             },
-            timeout=5,
         )
-        response.raise_for_status()
-        payload = response.json()
+
+    def _parse_balances(self, account_id: str, payload: Dict[str, Any]) -> list[Dict[str, Any]]:
         self._raise_if_kis_error(payload)
         output = payload.get("output", {})
 
@@ -327,36 +409,39 @@ class KisRestClient:
             }
         ]
 
-    def get_positions(self, account_id: str) -> list[Dict[str, Any]]:
-        cano, acnt_prdt_cd = self._split_account(account_id)
+    def get_balances(self, account_id: str) -> list[Dict[str, Any]]:
         token = self.get_access_token()
+        self._throttle(PRIORITY_ACCOUNT)
+        return self._parse_balances(account_id, self._send(self._balances_request(token, account_id)))
 
-        response = self.session.get(
+    def _positions_request(self, token: str, account_id: str) -> KisRequest:
+        cano, acnt_prdt_cd = self._split_account(account_id)
+        return (
+            "GET",
             f"{self.base_url}/uapi/domestic-stock/v1/trading/inquire-balance",
-            headers={
-                "authorization": f"Bearer {token}",
-                "appkey": self.app_key,
-                "appsecret": self.app_secret,
-                "tr_id": "VTTC8434R" if self.env == "mock" else "TTTC8434R",
-                "custtype": "P",
-            },
-            params={
-                "CANO": cano,
-                "ACNT_PRDT_CD": acnt_prdt_cd,
-                "AFHR_FLPR_YN": "N",
-                "OFL_YN": "",
-                "INQR_DVSN": "02",
-                "UNPR_DVSN": "01",
-                "FUND_STTL_ICLD_YN": "N",
-                "FNCG_AMT_AUTO_RDPT_YN": "N",
-                "PRCS_DVSN": "01",
-                "CTX_AREA_FK100": "",
-                "CTX_AREA_NK100": "",
+            {
+                "headers": {
+                    **self._auth_headers(token, "VTTC8434R" if self.env == "mock" else "TTTC8434R"),
+                    "custtype": "P",
+                },
+                "params": {
+                    "CANO": cano,
+                    "ACNT_PRDT_CD": acnt_prdt_cd,
+                    "AFHR_FLPR_YN": "N",
+                    "OFL_YN": "",
+                    "INQR_DVSN": "02",
+                    "UNPR_DVSN": "01",
+                    "FUND_STTL_ICLD_YN": "N",
+                    "FNCG_AMT_AUTO_RDPT_YN": "N",
+                    "PRCS_DVSN": "01",
+                    "CTX_AREA_FK100": "",
+                    "CTX_AREA_NK100": "",
+                },
+                "timeout": 5,
             },
-            timeout=5,
         )
-        response.raise_for_status()
-        payload = response.json()
+
+    def _parse_positions(self, account_id: str, payload: Dict[str, Any]) -> list[Dict[str, Any]]:
         self._raise_if_kis_error(payload)
 
         positions = []
@@ -378,3 +463,8 @@ class KisRestClient:
             )
 
         return positions
+
+    def get_positions(self, account_id: str) -> list[Dict[str, Any]]:
+        token = self.get_access_token()
+        self._throttle(PRIORITY_ACCOUNT)
+        return self._parse_positions(account_id, self._send(self._positions_request(token, account_id)))
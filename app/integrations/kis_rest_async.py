@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Optional
+
+import requests
+
+from app.integrations.kis_rest import KisRequest, KisRestClient
+from app.integrations.rate_limiter import PRIORITY_ACCOUNT, PRIORITY_ORDER, PRIORITY_QUOTE, RestRateLimiter
+
+try:  # optional dependency: pip install -e .[asyncrest]
+    import httpx
+except ImportError:  # pragma: no cover - exercised only without httpx installed
+    httpx = None
+
+
+class KisHttpError(requests.exceptions.RequestException):
+    """httpx failure surfaced as a ``requests`` exception.
+
+    Route error mapping (``PORTFOLIO_PROVIDER_UNAVAILABLE``) and the gateway's 429 cooldown
+    read ``requests`` exceptions and ``exc.response.status_code``; both keep working unchanged.
+    """
+
+
+class AsyncKisRestClient(KisRestClient):
+    """``KisRestClient`` over ``httpx.AsyncClient`` for use from ``async def`` handlers.
+
+    Same method surface, but every call is a coroutine, so a KIS round trip parks the
+    coroutine instead of a Starlette threadpool worker. Request building and response
+    parsing are inherited; only the transport, token refresh and pacing are async. Pass the
+    sync client's ``rate_limiter`` to keep both on one per-app-key quota.
+    """
+
+    def __init__(
+        self,
+        app_key: str,
+        app_secret: str,
+        env: str = "mock",
+        client: Optional[Any] = None,
+        base_url: Optional[str] = None,
+        rate_limiter: Optional[RestRateLimiter] = None,
+        max_connections: int = 100,
+        token_manager: Optional[Any] = None,
+    ) -> None:
+        self._max_connections = max_connections
+        super().__init__(
+            app_key,
+            app_secret,
+            env=env,
+            session=client,
+            base_url=base_url,
+            rate_limiter=rate_limiter,
+            token_manager=token_manager,
+        )
+        self._token_lock = asyncio.Lock()
+
+    def _default_session(self) -> Any:
+        if httpx is None:
+            raise RuntimeError("async REST client requires httpx (pip install -e .[asyncrest])")
+        limits = httpx.Limits(max_connections=self._max_connections, max_keepalive_connections=self._max_connections)
+        # limits must sit on the transport (a client-level ``limits`` is ignored once a transport is
+        # given); retries cover connect failures only, mirroring PooledSession
+        return httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(limits=limits, retries=2))
+
+    async def _send(self, request: KisRequest) -> Dict[str, Any]:
+        method, url, kwargs = request
+        try:
+            response = await self.session.request(method, url, **kwargs)
+            response.raise_for_status()
+        except Exception as exc:
+            if httpx is not None and isinstance(exc, httpx.HTTPStatusError):
+                raise KisHttpError(str(exc), response=exc.response) from exc
+            if httpx is not None and isinstance(exc, httpx.HTTPError):
+                raise KisHttpError(str(exc)) from exc
+            raise
+        return response.json()
+
+    async def aclose(self) -> None:
+        await self.session.aclose()
+
+    async def _issue_token(self) -> str:
+        return self._store_token(await self._send(self._token_request()))
+
+    async def issue_approval_key(self) -> str:
+        if self.token_manager is not None:
+            return await asyncio.to_thread(self.token_manager.get_approval_key, self.approval_key_slot)
+        return self._parse_approval_key(await self._send(self._approval_request()))
+
+    async def get_access_token(self) -> str:
+        if self.token_manager is not None:
+            if self.token_manager.token_is_valid():
+                return self.token_manager.get_access_token()
+            # the shared manager issues over its blocking sync client; keep that off the loop
+            return await asyncio.to_thread(self.token_manager.get_access_token)
+        if self._token_is_valid():
+            return self._access_token
+        async with self._token_lock:
+            # another coroutine may have refreshed while we waited
+            if self._token_is_valid():
+                return self._access_token
+            return await self._issue_token()
+
+    async def _throttle(self, priority: str) -> None:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(priority)
+
+    async def get_quote(self, symbol: str) -> Dict[str, Any]:
+        token = await self.get_access_token()
+        await self._throttle(PRIORITY_QUOTE)
+        return self._parse_quote(symbol, await self._send(self._quote_request(token, symbol)))
+
+    async def place_order(
+        self,
+        account_id: str,
+        symbol: str,
+        side: str,
+        qty: int,
+        price: float | None,
+        order_type: str = "LIMIT",
+    ) -> Dict[str, Any]:
+        token = await self.get_access_token()
+        await self._throttle(PRIORITY_ORDER)
+        request = self._place_order_request(token, account_id, symbol, side, qty, price, order_type)
+        return self._parse_place_order(await self._send(request))
+
+    async def get_order_status(self, account_id: str, broker_order_id: str) -> Dict[str, Any]:
+        token = await self.get_access_token()
+        await self._throttle(PRIORITY_ACCOUNT)
+        request = self._order_status_request(token, account_id, broker_order_id)
+        return self._parse_order_status(broker_order_id, await self._send(request))
+
+    async def cancel_order(self, account_id: str, broker_order_id: str) -> Dict[str, Any]:
+        token = await self.get_access_token()
+        await self._throttle(PRIORITY_ORDER)
+        return self._parse_cancel_order(await self._send(self._cancel_order_request(token, account_id, broker_order_id)))
+
+    async def modify_order(
+        self, account_id: str, broker_order_id: str, qty: int, price: float | None
+    ) -> Dict[str, Any]:
+        token = await self.get_access_token()
+        await self._throttle(PRIORITY_ORDER)
+        request = self._modify_order_request(token, account_id, broker_order_id, qty, price)
+        return self._parse_modify_order(await self._send(request))
+
+    async def get_balances(self, account_id: str) -> list[Dict[str, Any]]:
+        token = await self.get_access_token()
+        await self._throttle(PRIORITY_ACCOUNT)
+        return self._parse_balances(account_id, await self._send(self._balances_request(token, account_id)))
+
+    async def get_positions(self, account_id: str) -> list[Dict[str, Any]]:
+        token = await self.get_access_token()
+        await self._throttle(PRIORITY_ACCOUNT)
+        return self._parse_positions(account_id, await self._send(self._positions_request(token, account_id)))
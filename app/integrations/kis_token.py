@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# KIS approval keys carry no expires_in; they are documented as valid for 24 hours
+APPROVAL_KEY_TTL_SEC = 86400
+# never hand out a credential this close to its expiry
+_EXPIRY_MARGIN_SEC = 30
+
+
+class KisTokenManager:
+    """Process-wide owner of the KIS access token and WS approval keys.
+
+    Every ``KisRestClient`` built with ``token_manager=`` reads the same token, so the
+    process issues one token per app key instead of one per client. ``start()`` runs a
+    background thread that re-issues the token ``refresh_ahead_sec`` before it expires, so
+    request paths only pay for ``/oauth2/tokenP`` if the refresher fell behind. Both the
+    token and the approval keys (one per ``slot``, e.g. per WS shard) are written to
+    ``cache_path`` and reused across restarts while still valid; KIS throttles issuance.
+
+    Approval keys are only issued on demand: a WS session keeps the key it connected with,
+    so refreshing it in the background would not reach the live session.
+    """
+
+    def __init__(
+        self,
+        issuer,
+        *,
+        cache_path: Optional[str] = None,
+        refresh_ahead_sec: float = 300.0,
+        retry_sec: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        # plain KisRestClient (no token_manager) used only as the issuing transport
+        self.issuer = issuer
+        self.cache_path = cache_path or None
+        self.refresh_ahead_sec = max(0.0, float(refresh_ahead_sec))
+        self.retry_sec = max(1.0, float(retry_sec))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._access_token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_issued_at = 0.0
+        self._approval_keys: Dict[str, Dict[str, Any]] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.tokens_issued = 0
+        self.approval_keys_issued = 0
+        self.background_refreshes = 0
+        self.refresh_errors = 0
+        self.cache_loaded = False
+        self._load_cache()
+
+    def _cache_owner(self) -> str:
+        # the file must never hand one app key's token to another key or environment
+        raw = f"{self.issuer.base_url}|{self.issuer.app_key}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            print(f"[KIS][token_cache_error] path={self.cache_path} err={exc}", flush=True)
+            return
+        if not isinstance(data, dict) or data.get("owner") != self._cache_owner():
+            return
+        now = self._clock()
+        if data.get("access_token") and float(data.get("expires_at", 0)) > now + _EXPIRY_MARGIN_SEC:
+            self._access_token = str(data["access_token"])
+            self._token_expires_at = float(data["expires_at"])
+            self._token_issued_at = float(data.get("issued_at", 0))
+            self.cache_loaded = True
+        for slot, entry in (data.get("approval_keys") or {}).items():
+            if entry.get("key") and float(entry.get("expires_at", 0)) > now + _EXPIRY_MARGIN_SEC:
+                self._approval_keys[slot] = {"key": str(entry["key"]), "expires_at": float(entry["expires_at"])}
+
+    def _save_cache(self) -> None:
+        # caller holds self._lock
+        if self.cache_path is None:
+            return
+        data = {
+            "owner": self._cache_owner(),
+            "access_token": self._access_token,
+            "expires_at": self._token_expires_at,
+            "issued_at": self._token_issued_at,
+            "approval_keys": self._approval_keys,
+        }
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                json.dump(data, fp)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as exc:
+            # persistence is an optimisation; the in-memory token keeps serving
+            print(f"[KIS][token_cache_error] path={self.cache_path} err={exc}", flush=True)
+
+    def _is_valid(self, expires_at: float) -> bool:
+        return self._clock() < expires_at - _EXPIRY_MARGIN_SEC
+
+    def token_is_valid(self) -> bool:
+        return bool(self._access_token) and self._is_valid(self._token_expires_at)
+
+    def _refresh_token_locked(self) -> str:
+        payload = self.issuer._send(self.issuer._token_request())
+        token = str(payload["access_token"])
+        expires_in = int(payload.get("expires_in", 3600))
+        self._access_token = token
+        self._token_issued_at = self._clock()
+        self._token_expires_at = self._token_issued_at + expires_in
+        self.tokens_issued += 1
+        self._save_cache()
+        print(f"[KIS][token_issued] expires_in={expires_in}", flush=True)
+        return token
+
+    def get_access_token(self) -> str:
+        if self.token_is_valid():
+            return self._access_token
+        with self._lock:
+            # another thread (or the refresher) may have issued while we waited
+            if self.token_is_valid():
+                return self._access_token
+            return self._refresh_token_locked()
+
+    def get_approval_key(self, slot: str = "default") -> str:
+        with self._lock:
+            entry = self._approval_keys.get(slot)
+            if entry is not None and self._is_valid(entry["expires_at"]):
+                return entry["key"]
+            key = self.issuer._parse_approval_key(self.issuer._send(self.issuer._approval_request()))
+            self._approval_keys[slot] = {"key": key, "expires_at": self._clock() + APPROVAL_KEY_TTL_SEC}
+            self.approval_keys_issued += 1
+            self._save_cache()
+            return key
+
+    def seconds_until_refresh(self) -> float:
+        if not self._access_token:
+            return 0.0
+        # short-lived tokens refresh at half-life at the latest, so the refresher never spins
+        lifetime = max(0.0, self._token_expires_at - self._token_issued_at)
+        ahead = min(self.refresh_ahead_sec, lifetime / 2)
+        return max(0.0, self._token_expires_at - ahead - self._clock())
+
+    def refresh_if_due(self) -> bool:
+        """Re-issue the token when it is inside the refresh window; returns True if issued."""
+        with self._lock:
+            if self.seconds_until_refresh() > 0:
+                return False
+            self._refresh_token_locked()
+            self.background_refreshes += 1
+            return True
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.refresh_if_due()
+                wait_sec = self.seconds_until_refresh()
+            except Exception as exc:
+                with self._lock:
+                    self.refresh_errors += 1
+                print(f"[KIS][token_refresh_error] err={exc}", flush=True)
+                wait_sec = self.retry_sec
+            self._stop_event.wait(max(1.0, wait_sec))
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True, name="kis-token-refresh")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            expires_in = max(0.0, self._token_expires_at - self._clock()) if self._access_token else None
+            return {
+                "kis_token_expires_in_sec": round(expires_in, 1) if expires_in is not None else None,
+                "kis_token_issued": self.tokens_issued,
+                "kis_token_background_refreshes": self.background_refreshes,
+                "kis_token_refresh_errors": self.refresh_errors,
+                "kis_token_cache_loaded": self.cache_loaded,
+                "kis_approval_keys_issued": self.approval_keys_issued,
+            }
@@ -3,7 +3,10 @@ from __future__ import annotations
 import json
 import os
 import re
+import statistics
+import threading
 import time
+from collections import deque
 from typing import Any, Callable, Dict, Optional
 
 
@@ -36,105 +39,147 @@ def _payload_hint(payload: Any) -> str:
     return f"type={type(payload).__name__}"
 
 
-def _decode_pipe_realtime_payload(payload: str) -> Dict[str, Any] | None:
-    # KIS realtime frames may arrive as delimited text:
-    #   0|H0STCNT0|001|<field0^field1^...>
-    # H0STCNT0 has fixed-width records (46 fields each).
-    if "|" not in payload or "^" not in payload:
+# H0STCNT0 (domestic stock realtime trade) records are fixed-width: 46 fields each.
+_H0STCNT0_TR_ID = "H0STCNT0"
+_H0STCNT0_FIELD_COUNT = 46
+_H0STCNT0_SYMBOL = 0
+_H0STCNT0_TRADE_TIME = 1
+_H0STCNT0_PRICE = 2
+_H0STCNT0_CHANGE_PCT = 5
+_H0STCNT0_TURNOVER = 14
+
+_SYMBOL_PATTERN = re.compile(r"\d{6}")
+
+
+def _decode_h0stcnt0_record(fields: list[str], offset: int) -> Dict[str, Any] | None:
+    """Pull only the quote fields of one record starting at ``offset``."""
+    symbol = fields[offset + _H0STCNT0_SYMBOL].strip()
+    if _SYMBOL_PATTERN.fullmatch(symbol) is None:
         return None
+    try:
+        price = float(fields[offset + _H0STCNT0_PRICE])
+    except ValueError:
+        return None
+    if price <= 0:
+        return None
+
+    quote: Dict[str, Any] = {
+        "symbol": symbol,
+        "price": price,
+        "source": "kis-ws",
+    }
+
+    trade_time = fields[offset + _H0STCNT0_TRADE_TIME].strip()
+    if trade_time:
+        quote["trade_time"] = trade_time
+
+    quote["change_pct"] = _to_float_default(fields[offset + _H0STCNT0_CHANGE_PCT], default=0.0)
+    quote["turnover"] = _to_float_default(fields[offset + _H0STCNT0_TURNOVER], default=0.0)
+    return quote
+
+
+def _decode_pipe_realtime_records(payload: str) -> list[Dict[str, Any]] | None:
+    # KIS realtime frames may arrive as delimited text:
+    #   0|H0STCNT0|003|<record0 fields ^ record1 fields ^ record2 fields>
+    # The body is split once and only the offsets used by the quote snapshot are read;
+    # the remaining 41 fields of each record are never stripped or converted.
+    # Every valid record of a data_cnt>1 frame is returned, in frame order.
     parts = payload.split("|", 3)
-    if len(parts) < 4:
+    if len(parts) < 4 or "^" not in parts[3]:
         return None
 
-    tr_id = parts[1].strip()
-    if tr_id != "H0STCNT0":
+    if parts[1].strip() != _H0STCNT0_TR_ID:
         return None
 
     try:
-        data_cnt = int(parts[2].strip())
-    except (TypeError, ValueError):
+        data_cnt = int(parts[2])
+    except ValueError:
         return None
     if data_cnt <= 0:
         return None
 
-    body = parts[3]
-    fields = [f.strip() for f in body.split("^")]
-    chunk_size = 46
-    expected_count = data_cnt * chunk_size
-    if len(fields) != expected_count:
+    fields = parts[3].split("^")
+    if len(fields) != data_cnt * _H0STCNT0_FIELD_COUNT:
         return None
 
-    for idx in range(data_cnt):
-        chunk = fields[idx * chunk_size : (idx + 1) * chunk_size]
-        if len(chunk) != chunk_size:
-            return None
+    records: list[Dict[str, Any]] = []
+    for offset in range(0, len(fields), _H0STCNT0_FIELD_COUNT):
+        quote = _decode_h0stcnt0_record(fields, offset)
+        if quote is not None:
+            records.append(quote)
 
-        symbol = chunk[0]
-        price_raw = chunk[2]
-        if not re.fullmatch(r"\d{6}", symbol):
-            continue
-        try:
-            price = float(price_raw)
-        except (TypeError, ValueError):
-            continue
-        if price <= 0:
-            continue
-
-        quote: Dict[str, Any] = {
-            "symbol": symbol,
-            "price": price,
-            "source": "kis-ws",
-        }
+    return records or None
 
-        trade_time = chunk[1]
-        if trade_time:
-            quote["trade_time"] = trade_time
 
-        change_pct = _to_float_default(chunk[5], default=0.0)
-        turnover = _to_float_default(chunk[14], default=0.0)
-        quote["change_pct"] = change_pct
-        quote["turnover"] = turnover
+FRAME_REALTIME = "realtime"
+FRAME_CONTROL = "control"
+FRAME_UNKNOWN = "unknown"
 
-        return quote
+# Realtime data frames start with "0|" (plain) or "1|" (encrypted); control/ACK frames are JSON.
+_REALTIME_FRAME_PREFIXES = ("0|", "1|")
+_REALTIME_FRAME_PREFIXES_BYTES = (b"0|", b"1|")
 
-    return None
+
+def classify_frame(payload: Any) -> str:
+    """Classify a raw WS frame from its first bytes, without decoding or raising."""
+    if isinstance(payload, dict):
+        return FRAME_CONTROL
+    if isinstance(payload, str):
+        if payload.startswith(_REALTIME_FRAME_PREFIXES):
+            return FRAME_REALTIME
+        first = payload[:1]
+        if first.isspace():
+            first = payload.lstrip()[:1]
+        return FRAME_CONTROL if first == "{" else FRAME_UNKNOWN
+    if isinstance(payload, (bytes, bytearray)):
+        if payload.startswith(_REALTIME_FRAME_PREFIXES_BYTES):
+            return FRAME_REALTIME
+        first = bytes(payload[:1])
+        if first.isspace():
+            first = bytes(payload.lstrip()[:1])
+        return FRAME_CONTROL if first == b"{" else FRAME_UNKNOWN
+    return FRAME_UNKNOWN
 
 
-def _decode_payload_to_dict(payload: Any) -> Dict[str, Any]:
+def _decode_payload_to_records(payload: Any, frame_class: str | None = None) -> list[Dict[str, Any]]:
     if isinstance(payload, dict):
-        return payload
+        return [payload]
     if isinstance(payload, (bytes, bytearray)):
         try:
             payload = payload.decode("utf-8")
         except UnicodeDecodeError as exc:
             raise ValueError("payload bytes must be utf-8 encoded") from exc
     if isinstance(payload, str):
+        if frame_class is None:
+            frame_class = classify_frame(payload)
+        if frame_class == FRAME_REALTIME:
+            pipe_records = _decode_pipe_realtime_records(payload)
+            if pipe_records is None:
+                raise ValueError("unsupported or malformed realtime frame")
+            return pipe_records
+        if frame_class != FRAME_CONTROL:
+            raise ValueError("payload must be valid JSON string or dict")
         try:
             decoded = json.loads(payload)
-        except json.JSONDecodeError:
-            pipe_decoded = _decode_pipe_realtime_payload(payload)
-            if pipe_decoded is not None:
-                return pipe_decoded
-            raise ValueError("payload must be valid JSON string or dict")
+        except json.JSONDecodeError as exc:
+            raise ValueError("payload must be valid JSON string or dict") from exc
         if not isinstance(decoded, dict):
             raise ValueError("decoded payload must be an object")
-        return decoded
+        return [decoded]
     raise ValueError("payload must be dict, JSON string, or utf-8 JSON bytes")
 
 
-def parse_message(payload: dict | str | bytes | bytearray) -> Dict[str, Any]:
-    """Parse raw KIS WS payload into quote snapshot-compatible dict."""
-    raw = _decode_payload_to_dict(payload)
-
+def _unwrap_records(raw: Dict[str, Any]) -> list[Dict[str, Any]]:
     for key in ("payload", "data", "message"):
-        nested = raw.get(key) if isinstance(raw, dict) else None
+        nested = raw.get(key)
         if isinstance(nested, dict):
-            raw = nested
-            break
+            return [nested]
         if isinstance(nested, (str, bytes, bytearray)):
-            raw = _decode_payload_to_dict(nested)
-            break
+            return _decode_payload_to_records(nested)
+    return [raw]
 
+
+def _normalize_quote(raw: Dict[str, Any], now: int) -> Dict[str, Any]:
     body = raw.get("body")
     nested_output = body.get("output") if isinstance(body, dict) else None
     normalized = {**raw, **nested_output} if isinstance(nested_output, dict) else raw
@@ -157,8 +202,6 @@ def parse_message(payload: dict | str | bytes | bytearray) -> Dict[str, Any]:
     if price_raw is None:
         raise ValueError("missing price in payload")
 
-    now = int(time.time())
-
     return {
         "symbol": str(symbol),
         "price": _to_float(price_raw, field_name="price"),
@@ -177,6 +220,28 @@ def parse_message(payload: dict | str | bytes | bytearray) -> Dict[str, Any]:
     }
 
 
+def parse_messages(
+    payload: dict | str | bytes | bytearray,
+    *,
+    frame_class: str | None = None,
+) -> list[Dict[str, Any]]:
+    """Parse one raw KIS WS frame into every quote snapshot-compatible dict it carries.
+
+    ``frame_class`` skips re-classification when the caller already ran ``classify_frame``.
+    """
+    now = int(time.time())
+    quotes: list[Dict[str, Any]] = []
+    for raw in _decode_payload_to_records(payload, frame_class):
+        for record in _unwrap_records(raw):
+            quotes.append(_normalize_quote(record, now))
+    return quotes
+
+
+def parse_message(payload: dict | str | bytes | bytearray) -> Dict[str, Any]:
+    """Parse raw KIS WS payload into quote snapshot-compatible dict (first quote of the frame)."""
+    return parse_messages(payload)[0]
+
+
 class KisWsClient:
     """KIS websocket client with subscribe and ingest callback flow."""
 
@@ -189,6 +254,7 @@ class KisWsClient:
         self,
         on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
         *,
+        on_batch: Optional[Callable[[list[Dict[str, Any]]], None]] = None,
         approval_key: str = "",
         approval_key_client: Optional[Any] = None,
         tr_id: str = "H0STCNT0",
@@ -200,6 +266,7 @@ class KisWsClient:
         on_state_change: Optional[Callable[..., None]] = None,
     ) -> None:
         self._on_message = on_message
+        self._on_batch = on_batch
         self.running = False
         self.approval_key = approval_key
         self._approval_key_client = approval_key_client
@@ -214,6 +281,17 @@ class KisWsClient:
         self._on_state_change = on_state_change
         self._first_message_logged = False
         self._active_ws_app: Any | None = None
+        self.frame_counts = {FRAME_REALTIME: 0, FRAME_CONTROL: 0, FRAME_UNKNOWN: 0}
+        self.connected = False
+        # active set = symbols of the current connect call + runtime adds - runtime removes,
+        # so runtime changes survive reconnects (replayed in _on_open)
+        self._base_symbols: list[str] = []
+        self._runtime_added: dict[str, None] = {}
+        self._runtime_removed: dict[str, None] = {}
+        self._subscription_lock = threading.Lock()
+        self._pending_acks: dict[str, tuple[str, float]] = {}
+        self._ack_latency_ms: deque[float] = deque(maxlen=256)
+        self.subscribe_nacks = 0
 
     def _emit_state(self, *, connected: bool, heartbeat_ts: int | None = None) -> None:
         if self._on_state_change is None:
@@ -242,6 +320,7 @@ class KisWsClient:
 
     def stop(self) -> None:
         self.running = False
+        self.connected = False
         self._first_message_logged = False
         ws_app = self._active_ws_app
         self._active_ws_app = None
@@ -252,9 +331,21 @@ class KisWsClient:
                 pass
         self._emit_state(connected=False)
 
+    def recycle(self) -> None:
+        """Close the live socket but keep running, so the reconnect loop connects again."""
+        ws_app = self._active_ws_app
+        if ws_app is not None:
+            try:
+                ws_app.close()
+            except Exception:
+                pass
+
     def set_on_message(self, callback: Callable[[Dict[str, Any]], None]) -> None:
         self._on_message = callback
 
+    def set_on_batch(self, callback: Callable[[list[Dict[str, Any]]], None]) -> None:
+        self._on_batch = callback
+
     def ensure_approval_key(self) -> str:
         if self.approval_key:
             return self.approval_key
@@ -264,12 +355,13 @@ class KisWsClient:
         self.approval_key = str(self._approval_key_client.issue_approval_key())
         return self.approval_key
 
-    def build_subscribe_message(self, symbol: str) -> Dict[str, Any]:
+    def build_subscribe_message(self, symbol: str, *, tr_type: str | None = None) -> Dict[str, Any]:
+        """Registration frame for ``symbol``; ``tr_type`` "1" registers, "2" releases."""
         return {
             "header": {
                 "approval_key": self.approval_key,
                 "custtype": self.custtype,
-                "tr_type": self.tr_type,
+                "tr_type": tr_type or self.tr_type,
                 "content-type": self.content_type,
             },
             "body": {
@@ -280,42 +372,129 @@ class KisWsClient:
             },
         }
 
+    def active_symbols(self) -> list[str]:
+        with self._subscription_lock:
+            merged = dict.fromkeys([*self._base_symbols, *self._runtime_added])
+            return [symbol for symbol in merged if symbol not in self._runtime_removed]
+
+    def _send_frame(self, ws_app: Any, text: str) -> None:
+        ws_app.send(text)
+
+    def _register(self, ws_app: Any, symbol: str, tr_type: str) -> None:
+        self._pending_acks[symbol] = (tr_type, time.monotonic())
+        self._send_frame(ws_app, json.dumps(self.build_subscribe_message(symbol, tr_type=tr_type)))
+        action = "ws_subscribe" if tr_type == "1" else "ws_unsubscribe"
+        print(f"[WS][{action}] symbol={symbol}", flush=True)
+
+    def _send_registration(self, symbol: str, tr_type: str) -> bool:
+        ws_app = self._active_ws_app
+        if not self.connected or ws_app is None:
+            return False
+        try:
+            self._register(ws_app, symbol, tr_type)
+        except Exception as exc:
+            self._pending_acks.pop(symbol, None)
+            self.last_error = str(exc)
+            return False
+        return True
+
+    def subscribe(self, symbol: str) -> bool:
+        """Add ``symbol`` to the active set; returns True if a frame went out on a live socket.
+
+        When disconnected the change is only recorded and is replayed on the next open.
+        """
+        with self._subscription_lock:
+            self._runtime_removed.pop(symbol, None)
+            self._runtime_added[symbol] = None
+        return self._send_registration(symbol, "1")
+
+    def unsubscribe(self, symbol: str) -> bool:
+        with self._subscription_lock:
+            self._runtime_added.pop(symbol, None)
+            self._runtime_removed[symbol] = None
+        return self._send_registration(symbol, "2")
+
+    def _observe_ack(self, payload: dict | str | bytes | bytearray) -> None:
+        try:
+            message = payload if isinstance(payload, dict) else json.loads(payload)
+        except (TypeError, ValueError):
+            return
+        header = message.get("header") if isinstance(message, dict) else None
+        if not isinstance(header, dict):
+            return
+        pending = self._pending_acks.pop(str(header.get("tr_key", "")), None)
+        if pending is None:
+            return
+        self._ack_latency_ms.append((time.monotonic() - pending[1]) * 1000.0)
+        body = message.get("body")
+        if isinstance(body, dict) and str(body.get("rt_cd", "0")) != "0":
+            self.subscribe_nacks += 1
+
+    def handle_raw_batch(self, payload: dict | str | bytes | bytearray) -> list[Dict[str, Any]]:
+        """Parse one frame and dispatch its quotes: one on_batch call, or on_message per quote."""
+        frame_class = classify_frame(payload)
+        self.frame_counts[frame_class] += 1
+        if frame_class == FRAME_CONTROL and self._pending_acks:
+            self._observe_ack(payload)
+        quotes = parse_messages(payload, frame_class=frame_class)
+        if self._on_batch is not None:
+            self._on_batch(quotes)
+        elif self._on_message is not None:
+            for quote in quotes:
+                self._on_message(quote)
+        return quotes
+
     def handle_raw_message(self, payload: dict | str | bytes | bytearray) -> Dict[str, Any]:
-        quote = parse_message(payload)
-        if self._on_message is not None:
-            self._on_message(quote)
-        return quote
+        return self.handle_raw_batch(payload)[0]
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = list(self._ack_latency_ms)
+        return {
+            "ws_frames_realtime": self.frame_counts[FRAME_REALTIME],
+            "ws_frames_control": self.frame_counts[FRAME_CONTROL],
+            "ws_frames_unknown": self.frame_counts[FRAME_UNKNOWN],
+            "ws_subscriptions_active": len(self.active_symbols()),
+            "ws_subscribe_ack_pending": len(self._pending_acks),
+            "ws_subscribe_ack_last_ms": round(latencies[-1], 3) if latencies else None,
+            "ws_subscribe_ack_p50_ms": round(statistics.median(latencies), 3) if latencies else None,
+            "ws_subscribe_ack_max_ms": round(max(latencies), 3) if latencies else None,
+            "ws_subscribe_nacks": self.subscribe_nacks,
+        }
 
     def connect_and_subscribe(self, symbols: list[str], *, run_forever: bool = True) -> Any:
         self.ensure_approval_key()
+        with self._subscription_lock:
+            self._base_symbols = list(symbols)
         print(f"[WS][ws_connect] env={self.env} url={self.ws_url} symbols={','.join(symbols)}", flush=True)
         state = {"opened": False}
 
         def _on_open(ws: Any) -> None:
             state["opened"] = True
+            self.connected = True
             print("[WS][ws_connect_result] status=open", flush=True)
             self._emit_state(connected=True, heartbeat_ts=int(time.time()))
-            for symbol in symbols:
-                message = self.build_subscribe_message(symbol)
-                ws.send(json.dumps(message))
-                print(f"[WS][ws_subscribe] symbol={symbol}", flush=True)
+            # replays runtime subscribe/unsubscribe changes on every reconnect
+            for symbol in self.active_symbols():
+                self._register(ws, symbol, self.tr_type)
 
         def _on_message(_: Any, raw_message: Any) -> None:
             if not self._first_message_logged:
                 print("[WS][ws_first_message] received=1", flush=True)
                 self._first_message_logged = True
             try:
-                self.handle_raw_message(raw_message)
+                self.handle_raw_batch(raw_message)
             except ValueError as exc:
                 # KIS ACK/heartbeat/control messages may not include quote fields.
                 print(f"[WS][ws_message_skip] reason={exc} hint={_payload_hint(raw_message)}", flush=True)
 
         def _on_error(_: Any, error: Any) -> None:
+            self.connected = False
             self.last_error = str(error)
             print(f"[WS][ws_error] {self.last_error}", flush=True)
             self._emit_state(connected=False)
 
         def _on_close(_: Any, code: Any, reason: Any) -> None:
+            self.connected = False
             print(f"[WS][ws_close] code={code} reason={reason}", flush=True)
             self._emit_state(connected=False)
 
@@ -337,6 +516,7 @@ class KisWsClient:
         finally:
             if self._active_ws_app is ws_app:
                 self._active_ws_app = None
+                self.connected = False
             try:
                 ws_app.close()
             except Exception:
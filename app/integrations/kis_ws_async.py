@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import time
+from typing import Any, Awaitable, Callable
+
+from app.integrations.kis_ws import KisWsClient, _payload_hint
+
+
+class AsyncKisWsClient(KisWsClient):
+    """asyncio variant of ``KisWsClient`` that runs inside the uvicorn event loop.
+
+    Same ``connect_and_subscribe``/``run_with_reconnect``/``stop`` contract, but the first two
+    are coroutines: frames are read and dispatched on the loop, so no callback crosses a
+    thread boundary. ``websocket_app_factory(url)`` must return (or resolve to) a connection
+    with ``async send``, ``async close`` and async iteration over incoming frames, which is
+    what ``websockets.connect`` provides; tests pass a fake server instead.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def _default_websocket_app_factory(self, url: str, **kwargs: Any) -> Any:
+        try:
+            import websockets
+        except ImportError as exc:  # pragma: no cover - depends on optional extra
+            raise RuntimeError("async WS client requires websockets (pip install -e .[asyncws])") from exc
+
+        return await websockets.connect(url, **kwargs)
+
+    def stop(self) -> None:
+        self.running = False
+        self.connected = False
+        self._first_message_logged = False
+        conn = self._active_ws_app
+        self._active_ws_app = None
+        if conn is not None and self._loop is not None and not self._loop.is_closed():
+            # stop() may be called from any thread; closing must run on the owning loop
+            self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._close_quietly(conn)))
+        self._emit_state(connected=False)
+
+    def recycle(self) -> None:
+        conn = self._active_ws_app
+        if conn is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._close_quietly(conn)))
+
+    def _send_frame(self, conn: Any, text: str) -> None:
+        # runtime subscribe/unsubscribe may come from any thread; the send must run on our loop
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            raise RuntimeError("ws event loop is not running")
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if current is loop:
+            loop.create_task(conn.send(text))
+        else:
+            asyncio.run_coroutine_threadsafe(conn.send(text), loop)
+
+    @staticmethod
+    async def _close_quietly(conn: Any) -> None:
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+    async def connect_and_subscribe(self, symbols: list[str], *, run_forever: bool = True) -> Any:
+        self._loop = asyncio.get_running_loop()
+        with self._subscription_lock:
+            self._base_symbols = list(symbols)
+        if not self.approval_key:
+            # approval key issue is a blocking REST call; keep it off the loop
+            await asyncio.to_thread(self.ensure_approval_key)
+        print(f"[WS][ws_connect] env={self.env} url={self.ws_url} symbols={','.join(symbols)} mode=async", flush=True)
+
+        conn = self._websocket_app_factory(self.ws_url)
+        if inspect.isawaitable(conn):
+            conn = await conn
+        self._active_ws_app = conn
+        try:
+            self.connected = True
+            print("[WS][ws_connect_result] status=open", flush=True)
+            self._emit_state(connected=True, heartbeat_ts=int(time.time()))
+            # replays runtime subscribe/unsubscribe changes on every reconnect
+            for symbol in self.active_symbols():
+                self._pending_acks[symbol] = (self.tr_type, time.monotonic())
+                await conn.send(json.dumps(self.build_subscribe_message(symbol)))
+                print(f"[WS][ws_subscribe] symbol={symbol}", flush=True)
+
+            if run_forever:
+                await self._read_loop(conn)
+            return conn
+        except Exception as exc:
+            self.connected = False
+            if not self.running:
+                return conn
+            self.last_error = str(exc)
+            print(f"[WS][ws_error] {self.last_error}", flush=True)
+            self._emit_state(connected=False)
+            raise
+        finally:
+            if self._active_ws_app is conn:
+                self._active_ws_app = None
+                self.connected = False
+            await self._close_quietly(conn)
+
+    async def _read_loop(self, conn: Any) -> None:
+        async for raw_message in conn:
+            if not self._first_message_logged:
+                print("[WS][ws_first_message] received=1", flush=True)
+                self._first_message_logged = True
+            try:
+                self.handle_raw_batch(raw_message)
+            except ValueError as exc:
+                # KIS ACK/heartbeat/control messages may not include quote fields.
+                print(f"[WS][ws_message_skip] reason={exc} hint={_payload_hint(raw_message)}", flush=True)
+        print("[WS][ws_close] code=None reason=closed", flush=True)
+        self._emit_state(connected=False)
+
+    async def run_with_reconnect(
+        self,
+        *,
+        connect_once: Callable[[], Awaitable[Any]],
+        sleep_fn: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        max_retries: int = 0,
+        backoff_base_sec: float = 1.0,
+        backoff_cap_sec: float = 30.0,
+    ) -> bool:
+        """Async connect loop with the same backoff/stop semantics as ``KisWsClient.run_with_reconnect``."""
+        self.running = True
+        self.last_error = None
+        self.reconnect_count = 0
+        self._emit_state(connected=False)
+
+        attempt = 0
+        while self.running:
+            try:
+                await connect_once()
+                self.last_error = None
+                self.reconnect_count = 0
+                self._emit_state(connected=True, heartbeat_ts=int(time.time()))
+                if not self.running:
+                    return False
+                # read loop ended (socket closed) -> reconnect loop
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.last_error = str(exc)
+                self.reconnect_count += 1
+                self._emit_state(connected=False)
+
+                if not self.running:
+                    return False
+
+                attempt += 1
+                if max_retries > 0 and attempt >= max_retries:
+                    break
+
+                backoff = min(backoff_base_sec * (2 ** max(0, attempt - 1)), backoff_cap_sec)
+                await sleep_fn(backoff)
+
+        return False
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.integrations.kis_ws import FRAME_CONTROL, FRAME_REALTIME, FRAME_UNKNOWN, KisWsClient
+
+
+class _RateMeter:
+    """Messages per second over a sliding window of one-second buckets."""
+
+    def __init__(self, window_sec: int = 10) -> None:
+        self.window_sec = max(1, int(window_sec))
+        self._counts = [0] * self.window_sec
+        self._stamps = [-1] * self.window_sec
+
+    def add(self, n: int, now: float) -> None:
+        sec = int(now)
+        idx = sec % self.window_sec
+        if self._stamps[idx] != sec:
+            self._stamps[idx] = sec
+            self._counts[idx] = 0
+        self._counts[idx] += n
+
+    def rate(self, now: float) -> float:
+        sec = int(now)
+        total = sum(c for c, s in zip(self._counts, self._stamps) if sec - self.window_sec < s <= sec)
+        return total / self.window_sec
+
+
+class _Shard:
+    def __init__(self, index: int, client: KisWsClient, now: float) -> None:
+        self.index = index
+        self.client = client
+        self.symbols: list[str] = []
+        self.connected = False
+        self.ever_connected = False
+        # set when a live connection drops; a shard still on its first connect is judged by
+        # started_at against the longer connect grace instead
+        self.down_since: float | None = None
+        self.started_at = now
+        self.messages = 0
+        self.meter = _RateMeter()
+        self.thread: threading.Thread | None = None
+
+
+class KisWsShardManager:
+    """Partitions WS symbols across several ``KisWsClient`` connections.
+
+    KIS caps registrations per WS session, so one socket cannot carry the whole universe.
+    Each shard owns its client (and therefore its own approval key), reconnect loop and
+    counters; all shards feed the same ``on_batch``. A shard that stays down longer than
+    ``failover_after_sec`` hands its symbols to connected shards with spare capacity; the
+    receiving shard registers them over its live socket (or recycles it if that send fails).
+    A shard that has not finished its first connect gets ``connect_grace_sec`` from ``start()``.
+    """
+
+    def __init__(
+        self,
+        *,
+        shard_count: int,
+        max_symbols_per_shard: int = 40,
+        on_batch: Optional[Callable[[list[Dict[str, Any]]], None]] = None,
+        on_state_change: Optional[Callable[..., None]] = None,
+        client_factory: Callable[..., KisWsClient] = KisWsClient,
+        failover_after_sec: float = 5.0,
+        connect_grace_sec: float = 30.0,
+        check_interval_sec: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if shard_count < 1:
+            raise ValueError("shard_count must be >= 1")
+        self.max_symbols_per_shard = max(1, int(max_symbols_per_shard))
+        self.failover_after_sec = failover_after_sec
+        self.connect_grace_sec = connect_grace_sec
+        self.check_interval_sec = check_interval_sec
+        self._on_batch = on_batch
+        self._on_state_change = on_state_change
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._monitor: threading.Thread | None = None
+        self.running = False
+        self.unassigned: list[str] = []
+        self.failovers = 0
+        now = clock()
+        self.shards = [
+            _Shard(
+                idx,
+                client_factory(
+                    on_batch=self._make_batch_handler(idx),
+                    on_state_change=self._make_state_handler(idx),
+                ),
+                now,
+            )
+            for idx in range(shard_count)
+        ]
+
+    @property
+    def clients(self) -> list[KisWsClient]:
+        return [shard.client for shard in self.shards]
+
+    @property
+    def last_error(self) -> str | None:
+        for shard in self.shards:
+            if shard.client.last_error:
+                return shard.client.last_error
+        return None
+
+    @property
+    def reconnect_count(self) -> int:
+        return sum(shard.client.reconnect_count for shard in self.shards)
+
+    def _make_batch_handler(self, idx: int) -> Callable[[list[Dict[str, Any]]], None]:
+        def _on_batch(quotes: list[Dict[str, Any]]) -> None:
+            shard = self.shards[idx]
+            shard.messages += len(quotes)
+            shard.meter.add(len(quotes), self._clock())
+            if self._on_batch is not None:
+                self._on_batch(quotes)
+
+        return _on_batch
+
+    def _make_state_handler(self, idx: int) -> Callable[..., None]:
+        def _on_state(*, connected: bool, reconnect_count: int, last_error: str | None, heartbeat_ts: int | None = None) -> None:
+            shard = self.shards[idx]
+            with self._lock:
+                was_connected = shard.connected
+                shard.connected = bool(connected)
+                if shard.connected:
+                    shard.ever_connected = True
+                    shard.down_since = None
+                elif was_connected:
+                    shard.down_since = self._clock()
+            self._emit_state(heartbeat_ts=heartbeat_ts)
+
+        return _on_state
+
+    def _emit_state(self, *, heartbeat_ts: int | None = None) -> None:
+        if self._on_state_change is None:
+            return
+        self._on_state_change(
+            connected=any(shard.connected for shard in self.shards),
+            reconnect_count=self.reconnect_count,
+            last_error=self.last_error,
+            heartbeat_ts=heartbeat_ts,
+        )
+
+    def assign(self, symbols: list[str]) -> None:
+        """Split ``symbols`` into contiguous, evenly sized chunks capped per shard."""
+        unique = list(dict.fromkeys(symbols))
+        per_shard = min(self.max_symbols_per_shard, max(1, math.ceil(len(unique) / len(self.shards))))
+        with self._lock:
+            for idx, shard in enumerate(self.shards):
+                shard.symbols = unique[idx * per_shard : (idx + 1) * per_shard]
+            self.unassigned = unique[per_shard * len(self.shards) :]
+        if self.unassigned:
+            print(
+                f"[WS][ws_shard_capacity] unassigned={len(self.unassigned)} "
+                f"shards={len(self.shards)} cap={self.max_symbols_per_shard}",
+                flush=True,
+            )
+
+    def _least_loaded(self, *, connected_only: bool) -> _Shard | None:
+        candidates = [
+            shard
+            for shard in self.shards
+            if len(shard.symbols) < self.max_symbols_per_shard and (shard.connected or not connected_only)
+        ]
+        return min(candidates, key=lambda s: len(s.symbols), default=None)
+
+    def _shard_of(self, symbol: str) -> _Shard | None:
+        for shard in self.shards:
+            if symbol in shard.symbols:
+                return shard
+        return None
+
+    def active_symbols(self) -> list[str]:
+        with self._lock:
+            return [symbol for shard in self.shards for symbol in shard.symbols]
+
+    def subscribe(self, symbol: str) -> bool:
+        """Place ``symbol`` on the least-loaded shard (connected ones first)."""
+        with self._lock:
+            if self._shard_of(symbol) is not None:
+                return False
+            target = self._least_loaded(connected_only=True) or self._least_loaded(connected_only=False)
+            if target is None:
+                if symbol not in self.unassigned:
+                    self.unassigned.append(symbol)
+                return False
+            target.symbols.append(symbol)
+        return target.client.subscribe(symbol)
+
+    def unsubscribe(self, symbol: str) -> bool:
+        with self._lock:
+            if symbol in self.unassigned:
+                self.unassigned.remove(symbol)
+            shard = self._shard_of(symbol)
+            if shard is None:
+                return False
+            shard.symbols.remove(symbol)
+        return shard.client.unsubscribe(symbol)
+
+    def check_failover(self, now: float | None = None) -> list[int]:
+        """Move symbols off shards down longer than the grace period; returns recycled shard indexes."""
+        ref = self._clock() if now is None else now
+        moves: list[tuple[_Shard | None, _Shard, str]] = []
+        with self._lock:
+            orphaned: list[tuple[_Shard | None, str]] = [(None, symbol) for symbol in self.unassigned]
+            for shard in self.shards:
+                if shard.symbols and self._is_failed(shard, ref):
+                    print(f"[WS][ws_shard_failover] shard={shard.index} symbols={len(shard.symbols)}", flush=True)
+                    orphaned.extend((shard, symbol) for symbol in shard.symbols)
+                    shard.symbols = []
+                    self.failovers += 1
+            remaining: list[str] = []
+            for source, symbol in orphaned:
+                target = self._least_loaded(connected_only=True)
+                if target is None:
+                    remaining.append(symbol)
+                    continue
+                target.symbols.append(symbol)
+                moves.append((source, target, symbol))
+            self.unassigned = remaining
+        recycled: set[int] = set()
+        for source, target, symbol in moves:
+            if source is not None:
+                # keeps the dead shard from re-registering the symbol when it reconnects
+                source.client.unsubscribe(symbol)
+            if not target.client.subscribe(symbol):
+                recycled.add(target.index)
+        for idx in recycled:
+            self.shards[idx].client.recycle()
+        return sorted(recycled)
+
+    def _is_failed(self, shard: _Shard, now: float) -> bool:
+        if shard.connected:
+            return False
+        if not shard.ever_connected:
+            return now - shard.started_at >= self.connect_grace_sec
+        return shard.down_since is not None and now - shard.down_since >= self.failover_after_sec
+
+    def _run_shard(self, shard: _Shard) -> None:
+        client = shard.client
+        # connect_once reads the shard's current symbols, so a recycle picks up reassignments
+        client.run_with_reconnect(connect_once=lambda: client.connect_and_subscribe(symbols=list(shard.symbols)))
+
+    def _monitor_loop(self) -> None:
+        while not self._stop_event.wait(self.check_interval_sec):
+            try:
+                self.check_failover()
+            except Exception as exc:
+                print(f"[WS][ws_shard_monitor_error] {exc}", flush=True)
+
+    def start(self, symbols: list[str]) -> None:
+        self.assign(symbols)
+        self.running = True
+        self._stop_event.clear()
+        now = self._clock()
+        for shard in self.shards:
+            shard.started_at = now
+            shard.thread = threading.Thread(target=self._run_shard, args=(shard,), daemon=True, name=f"kis-ws-shard-{shard.index}")
+            shard.thread.start()
+        self._monitor = threading.Thread(target=self._monitor_loop, daemon=True, name="kis-ws-shard-monitor")
+        self._monitor.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self.running = False
+        self._stop_event.set()
+        for shard in self.shards:
+            shard.client.stop()
+        for shard in self.shards:
+            if shard.thread is not None and shard.thread.is_alive():
+                shard.thread.join(timeout=timeout)
+            shard.thread = None
+        if self._monitor is not None and self._monitor.is_alive():
+            self._monitor.join(timeout=timeout)
+        self._monitor = None
+
+    def metrics(self) -> Dict[str, Any]:
+        now = self._clock()
+        out: Dict[str, Any] = {
+            "ws_frames_realtime": sum(s.client.frame_counts[FRAME_REALTIME] for s in self.shards),
+            "ws_frames_control": sum(s.client.frame_counts[FRAME_CONTROL] for s in self.shards),
+            "ws_frames_unknown": sum(s.client.frame_counts[FRAME_UNKNOWN] for s in self.shards),
+            "ws_subscriptions_active": sum(len(s.symbols) for s in self.shards),
+            "ws_shard_count": len(self.shards),
+            "ws_shard_failovers": self.failovers,
+            "ws_shard_unassigned": len(self.unassigned),
+            "ws_shards": [],
+        }
+        for shard in self.shards:
+            out["ws_shards"].append(
+                {
+                    "shard": shard.index,
+                    "symbols": len(shard.symbols),
+                    "connected": shard.connected,
+                    "reconnect_count": shard.client.reconnect_count,
+                    "last_error": shard.client.last_error,
+                    "messages": shard.messages,
+                    "msg_rate_per_sec": round(shard.meter.rate(now), 3),
+                    "subscribe_ack_p50_ms": shard.client.metrics()["ws_subscribe_ack_p50_ms"],
+                }
+            )
+        return out
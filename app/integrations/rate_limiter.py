@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Callable, Dict
+
+PRIORITY_ORDER = "order"
+PRIORITY_ACCOUNT = "account"
+PRIORITY_QUOTE = "quote"
+
+# share of the bucket a class must leave untouched for the classes above it
+_DEFAULT_RESERVE_RATIO: Dict[str, float] = {
+    PRIORITY_ORDER: 0.0,
+    PRIORITY_ACCOUNT: 0.2,
+    PRIORITY_QUOTE: 0.4,
+}
+
+# KIS per-second REST quota per app key, kept slightly under the published limit
+DEFAULT_RATE_PER_SEC: Dict[str, float] = {"live": 18.0, "mock": 2.0}
+
+
+class RestRateLimiter:
+    """Token bucket shared by every KIS REST call made with one app key.
+
+    Tokens refill continuously at ``rate_per_sec`` up to ``burst``. Priority is expressed as
+    a reserve: a class may only take a token while the bucket keeps ``reserve_ratio * burst``
+    tokens for the classes above it, so a burst of quote fallbacks can never drain the tokens
+    an order needs, and under contention higher classes become eligible first. ``clock`` and
+    ``sleep`` are injectable so tests can drive the bucket with a fake clock.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate_per_sec: float,
+        burst: float | None = None,
+        reserve_ratio: Dict[str, float] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if rate_per_sec <= 0:
+            raise ValueError("rate_per_sec must be > 0")
+        self.rate_per_sec = float(rate_per_sec)
+        self.burst = max(1.0, float(burst if burst is not None else rate_per_sec))
+        ratios = dict(_DEFAULT_RESERVE_RATIO)
+        ratios.update(reserve_ratio or {})
+        self._reserve = {priority: ratio * self.burst for priority, ratio in ratios.items()}
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated_at = clock()
+        self.granted: Dict[str, int] = {priority: 0 for priority in ratios}
+        self.waited: Dict[str, int] = {priority: 0 for priority in ratios}
+        self.wait_ms_total: Dict[str, float] = {priority: 0.0 for priority in ratios}
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_sec)
+        self._updated_at = now
+
+    def try_acquire(self, priority: str = PRIORITY_QUOTE) -> float:
+        """Take a token if ``priority`` may; otherwise return the seconds until it could."""
+        needed = 1.0 + self._reserve[priority]
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= needed:
+                self._tokens -= 1.0
+                self.granted[priority] += 1
+                return 0.0
+            return (needed - self._tokens) / self.rate_per_sec
+
+    def _record_wait(self, priority: str, started: float, waited: bool) -> float:
+        waited_sec = self._clock() - started
+        if waited:
+            with self._lock:
+                self.waited[priority] += 1
+                self.wait_ms_total[priority] += waited_sec * 1000.0
+        return waited_sec
+
+    def acquire(self, priority: str = PRIORITY_QUOTE) -> float:
+        """Block until a token is granted; returns the seconds spent waiting."""
+        started = self._clock()
+        waited = False
+        while True:
+            delay = self.try_acquire(priority)
+            if delay <= 0:
+                break
+            waited = True
+            self._sleep(delay)
+        return self._record_wait(priority, started, waited)
+
+    async def acquire_async(self, priority: str = PRIORITY_QUOTE) -> float:
+        """``acquire`` for event-loop callers: waits with ``asyncio.sleep`` on the same bucket."""
+        started = self._clock()
+        waited = False
+        while True:
+            delay = self.try_acquire(priority)
+            if delay <= 0:
+                break
+            waited = True
+            await asyncio.sleep(delay)
+        return self._record_wait(priority, started, waited)
+
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "rest_limiter_rate_per_sec": self.rate_per_sec,
+            "rest_limiter_tokens": round(self.tokens(), 3),
+            "rest_limiter_granted": dict(self.granted),
+            "rest_limiter_waited": dict(self.waited),
+            "rest_limiter_wait_ms_total": {k: round(v, 3) for k, v in self.wait_ms_total.items()},
+        }
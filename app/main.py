@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import threading
 import time
@@ -9,11 +10,20 @@ from fastapi import FastAPI
 
 from app.api.routes import router
 from app.config.settings import get_settings
+from app.integrations.http_session import PooledSession
 from app.integrations.kis_rest import KisRestClient
+from app.integrations.kis_rest_async import AsyncKisRestClient
+from app.integrations.kis_token import KisTokenManager
 from app.integrations.kis_ws import KisWsClient
+from app.integrations.kis_ws_async import AsyncKisWsClient
+from app.integrations.kis_ws_shards import KisWsShardManager
+from app.integrations.rate_limiter import DEFAULT_RATE_PER_SEC, RestRateLimiter
+from app.services.auto_subscription import AutoSubscriptionManager
 from app.services.order_queue import order_queue
+from app.services.quote_bus import POLICY_FIFO, quote_bus
 from app.services.quote_cache import quote_cache, quote_ingest_worker
 from app.services.quote_gateway import QuoteGatewayService
+from app.services.quote_stream import quote_stream_hub
 from app.services.reconciliation import ReconciliationService
 
 
@@ -30,19 +40,107 @@ class _DemoRestQuoteClient:
 
 
 def _bind_runtime_clients(app: FastAPI, settings) -> None:
-    app.state.ws_client.env = settings.KIS_ENV
-    if app.state.ws_client._approval_key_client is None:
-        app.state.ws_client._approval_key_client = KisRestClient(
+    # every KIS REST client talks to the same host, so they share one keep-alive pool
+    http_session = PooledSession(pool_maxsize=int(os.getenv('KIS_HTTP_POOL_MAXSIZE', '16')))
+    app.state.kis_http_session = http_session
+    # one access token per app key for the whole process, refreshed ahead of expiry
+    token_manager = _create_token_manager(settings, http_session)
+    app.state.kis_token_manager = token_manager
+    ws_client = app.state.ws_client
+    # each shard gets its own approval key slot, hence its own WS session
+    # (API workers of a shared-memory deployment have no WS client; the ingest process owns it)
+    ws_clients = [] if ws_client is None else getattr(ws_client, 'clients', [ws_client])
+    for index, client in enumerate(ws_clients):
+        client.env = settings.KIS_ENV
+        if client._approval_key_client is None:
+            client._approval_key_client = KisRestClient(
+                app_key=settings.KIS_APP_KEY,
+                app_secret=settings.KIS_APP_SECRET,
+                env=settings.KIS_ENV,
+                session=http_session,
+                token_manager=token_manager,
+                approval_key_slot=f'ws-{index}',
+            )
+
+    # When runtime KIS env is available, bind portfolio-capable REST client.
+    # Quotes, orders and portfolio share this client, hence one token bucket for the app key.
+    rate_limiter = _create_rest_rate_limiter(settings.KIS_ENV)
+    app.state.quote_gateway_service.rest_client = KisRestClient(
+        app_key=settings.KIS_APP_KEY,
+        app_secret=settings.KIS_APP_SECRET,
+        env=settings.KIS_ENV,
+        session=http_session,
+        rate_limiter=rate_limiter,
+        token_manager=token_manager,
+    )
+    # KIS_REST_MODE=async serves quote/portfolio routes from an httpx client on the event loop
+    rest_mode = str(os.getenv('KIS_REST_MODE', 'sync')).strip().lower()
+    if rest_mode not in {'sync', 'async'}:
+        raise ValueError('KIS_REST_MODE must be one of: sync, async')
+    if rest_mode == 'async':
+        app.state.quote_gateway_service.async_rest_client = AsyncKisRestClient(
             app_key=settings.KIS_APP_KEY,
             app_secret=settings.KIS_APP_SECRET,
             env=settings.KIS_ENV,
+            rate_limiter=rate_limiter,
+            token_manager=token_manager,
         )
 
-    # When runtime KIS env is available, bind portfolio-capable REST client.
-    app.state.quote_gateway_service.rest_client = KisRestClient(
+
+def _create_token_manager(settings, http_session) -> KisTokenManager:
+    # KIS_TOKEN_CACHE_PATH="" keeps tokens in memory only (every restart re-issues)
+    cache_path = os.getenv('KIS_TOKEN_CACHE_PATH', f'.kis-token-{settings.KIS_ENV}.json')
+    issuer = KisRestClient(
         app_key=settings.KIS_APP_KEY,
         app_secret=settings.KIS_APP_SECRET,
         env=settings.KIS_ENV,
+        session=http_session,
+    )
+    return KisTokenManager(
+        issuer,
+        cache_path=cache_path,
+        refresh_ahead_sec=float(os.getenv('KIS_TOKEN_REFRESH_AHEAD_SEC', '300')),
+    )
+
+
+def _create_rest_rate_limiter(env: str) -> RestRateLimiter:
+    default_rate = DEFAULT_RATE_PER_SEC.get(env, DEFAULT_RATE_PER_SEC['mock'])
+    rate = float(os.getenv('KIS_REST_RATE_PER_SEC', str(default_rate)))
+    burst = os.getenv('KIS_REST_BURST')
+    return RestRateLimiter(rate_per_sec=rate, burst=float(burst) if burst else None)
+
+
+def _create_ws_client(**kwargs) -> KisWsClient | KisWsShardManager:
+    # KIS_WS_MODE=async runs the socket on the uvicorn loop instead of a dedicated thread
+    mode = str(os.getenv('KIS_WS_MODE', 'thread')).strip().lower()
+    shard_count = int(os.getenv('KIS_WS_SHARDS', '1'))
+    if mode not in {'thread', 'async'}:
+        raise ValueError('KIS_WS_MODE must be one of: thread, async')
+    if shard_count > 1:
+        if mode != 'thread':
+            raise ValueError('KIS_WS_SHARDS>1 requires KIS_WS_MODE=thread')
+        return KisWsShardManager(
+            shard_count=shard_count,
+            max_symbols_per_shard=int(os.getenv('KIS_WS_MAX_SYMBOLS_PER_SHARD', '40')),
+            **kwargs,
+        )
+    if mode == 'async':
+        return AsyncKisWsClient(**kwargs)
+    return KisWsClient(**kwargs)
+
+
+def _create_auto_subscription(ws_client) -> AutoSubscriptionManager | None:
+    # QUOTE_AUTO_SUBSCRIBE_SLOTS=0 (default) keeps the WS watchlist static
+    slots = int(os.getenv('QUOTE_AUTO_SUBSCRIBE_SLOTS', '0'))
+    if slots <= 0 or ws_client is None:
+        return None
+    per_session_cap = int(os.getenv('KIS_WS_MAX_SYMBOLS_PER_SHARD', '40'))
+    return AutoSubscriptionManager(
+        subscriber=ws_client,
+        slots=slots,
+        subscription_cap=per_session_cap * len(getattr(ws_client, 'clients', [ws_client])),
+        promote_score=float(os.getenv('QUOTE_AUTO_SUBSCRIBE_MIN_SCORE', '10')),
+        half_life_sec=float(os.getenv('QUOTE_AUTO_SUBSCRIBE_HALF_LIFE_SEC', '60')),
     )
 
 
@@ -55,55 +153,143 @@ def _should_enable_order_worker() -> bool:
 
 
 def _order_worker_loop(app: FastAPI, stop_event: threading.Event, interval_sec: float) -> None:
-    while not stop_event.wait(interval_sec):
+    # Blocks until enqueue signals work and then drains back to back; pacing comes from the
+    # REST rate limiter inside place_order. interval_sec only bounds an idle wait.
+    order_queue = app.state.order_queue
+    while not stop_event.is_set():
+        if not order_queue.wait_for_work(interval_sec) or stop_event.is_set():
+            continue
         try:
             adapter = getattr(app.state.quote_gateway_service, 'rest_client', None)
             if adapter is None or not hasattr(adapter, 'place_order'):
+                stop_event.wait(interval_sec)
                 continue
-            app.state.order_queue.process_next(adapter=adapter)
+            order_queue.process_next(adapter=adapter)
         except Exception:
             continue
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+def start_quote_runtime(app: FastAPI) -> dict:
+    """Start the quote side: KIS clients and token refresh, the quote bus and the WS worker.
+
+    Shared by the API lifespan and the ``app.ingest`` process; returns the handles
+    ``stop_quote_runtime`` needs.
+    """
+    token_manager = None
     try:
         settings = app.state.get_settings()
         _bind_runtime_clients(app, settings)
+        token_manager = app.state.kis_token_manager
     except Exception:
         # keep app import/lifecycle resilient in test env without KIS secrets
         pass
 
+    if token_manager is not None:
+        token_manager.start()
+        print("[KIS][token_refresh_start] thread=kis-token-refresh", flush=True)
+
+    app.state.quote_bus.start()
+    # demotes cold auto-subscribed symbols even when no quote requests arrive
+    auto_subscription = app.state.quote_gateway_service.auto_subscription
+    if auto_subscription is not None:
+        auto_subscription.start()
+
+    ws_worker = None
+    ws_task = None
+    if app.state.ws_client is None:
+        print("[WS][ws_worker_skip] reason=shared_quote_cache_reader", flush=True)
+    elif isinstance(app.state.ws_client, KisWsShardManager):
+        # each shard runs its own reconnect thread
+        try:
+            shard_symbols = app.state.get_settings().KIS_WS_SYMBOLS
+        except Exception as exc:
+            print(f"[WS][ws_shard_settings_error] {exc}", flush=True)
+            shard_symbols = []
+        app.state.ws_client.start(shard_symbols)
+        print(f"[WS][ws_worker_start] shards={len(app.state.ws_client.shards)}", flush=True)
+    elif isinstance(app.state.ws_client, AsyncKisWsClient):
+        ws_task = asyncio.create_task(
+            app.state.ws_client.run_with_reconnect(
+                connect_once=lambda: app.state.ws_client.connect_and_subscribe(
+                    symbols=app.state.get_settings().KIS_WS_SYMBOLS
+                )
+            ),
+            name='kis-ws-worker',
+        )
+        app.state.ws_worker_task = ws_task
+        print("[WS][ws_worker_start] task=kis-ws-worker", flush=True)
+    else:
+        ws_worker = threading.Thread(
+            target=lambda: app.state.ws_client.run_with_reconnect(
+                connect_once=lambda: app.state.ws_client.connect_and_subscribe(
+                    symbols=app.state.get_settings().KIS_WS_SYMBOLS
+                )
+            ),
+            daemon=True,
+            name='kis-ws-worker',
+        )
+        app.state.ws_worker_thread = ws_worker
+        print("[WS][ws_worker_start] thread=kis-ws-worker", flush=True)
+        ws_worker.start()
+
+    return {'token_manager': token_manager, 'ws_worker': ws_worker, 'ws_task': ws_task}
+
+
+async def stop_quote_runtime(app: FastAPI, runtime: dict) -> None:
+    if app.state.quote_gateway_service.auto_subscription is not None:
+        app.state.quote_gateway_service.auto_subscription.stop()
+    if app.state.ws_client is not None:
+        app.state.ws_client.stop()
+    if runtime['token_manager'] is not None:
+        runtime['token_manager'].stop()
+    app.state.quote_gateway_service.close()
+    http_session = getattr(app.state, 'kis_http_session', None)
+    if http_session is not None:
+        http_session.close()
+    async_rest_client = app.state.quote_gateway_service.async_rest_client
+    if async_rest_client is not None:
+        await async_rest_client.aclose()
+    if runtime['ws_task'] is not None:
+        try:
+            await asyncio.wait_for(runtime['ws_task'], timeout=1.0)
+        except (asyncio.TimeoutError, asyncio.CancelledError, Exception):
+            pass
+        print("[WS][ws_worker_stop] task=kis-ws-worker", flush=True)
+    elif runtime['ws_worker'] is not None:
+        runtime['ws_worker'].join(timeout=1.0)
+        print("[WS][ws_worker_stop] thread=kis-ws-worker", flush=True)
+    app.state.quote_bus.stop()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    quote_runtime = start_quote_runtime(app)
     app.state.reconciliation_worker.start()
 
-    order_worker_thread = None
+    order_worker_threads: list[threading.Thread] = []
     order_worker_stop_event = None
     if _should_enable_order_worker():
         order_worker_stop_event = threading.Event()
         app.state.order_worker_stop_event = order_worker_stop_event
         interval_sec = float(os.getenv('ORDER_WORKER_INTERVAL_SEC', '0.5'))
-        order_worker_thread = threading.Thread(
-            target=_order_worker_loop,
-            args=(app, order_worker_stop_event, interval_sec),
-            daemon=True,
-            name='order-worker',
-        )
-        app.state.order_worker_thread = order_worker_thread
-        print("[ORDER][worker_start] thread=order-worker", flush=True)
-        order_worker_thread.start()
-
-    ws_worker = threading.Thread(
-        target=lambda: app.state.ws_client.run_with_reconnect(
-            connect_once=lambda: app.state.ws_client.connect_and_subscribe(
-                symbols=app.state.get_settings().KIS_WS_SYMBOLS
+        # each worker claims from a different (account, symbol) partition; see OrderQueue
+        worker_count = max(1, int(os.getenv('ORDER_WORKER_COUNT', '1')))
+        for index in range(worker_count):
+            order_worker_threads.append(
+                threading.Thread(
+                    target=_order_worker_loop,
+                    args=(app, order_worker_stop_event, interval_sec),
+                    daemon=True,
+                    name=f'order-worker-{index}',
+                )
             )
-        ),
-        daemon=True,
-        name='kis-ws-worker',
-    )
-    app.state.ws_worker_thread = ws_worker
-    print("[WS][ws_worker_start] thread=kis-ws-worker", flush=True)
-    ws_worker.start()
+        app.state.order_worker_threads = order_worker_threads
+        print(
+            f"[ORDER][worker_start] threads={worker_count} max_in_flight={app.state.order_queue.max_in_flight}",
+            flush=True,
+        )
+        for thread in order_worker_threads:
+            thread.start()
 
     try:
         yield
@@ -111,12 +297,14 @@ async def lifespan(app: FastAPI):
         app.state.reconciliation_worker.stop()
         if order_worker_stop_event is not None:
             order_worker_stop_event.set()
-        if order_worker_thread is not None and order_worker_thread.is_alive():
-            order_worker_thread.join(timeout=1.0)
-            print("[ORDER][worker_stop] thread=order-worker", flush=True)
-        app.state.ws_client.stop()
-        ws_worker.join(timeout=1.0)
-        print("[WS][ws_worker_stop] thread=kis-ws-worker", flush=True)
+            app.state.order_queue.wake()
+        for thread in order_worker_threads:
+            thread.join(timeout=1.0)
+        if order_worker_threads:
+            print(f"[ORDER][worker_stop] threads={len(order_worker_threads)}", flush=True)
+        await stop_quote_runtime(app, quote_runtime)
+        if app.state.order_queue.wal is not None:
+            app.state.order_queue.wal.sync()
 
 
 app = FastAPI(title="KIS Trading Gateway", version="0.1.0", lifespan=lifespan)
@@ -124,13 +312,23 @@ app.include_router(router, prefix="/v1")
 
 # NOTE: lazy-loaded so app import does not require env during tests.
 app.state.get_settings = get_settings
-app.state.ws_client = KisWsClient(
-    on_message=quote_ingest_worker.on_ws_message,
+quote_ingest_worker.add_listener(quote_stream_hub.publish)
+app.state.quote_stream_hub = quote_stream_hub
+# WS thread only enqueues; cache ingest drains tick-by-tick on its own bus thread
+quote_bus.subscribe('quote-ingest', quote_ingest_worker.on_ws_batch, policy=POLICY_FIFO)
+app.state.quote_bus = quote_bus
+# QUOTE_CACHE_MODE=shm reader: quotes come from the ingest process (python -m app.ingest),
+# so this worker must not open a second KIS WS session
+app.state.ws_client = None if getattr(quote_cache, 'read_only', False) else _create_ws_client(
+    on_batch=quote_bus.publish,
     on_state_change=quote_ingest_worker.sync_ws_state,
 )
 app.state.quote_gateway_service = QuoteGatewayService(
     quote_cache=quote_cache,
     rest_client=_DemoRestQuoteClient(),
+    auto_subscription=_create_auto_subscription(app.state.ws_client),
+    rest_concurrency=int(os.getenv('QUOTE_REST_CONCURRENCY', '4')),
+    batch_deadline_sec=float(os.getenv('QUOTE_BATCH_DEADLINE_SEC', '0')),
 )
 app.state.order_queue = order_queue
 app.state.reconciliation_worker = ReconciliationService(order_queue=order_queue)
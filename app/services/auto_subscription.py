@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any
+
+
+class AutoSubscriptionManager:
+    """Promotes frequently requested symbols from REST fallback to WS subscriptions.
+
+    Each symbol carries an exponentially decayed request score (``half_life_sec``). A symbol
+    that misses the WS cache while its score is at least ``promote_score`` is subscribed on
+    ``subscriber`` (a ``KisWsClient`` or ``KisWsShardManager``). Promoted symbols are bounded
+    by ``slots`` and by the connection's ``subscription_cap``; when full, the coldest promoted
+    symbol (lowest decayed score, i.e. LFU with decay) is demoted if the candidate is at least
+    ``swap_ratio`` times hotter. Symbols that cool below ``demote_score`` are released by the
+    sweep, which runs every ``sweep_interval_sec`` on ``record()`` and on the ``start()`` thread,
+    so a symbol is demoted even after its requests stop entirely. Symbols subscribed by anyone
+    else (e.g. ``KIS_WS_SYMBOLS``) are never touched.
+    """
+
+    def __init__(
+        self,
+        *,
+        subscriber: Any,
+        slots: int,
+        subscription_cap: int | None = None,
+        promote_score: float = 10.0,
+        demote_score: float = 1.0,
+        half_life_sec: float = 60.0,
+        swap_ratio: float = 2.0,
+        sweep_interval_sec: float = 5.0,
+        max_events: int = 50,
+    ) -> None:
+        self.subscriber = subscriber
+        self.slots = max(0, int(slots))
+        self.subscription_cap = subscription_cap
+        self.promote_score = promote_score
+        self.demote_score = demote_score
+        self.half_life_sec = max(1e-6, float(half_life_sec))
+        self.swap_ratio = swap_ratio
+        self.sweep_interval_sec = sweep_interval_sec
+        self._lock = threading.Lock()
+        # symbol -> (score at last_ts, last_ts)
+        self._scores: dict[str, tuple[float, float]] = {}
+        self.promoted: dict[str, float] = {}
+        self._last_sweep: float | None = None
+        self.events: deque[dict] = deque(maxlen=max_events)
+        self.promotions = 0
+        self.demotions = 0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _decayed(self, symbol: str, now: float) -> float:
+        entry = self._scores.get(symbol)
+        if entry is None:
+            return 0.0
+        score, last_ts = entry
+        return score * 0.5 ** (max(0.0, now - last_ts) / self.half_life_sec)
+
+    def score(self, symbol: str, now: float | None = None) -> float:
+        ref = time.time() if now is None else now
+        with self._lock:
+            return self._decayed(symbol, ref)
+
+    def record(self, symbol: str, *, ws_miss: bool, now: float | None = None) -> None:
+        """Count one request; ``ws_miss`` means it could not be served from a fresh WS row."""
+        if self.slots <= 0:
+            return
+        ref = time.time() if now is None else now
+        actions: list[tuple[str, str, float, str]] = []
+        with self._lock:
+            score = self._decayed(symbol, ref) + 1.0
+            self._scores[symbol] = (score, ref)
+            if self._last_sweep is None or ref - self._last_sweep >= self.sweep_interval_sec:
+                self._last_sweep = ref
+                actions.extend(self._sweep_locked(ref))
+            if ws_miss and symbol not in self.promoted and score >= self.promote_score:
+                actions.extend(self._promote_locked(symbol, score, ref))
+        # socket sends happen outside the lock
+        for action, sym, sym_score, reason in actions:
+            self._apply(action, sym, sym_score, reason, ref)
+
+    def sweep(self, now: float | None = None) -> None:
+        """Demote promoted symbols that have cooled below ``demote_score``."""
+        ref = time.time() if now is None else now
+        with self._lock:
+            self._last_sweep = ref
+            actions = self._sweep_locked(ref)
+        for action, sym, sym_score, reason in actions:
+            self._apply(action, sym, sym_score, reason, ref)
+
+    def _loop(self) -> None:
+        while not self._stop_event.wait(self.sweep_interval_sec):
+            try:
+                self.sweep()
+            except Exception as exc:
+                print(f"[QUOTE][auto_subscribe_error] sweep error={exc}", flush=True)
+
+    def start(self) -> None:
+        if self.slots <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="auto-subscription-sweep")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+
+    def _sweep_locked(self, now: float) -> list[tuple[str, str, float, str]]:
+        actions = []
+        for symbol in list(self.promoted):
+            current = self._decayed(symbol, now)
+            if current < self.demote_score:
+                del self.promoted[symbol]
+                actions.append(("demote", symbol, current, "cold"))
+        # forget long-idle, unpromoted symbols so tracking stays bounded
+        for symbol in [s for s in self._scores if s not in self.promoted and self._decayed(s, now) < 0.01]:
+            del self._scores[symbol]
+        return actions
+
+    def _free_slots(self) -> int:
+        free = self.slots - len(self.promoted)
+        if self.subscription_cap is not None:
+            free = min(free, self.subscription_cap - len(self.subscriber.active_symbols()))
+        return free
+
+    def _promote_locked(self, symbol: str, score: float, now: float) -> list[tuple[str, str, float, str]]:
+        if symbol in self.subscriber.active_symbols():
+            return []  # already streamed (static watchlist or manual subscription)
+        actions = []
+        if self._free_slots() <= 0:
+            victim = min(self.promoted, key=lambda s: self._decayed(s, now), default=None)
+            if victim is None:
+                return []
+            victim_score = self._decayed(victim, now)
+            if score < victim_score * self.swap_ratio:
+                return []
+            del self.promoted[victim]
+            actions.append(("demote", victim, victim_score, f"evicted_by:{symbol}"))
+        self.promoted[symbol] = now
+        actions.append(("promote", symbol, score, "hot"))
+        return actions
+
+    def _apply(self, action: str, symbol: str, score: float, reason: str, now: float) -> None:
+        if action == "promote":
+            self.subscriber.subscribe(symbol)
+            self.promotions += 1
+        else:
+            self.subscriber.unsubscribe(symbol)
+            self.demotions += 1
+        self.events.append({"ts": int(now), "action": action, "symbol": symbol, "score": round(score, 3), "reason": reason})
+        print(f"[QUOTE][auto_subscribe] action={action} symbol={symbol} score={score:.2f} reason={reason}", flush=True)
+
+    def metrics(self) -> dict:
+        return {
+            "auto_sub_slots": self.slots,
+            "auto_sub_active": sorted(self.promoted),
+            "auto_sub_promotions": self.promotions,
+            "auto_sub_demotions": self.demotions,
+            "auto_sub_tracked": len(self._scores),
+            "auto_sub_events": list(self.events),
+        }
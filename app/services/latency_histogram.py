@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import bisect
+import threading
+
+# upper bounds in milliseconds; the last bucket is open-ended
+DEFAULT_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (Prometheus-style cumulative buckets in ``metrics``).
+
+    Percentiles are the upper bound of the bucket the rank falls in (capped at the observed
+    max), so they over-estimate by at most one bucket width; ``max`` is exact.
+    """
+
+    def __init__(self, name: str, bounds_ms: tuple[float, ...] = DEFAULT_BOUNDS_MS) -> None:
+        self.name = name
+        self.bounds_ms = tuple(sorted(bounds_ms))
+        self._counts = [0] * (len(self.bounds_ms) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        ms = max(0.0, seconds * 1000.0)
+        index = bisect.bisect_left(self.bounds_ms, ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum_ms += ms
+            if ms > self._max_ms:
+                self._max_ms = ms
+
+    def _percentile(self, counts: list[int], total: int, max_ms: float, q: float) -> float | None:
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                if index < len(self.bounds_ms) and self.bounds_ms[index] < max_ms:
+                    return self.bounds_ms[index]
+                return round(max_ms, 3)
+        return round(max_ms, 3)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            sum_ms = self._sum_ms
+            max_ms = self._max_ms
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.bounds_ms, counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = total
+        prefix = self.name
+        return {
+            f"{prefix}_count": total,
+            f"{prefix}_avg_ms": round(sum_ms / total, 3) if total else None,
+            f"{prefix}_p50_ms": self._percentile(counts, total, max_ms, 0.50),
+            f"{prefix}_p90_ms": self._percentile(counts, total, max_ms, 0.90),
+            f"{prefix}_p99_ms": self._percentile(counts, total, max_ms, 0.99),
+            f"{prefix}_max_ms": round(max_ms, 3),
+            f"{prefix}_buckets_ms": cumulative,
+        }
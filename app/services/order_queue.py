@@ -1,20 +1,78 @@
 from __future__ import annotations
 
 import hashlib
+import heapq
+import itertools
 import json
+import os
+import random
+import threading
 import time
 import uuid
 from collections import deque
+from contextlib import nullcontext
 
 from app.schemas.order import OrderAccepted, OrderRequest
+from app.services.latency_histogram import LatencyHistogram
+from app.services.order_store import DEFAULT_LIST_LIMIT, InMemoryOrderStore, SqliteOrderStore
+from app.services.order_wal import OrderWal
+
+
+# /v1/metrics/order lists only the deepest partitions
+_PARTITION_DEPTH_TOP = 20
+
+
+def partition_key(request: dict) -> str:
+    """Orders with the same key are sent one at a time, in order; different keys run in parallel."""
+    return f"{request.get('account_id', '')}:{request.get('symbol', '')}"
 
 
 class OrderQueue:
-    def __init__(self) -> None:
+    """Accepted orders, their idempotency records, and the dispatch queue.
+
+    ``queue`` is the intake FIFO. Dispatch (``process_next``) moves intake into one FIFO per
+    ``(account_id, symbol)`` partition and claims from partitions that have nothing in flight,
+    round-robin, so several workers can call ``process_next`` concurrently while each
+    partition still sends strictly in order. ``max_in_flight`` (0 = no cap beyond the number
+    of workers) caps concurrent ``place_order`` calls across all partitions.
+
+    A retryable failure parks the order at the head of its partition until its backoff
+    (``retry_backoff_sec * 2 ** (attempts - 1)``, capped at ``retry_backoff_max_sec``, with
+    equal jitter) expires; parked partitions sit in a heap keyed by due time, and
+    ``wait_for_work`` sleeps until the earliest one is due.
+    """
+
+    def __init__(
+        self,
+        wal: OrderWal | None = None,
+        store=None,
+        max_in_flight: int = 0,
+        *,
+        retry_backoff_sec: float = 0.2,
+        retry_backoff_max_sec: float = 5.0,
+        clock=time.monotonic,
+    ) -> None:
         self.queue: deque[str] = deque()
-        self.idem: dict[str, OrderAccepted] = {}
-        self.idem_body_hash: dict[str, str] = {}
-        self.jobs: dict[str, dict] = {}
+        # guards queue/partition bookkeeping; signalled whenever an order becomes claimable
+        self._ready = threading.Condition()
+        self.max_in_flight = max(0, int(max_in_flight))
+        self.retry_backoff_sec = max(0.0, float(retry_backoff_sec))
+        self.retry_backoff_max_sec = max(self.retry_backoff_sec, float(retry_backoff_max_sec))
+        self._clock = clock
+        # (due on self._clock, tie-break, partition key) for partitions parked behind a retry
+        self._delayed: list[tuple[float, int, str]] = []
+        self._delay_seq = itertools.count()
+        self._partitions: dict[str, deque[str]] = {}
+        self._ready_keys: deque[str] = deque()  # partitions with queued orders and nothing in flight
+        self._busy: set[str] = set()
+        self._in_flight = 0
+        self._partition_of: dict[str, str] = {}
+        self._counter_lock = threading.Lock()
+        # monotonic accept time per order still waiting for its first SENT, for the latency histogram
+        self._enqueued_at: dict[str, float] = {}
+        self.dispatch_latency = LatencyHistogram("dispatch_latency")
+        # order rows + idempotency records; InMemoryOrderStore unless a persistent backend is given
+        self.store = store if store is not None else InMemoryOrderStore()
         self.metrics_counters = {
             "accepted": 0,
             "deduplicated": 0,
@@ -26,22 +84,43 @@ class OrderQueue:
             "retry_exhausted": 0,
             "terminal": 0,
         }
+        # optional write-ahead log; when set, state is rebuilt from it before first use
+        self.wal = wal
+        self.recovered = {"jobs": 0, "queued": 0, "in_flight": 0}
+        if wal is not None:
+            self._recover()
+        elif self.store.persistent:
+            self._recover_from_store()
+
+    @property
+    def jobs(self):
+        return self.store.jobs
+
+    @property
+    def idem(self):
+        return self.store.idem
+
+    @property
+    def idem_body_hash(self):
+        return self.store.idem_body_hash
 
     def _inc(self, key: str, value: int = 1) -> None:
-        self.metrics_counters[key] = self.metrics_counters.get(key, 0) + value
+        with self._counter_lock:
+            self.metrics_counters[key] = self.metrics_counters.get(key, 0) + value
 
     def enqueue(self, req: OrderRequest, idem_key: str) -> OrderAccepted:
         body_hash = self._hash_request(req)
 
-        if idem_key in self.idem:
-            if self.idem_body_hash.get(idem_key) != body_hash:
+        existing = self.store.get_idem(idem_key)
+        if existing is not None:
+            if existing[1] != body_hash:
                 raise ValueError("IDEMPOTENCY_KEY_BODY_MISMATCH")
             self._inc("deduplicated")
-            return self.idem[idem_key]
+            return existing[0]
 
         oid = f"ord_{int(time.time())}_{uuid.uuid4().hex[:8]}"
         accepted = OrderAccepted(order_id=oid, status="ACCEPTED", idempotency_key=idem_key)
-        self.jobs[oid] = {
+        job = {
             "order_id": oid,
             "request": req.model_dump(),
             "status": "NEW",
@@ -51,14 +130,170 @@ class OrderQueue:
             "broker_order_id": None,
             "attempts": 0,
             "max_attempts": 3,
+            "next_attempt_at": None,
             "terminal": False,
         }
-        self.queue.append(oid)
-        self.idem[idem_key] = accepted
-        self.idem_body_hash[idem_key] = body_hash
+        with self._mutation():
+            if self.wal is not None:
+                # durable before the client sees ACCEPTED, so a retry after a crash dedups
+                self.wal.append(
+                    {
+                        "op": "accept",
+                        "idem_key": idem_key,
+                        "body_hash": body_hash,
+                        "accepted": accepted.model_dump(),
+                        "job": job,
+                    }
+                )
+            self.store.accept(job, idem_key, accepted, body_hash)
+            self._enqueued_at[oid] = time.monotonic()
+            self._partition_of[oid] = partition_key(job["request"])
+            self._push(oid)
         self._inc("accepted")
+        self._maybe_snapshot()
         return accepted
 
+    def persist(self, job: dict) -> None:
+        """Store and log ``job``'s current state; call after every transition made outside this class."""
+        with self._mutation():
+            if self.wal is not None:
+                self.wal.append({"op": "job", "job": job})
+            self.store.put(job)
+        self._maybe_snapshot()
+
+    def _mutation(self):
+        # a snapshot between the log append and the store apply would drop the mutation
+        return self.wal.mutation() if self.wal is not None else nullcontext()
+
+    def _push(self, oid: str) -> None:
+        with self._ready:
+            self.queue.append(oid)
+            self._ready.notify()
+
+    def _route_intake(self) -> None:
+        # caller holds self._ready
+        while self.queue:
+            oid = self.queue.popleft()
+            key = self._partition_of.pop(oid, None)
+            backoff = 0.0
+            if key is None:
+                # recovered after a restart, or enqueued behind this class's back
+                job = self.store.get(oid)
+                if job is None:
+                    continue
+                key = partition_key(job.get("request", {}))
+                if job.get("next_attempt_at"):
+                    backoff = float(job["next_attempt_at"]) - time.time()
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = self._partitions[key] = deque()
+            if not partition and key not in self._busy:
+                if backoff > 0:
+                    # a retry recovered mid-backoff still waits out the rest of it
+                    heapq.heappush(self._delayed, (self._clock() + backoff, next(self._delay_seq), key))
+                else:
+                    self._ready_keys.append(key)
+            partition.append(oid)
+
+    def _promote_due(self) -> None:
+        # caller holds self._ready
+        now = self._clock()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, key = heapq.heappop(self._delayed)
+            if self._partitions.get(key):
+                self._ready_keys.append(key)
+
+    def _claimable(self) -> bool:
+        # caller holds self._ready
+        self._route_intake()
+        self._promote_due()
+        return bool(self._ready_keys) and (self.max_in_flight == 0 or self._in_flight < self.max_in_flight)
+
+    def _claim(self) -> tuple[str, str] | None:
+        with self._ready:
+            if not self._claimable():
+                return None
+            key = self._ready_keys.popleft()
+            oid = self._partitions[key].popleft()
+            self._busy.add(key)
+            self._in_flight += 1
+            return oid, key
+
+    def _release(self, key: str, retry: tuple[str, float] | None = None) -> None:
+        with self._ready:
+            self._busy.discard(key)
+            self._in_flight -= 1
+            partition = self._partitions.get(key)
+            if retry is not None:
+                # a retry goes back to the head of its partition so later orders for the
+                # same account/symbol cannot overtake it, and the partition waits out the backoff
+                retry_oid, delay = retry
+                partition.appendleft(retry_oid)
+                if delay > 0:
+                    heapq.heappush(self._delayed, (self._clock() + delay, next(self._delay_seq), key))
+                    # a waiter recomputes its sleep against the new earliest due time
+                    self._ready.notify()
+                    return
+            if partition:
+                self._ready_keys.append(key)
+            else:
+                self._partitions.pop(key, None)
+            self._ready.notify()
+
+    def queued_ids(self) -> list[str]:
+        """Order ids waiting for dispatch (not in flight), per-partition order preserved."""
+        with self._ready:
+            partitioned = [oid for partition in self._partitions.values() for oid in partition]
+            return partitioned + list(self.queue)
+
+    def wait_for_work(self, timeout: float | None = None) -> bool:
+        """Block until an order can be claimed (True) or ``timeout`` elapses / ``wake`` is called (False).
+
+        Never sleeps past the earliest parked retry, so backoff expiry needs no polling.
+        """
+        with self._ready:
+            if not self._claimable():
+                if self._delayed:
+                    until_due = max(0.0, self._delayed[0][0] - self._clock())
+                    timeout = until_due if timeout is None else min(timeout, until_due)
+                self._ready.wait(timeout)
+            return self._claimable()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before retry number ``attempts``: exponential, capped, with equal jitter."""
+        delay = min(self.retry_backoff_max_sec, self.retry_backoff_sec * (2 ** max(0, attempts - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def wake(self) -> None:
+        """Release every ``wait_for_work`` caller, e.g. so a worker can see its stop flag."""
+        with self._ready:
+            self._ready.notify_all()
+
+    def get_job(self, order_id: str) -> dict | None:
+        return self.store.get(order_id)
+
+    def list_jobs(
+        self,
+        *,
+        status: str | None = None,
+        account_id: str | None = None,
+        symbol: str | None = None,
+        updated_since: int | None = None,
+        limit: int = DEFAULT_LIST_LIMIT,
+    ) -> list[dict]:
+        """Most recently updated first; served from the store's indexes where it has them."""
+        return self.store.list_jobs(
+            status=status,
+            account_id=account_id,
+            symbol=symbol,
+            updated_since=updated_since,
+            limit=limit,
+        )
+
+    def active_jobs(self) -> list[dict]:
+        """Non-terminal orders, oldest first: the set reconciliation has to check."""
+        return self.store.list_active()
+
     @staticmethod
     def _map_adapter_error(exc: Exception) -> str:
         text = str(exc).upper()
@@ -80,16 +315,33 @@ class OrderQueue:
         reason: str | None = None,
         adapter=None,
     ) -> dict | None:
-        if not self.queue:
-            return None
+        while True:
+            claimed = self._claim()
+            if claimed is None:
+                return None
+            oid, key = claimed
+            retry: list[tuple[str, float]] = []
+            try:
+                job = self.store.get(oid)
+                if job is None:
+                    # dropped from the store while queued
+                    continue
+                return self._dispatch(oid, job, success, reason, adapter, retry)
+            finally:
+                self._release(key, retry[0] if retry else None)
 
-        oid = self.queue.popleft()
-        job = self.jobs[oid]
+    def _dispatch(
+        self, oid: str, job: dict, success: bool, reason: str | None, adapter, retry: list[tuple[str, float]]
+    ) -> dict:
         if job.get("terminal"):
+            self._enqueued_at.pop(oid, None)
             return job
 
         job["status"] = "DISPATCHING"
+        job["next_attempt_at"] = None
         job["updated_at"] = int(time.time())
+        # write-ahead: a crash after this point leaves the order marked in flight, never re-sent
+        self.persist(job)
 
         if adapter is not None:
             req = job["request"]
@@ -107,13 +359,16 @@ class OrderQueue:
                 job["error"] = None
                 job["broker_order_id"] = result.get("broker_order_id")
                 self._inc("sent")
+                self._observe_dispatch(oid)
             except Exception as exc:  # pragma: no cover
                 mapped_error = self._map_adapter_error(exc)
                 max_attempts = int(job.get("max_attempts", 3))
                 if self._is_retryable(mapped_error) and job["attempts"] < max_attempts:
+                    delay = self.retry_delay(job["attempts"])
                     job["status"] = "NEW"
                     job["error"] = mapped_error
-                    self.queue.append(oid)
+                    job["next_attempt_at"] = round(time.time() + delay, 3)
+                    retry.append((oid, delay))
                     self._inc("retried")
                 else:
                     if self._is_retryable(mapped_error) and job["attempts"] >= max_attempts:
@@ -123,17 +378,21 @@ class OrderQueue:
                         job["error"] = mapped_error
                     job["status"] = "REJECTED"
                     job["terminal"] = True
+                    self._enqueued_at.pop(oid, None)
                     self._inc("rejected")
                     self._inc("terminal")
 
             job["updated_at"] = int(time.time())
+            self.persist(job)
             self._inc("processed")
             return job
 
         if success:
             job["status"] = "SENT"
             self._inc("sent")
+            self._observe_dispatch(oid)
         else:
+            self._enqueued_at.pop(oid, None)
             job["status"] = "REJECTED"
             job["error"] = reason or "unknown"
             job["terminal"] = True
@@ -141,11 +400,20 @@ class OrderQueue:
             self._inc("terminal")
 
         job["updated_at"] = int(time.time())
+        self.persist(job)
         self._inc("processed")
         return job
 
+    def _observe_dispatch(self, oid: str) -> None:
+        # orders recovered after a restart have no accept time in this process and are skipped
+        enqueued_at = self._enqueued_at.pop(oid, None)
+        if enqueued_at is not None:
+            self.dispatch_latency.observe(time.monotonic() - enqueued_at)
+
     def mark_execution_result(self, order_id: str, status: str, reason: str | None = None) -> dict:
-        job = self.jobs[order_id]
+        job = self.store.get(order_id)
+        if job is None:
+            raise KeyError(order_id)
         normalized = status.upper()
         if normalized not in {"FILLED", "REJECTED"}:
             raise ValueError("INVALID_FINAL_STATUS")
@@ -164,16 +432,17 @@ class OrderQueue:
             self._inc("rejected")
 
         self._inc("terminal")
+        self.persist(job)
         return job
 
     def get_status(self, order_id: str) -> str | None:
-        job = self.jobs.get(order_id)
+        job = self.store.get(order_id)
         if not job:
             return None
         return str(job["status"])
 
     def request_cancel(self, order_id: str) -> dict:
-        job = self.jobs.get(order_id)
+        job = self.store.get(order_id)
         if not job:
             raise KeyError("ORDER_NOT_FOUND")
         if job.get("terminal"):
@@ -181,10 +450,11 @@ class OrderQueue:
 
         job["status"] = "CANCEL_PENDING"
         job["updated_at"] = int(time.time())
+        self.persist(job)
         return job
 
     def request_modify(self, order_id: str, *, qty: int, price: float | None = None) -> dict:
-        job = self.jobs.get(order_id)
+        job = self.store.get(order_id)
         if not job:
             raise KeyError("ORDER_NOT_FOUND")
         if job.get("terminal"):
@@ -196,6 +466,7 @@ class OrderQueue:
 
         job["status"] = "MODIFY_PENDING"
         job["updated_at"] = int(time.time())
+        self.persist(job)
         return job
 
     def metrics(self) -> dict:
@@ -211,14 +482,168 @@ class OrderQueue:
             "terminal": 0,
         }
         merged = {k: self.metrics_counters.get(k, 0) for k in base}
-        return {
-            "queue_depth": len(self.queue),
+        out = {
             **merged,
+            **self._partition_metrics(),
+            **self.store.metrics(),
+            **self.dispatch_latency.metrics(),
         }
+        if self.wal is not None:
+            out.update(self.wal.metrics())
+        if self.wal is not None or self.store.persistent:
+            prefix = "wal" if self.wal is not None else "store"
+            out[f"{prefix}_recovered_jobs"] = self.recovered["jobs"]
+            out[f"{prefix}_recovered_queued"] = self.recovered["queued"]
+            out[f"{prefix}_recovered_in_flight"] = self.recovered["in_flight"]
+        return out
+
+    def _partition_metrics(self) -> dict:
+        with self._ready:
+            self._route_intake()
+            depths = {key: len(partition) for key, partition in self._partitions.items() if partition}
+            out = {
+                "queue_depth": sum(depths.values()) + len(self.queue),
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "partitions_queued": len(depths),
+                "partitions_busy": len(self._busy),
+                "retry_parked": len(self._delayed),
+                "retry_next_due_ms": (
+                    round(max(0.0, self._delayed[0][0] - self._clock()) * 1000, 1) if self._delayed else None
+                ),
+            }
+        deepest = sorted(depths.items(), key=lambda item: (-item[1], item[0]))[:_PARTITION_DEPTH_TOP]
+        out["partition_depth_max"] = deepest[0][1] if deepest else 0
+        out["partition_depths"] = dict(deepest)
+        return out
+
+    def _capture_state(self) -> dict:
+        # taken while mutations are held off; see OrderStore.dump for the copy semantics
+        return {**self.store.dump(), "queue": self.queued_ids()}
+
+    def snapshot(self) -> None:
+        if self.wal is not None:
+            self.wal.snapshot(self._capture_state)
+
+    def _maybe_snapshot(self) -> None:
+        if self.wal is not None and self.wal.snapshot_due():
+            self.snapshot()
+
+    def _recover(self) -> None:
+        snapshot, records = self.wal.load()
+        jobs: dict[str, dict] = {}
+        idem: dict[str, tuple[OrderAccepted, str]] = {}
+        # queued order ids; re-queued retries keep their accept position so each
+        # partition still dispatches in accept order after a restart
+        queued: dict[str, None] = {}
+        accept_seq: dict[str, int] = {}
+        if snapshot:
+            jobs.update(snapshot.get("jobs", {}))
+            body_hashes = snapshot.get("idem_body_hash", {})
+            for key, row in snapshot.get("idem", {}).items():
+                idem[key] = (OrderAccepted(**row), body_hashes.get(key, ""))
+            # the snapshot queue is already in dispatch order; other jobs follow in store order
+            for oid in [*snapshot.get("queue", []), *jobs]:
+                accept_seq.setdefault(oid, len(accept_seq))
+            queued.update(dict.fromkeys(snapshot.get("queue", [])))
+            # a retry persisted as NEW but not yet handed back to its partition when the
+            # snapshot ran is in no queue; it still has to go out
+            queued.update(
+                dict.fromkeys(
+                    oid for oid, job in jobs.items() if job.get("status") == "NEW" and not job.get("terminal")
+                )
+            )
+        for record in records:
+            job = record["job"]
+            oid = job["order_id"]
+            if jobs.get(oid, {}).get("terminal") and not job.get("terminal"):
+                # logged from a stale copy after the order was finalized; the store ignores it too
+                continue
+            jobs[oid] = job
+            if record["op"] == "accept":
+                idem[record["idem_key"]] = (OrderAccepted(**record["accepted"]), record["body_hash"])
+                accept_seq.setdefault(oid, len(accept_seq))
+                queued[oid] = None
+            elif job.get("terminal") or job.get("status") == "DISPATCHING":
+                queued.pop(oid, None)
+            elif job.get("status") == "NEW":
+                queued[oid] = None
+        in_flight = self._mark_in_flight(job for oid, job in jobs.items() if oid not in queued)
+        self.store.put_many(list(jobs.values()), [(key, *entry) for key, entry in idem.items()])
+        ordered = sorted(queued, key=lambda oid: accept_seq.get(oid, len(accept_seq)))
+        self.queue.extend(oid for oid in ordered if not jobs[oid].get("terminal"))
+        self.recovered = {"jobs": len(jobs), "queued": len(self.queue), "in_flight": in_flight}
+        if jobs:
+            print(
+                f"[ORDER][wal_recovered] jobs={len(jobs)} queued={len(self.queue)} in_flight={in_flight}",
+                flush=True,
+            )
+
+    def _recover_from_store(self) -> None:
+        # a persistent store without a WAL: rows are current, only the dispatch order is lost,
+        # so NEW orders are re-queued oldest first (insertion order breaks same-second ties)
+        active = self.store.list_active()
+        in_flight_jobs = [job for job in active if job.get("status") == "DISPATCHING"]
+        in_flight = self._mark_in_flight(in_flight_jobs)
+        self.store.put_many(in_flight_jobs)
+        self.queue.extend(job["order_id"] for job in active if job.get("status") == "NEW")
+        self.recovered = {"jobs": len(self.store), "queued": len(self.queue), "in_flight": in_flight}
+        if active:
+            print(
+                f"[ORDER][store_recovered] jobs={self.recovered['jobs']} queued={len(self.queue)} in_flight={in_flight}",
+                flush=True,
+            )
+
+    @staticmethod
+    def _mark_in_flight(jobs) -> int:
+        in_flight = 0
+        for job in jobs:
+            if job.get("status") == "DISPATCHING" and not job.get("terminal"):
+                # may or may not have reached KIS; leave it for reconciliation, never re-send
+                job["error"] = "RECOVERED_IN_FLIGHT"
+                in_flight += 1
+        return in_flight
 
     def _hash_request(self, req: OrderRequest) -> str:
         payload = json.dumps(req.model_dump(), sort_keys=True, separators=(",", ":"))
         return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
-order_queue = OrderQueue()
+def create_order_store():
+    """``ORDER_STORE``: ``memory`` (default) or ``sqlite`` (file at ``ORDER_STORE_PATH``)."""
+    backend = os.getenv("ORDER_STORE", "memory").strip().lower()
+    if backend == "memory":
+        return InMemoryOrderStore()
+    if backend == "sqlite":
+        return SqliteOrderStore(os.getenv("ORDER_STORE_PATH", "orders.sqlite3").strip())
+    raise ValueError("ORDER_STORE must be one of: memory, sqlite")
+
+
+def create_order_queue() -> OrderQueue:
+    """Build the process order queue; ``ORDER_WAL_DIR`` (default unset = in-memory only) enables the WAL.
+
+    ``ORDER_WAL_FSYNC`` picks the fsync policy (``group``/``always``/``interval``/``off``),
+    ``ORDER_WAL_FSYNC_INTERVAL_MS`` the ``interval`` period and ``ORDER_WAL_SNAPSHOT_EVERY`` how many
+    records trigger a snapshot plus log truncation. The store backend comes from ``create_order_store``;
+    ``ORDER_MAX_IN_FLIGHT`` (default 0 = workers are the only bound) caps concurrent dispatches, and
+    ``ORDER_RETRY_BACKOFF_MS`` / ``ORDER_RETRY_BACKOFF_MAX_MS`` shape the retry backoff.
+    """
+    options = {
+        "store": create_order_store(),
+        "max_in_flight": int(os.getenv("ORDER_MAX_IN_FLIGHT", "0")),
+        "retry_backoff_sec": float(os.getenv("ORDER_RETRY_BACKOFF_MS", "200")) / 1000.0,
+        "retry_backoff_max_sec": float(os.getenv("ORDER_RETRY_BACKOFF_MAX_MS", "5000")) / 1000.0,
+    }
+    directory = os.getenv("ORDER_WAL_DIR", "").strip()
+    if not directory:
+        return OrderQueue(**options)
+    wal = OrderWal(
+        directory,
+        fsync_policy=os.getenv("ORDER_WAL_FSYNC", "group").strip().lower(),
+        interval_sec=float(os.getenv("ORDER_WAL_FSYNC_INTERVAL_MS", "50")) / 1000.0,
+        snapshot_every=int(os.getenv("ORDER_WAL_SNAPSHOT_EVERY", "10000")),
+    )
+    return OrderQueue(wal=wal, **options)
+
+
+order_queue = create_order_queue()
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from app.schemas.order import OrderAccepted
+from app.services.order_wal import lock_exclusive, unlock
+
+DEFAULT_LIST_LIMIT = 100
+
+
+def _matches(job: dict, status, account_id, symbol, updated_since) -> bool:
+    request = job.get("request", {})
+    return (
+        (status is None or job.get("status") == status)
+        and (account_id is None or request.get("account_id") == account_id)
+        and (symbol is None or request.get("symbol") == symbol)
+        and (updated_since is None or int(job.get("updated_at", 0)) >= updated_since)
+    )
+
+
+def _recent_first(jobs: list[dict]) -> list[dict]:
+    return sorted(jobs, key=lambda job: (-int(job.get("updated_at", 0)), job["order_id"]))
+
+
+class InMemoryOrderStore:
+    """Order rows and idempotency records in plain dicts (the default backend).
+
+    ``jobs`` holds the live job dicts, so in-place updates are visible immediately; callers
+    still go through ``put`` so the same code runs unchanged on a persistent backend.
+    Listing is a filtered scan: fine for a session's worth of orders, not for history.
+    """
+
+    persistent = False
+
+    def __init__(self) -> None:
+        self.jobs: dict[str, dict] = {}
+        self.idem: dict[str, OrderAccepted] = {}
+        self.idem_body_hash: dict[str, str] = {}
+
+    def get(self, order_id: str) -> dict | None:
+        return self.jobs.get(order_id)
+
+    def put(self, job: dict) -> None:
+        existing = self.jobs.get(job["order_id"])
+        if existing is not None and existing is not job and existing.get("terminal"):
+            # a terminal row is final; a stale copy must not reopen it
+            return
+        self.jobs[job["order_id"]] = job
+
+    def put_many(self, jobs: list[dict], idem: list[tuple[str, OrderAccepted, str]] = ()) -> None:
+        for job in jobs:
+            self.put(job)
+        for key, accepted, body_hash in idem:
+            self.put_idem(key, accepted, body_hash)
+
+    def get_idem(self, key: str) -> tuple[OrderAccepted, str | None] | None:
+        accepted = self.idem.get(key)
+        if accepted is None:
+            return None
+        return accepted, self.idem_body_hash.get(key)
+
+    def put_idem(self, key: str, accepted: OrderAccepted, body_hash: str) -> None:
+        self.idem[key] = accepted
+        self.idem_body_hash[key] = body_hash
+
+    def accept(self, job: dict, key: str, accepted: OrderAccepted, body_hash: str) -> None:
+        self.put(job)
+        self.put_idem(key, accepted, body_hash)
+
+    def list_jobs(
+        self,
+        *,
+        status: str | None = None,
+        account_id: str | None = None,
+        symbol: str | None = None,
+        updated_since: int | None = None,
+        limit: int = DEFAULT_LIST_LIMIT,
+    ) -> list[dict]:
+        rows = [job for job in list(self.jobs.values()) if _matches(job, status, account_id, symbol, updated_since)]
+        return _recent_first(rows)[: max(0, limit)]
+
+    def list_active(self) -> list[dict]:
+        return [job for job in list(self.jobs.values()) if not job.get("terminal")]
+
+    def dump(self) -> dict[str, dict]:
+        # job dicts are copied one level deep so a concurrent transition cannot change a row
+        # mid-serialization
+        return {
+            "jobs": {oid: dict(job) for oid, job in dict(self.jobs).items()},
+            "idem": {key: accepted.model_dump() for key, accepted in dict(self.idem).items()},
+            "idem_body_hash": dict(self.idem_body_hash),
+        }
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def close(self) -> None:
+        return None
+
+    def metrics(self) -> dict[str, Any]:
+        return {"store_backend": "memory", "store_jobs": len(self.jobs)}
+
+
+class _TableView(Mapping):
+    """Read-only ``Mapping`` over a SQLite table, for callers that still index ``jobs``/``idem``."""
+
+    def __init__(self, get: Callable[[str], Any], keys: Callable[[], list[str]], clear: Callable[[], None]) -> None:
+        self._get = get
+        self._keys = keys
+        self._clear = clear
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def clear(self) -> None:
+        self._clear()
+
+
+class SqliteOrderStore:
+    """Order rows and idempotency records in SQLite (WAL journal), indexed for listing.
+
+    ``orders`` keeps the full job JSON plus the columns queries filter on (status,
+    account_id, symbol, updated_at, terminal), each indexed, so ``GET /v1/orders`` and the
+    reconciliation scan of active orders read an index range instead of every row. SQL
+    text is constant, so ``sqlite3``'s statement cache reuses the prepared statements;
+    ``accept`` and ``put_many`` write in one transaction. One connection is shared behind a
+    lock (``synchronous=NORMAL``: an app crash loses nothing, a power loss at most the
+    last transactions).
+
+    ``get`` returns a fresh copy, so the worker and reconciliation can hold diverging copies
+    of one order: the upsert never overwrites a terminal row. The file is ``flock``-ed
+    (``<path>.lock``) by one process at a time.
+    """
+
+    persistent = True
+
+    _SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id TEXT PRIMARY KEY,
+            account_id TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            status TEXT NOT NULL,
+            terminal INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL,
+            body TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_account ON orders(account_id, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_symbol ON orders(symbol, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_updated ON orders(updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_active ON orders(created_at) WHERE terminal = 0",
+        """
+        CREATE TABLE IF NOT EXISTS idempotency (
+            idem_key TEXT PRIMARY KEY,
+            order_id TEXT NOT NULL,
+            body_hash TEXT NOT NULL,
+            accepted TEXT NOT NULL
+        )
+        """,
+    )
+    _UPSERT = (
+        "INSERT INTO orders (order_id, account_id, symbol, status, terminal, created_at, updated_at, body) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(order_id) DO UPDATE SET account_id = excluded.account_id, symbol = excluded.symbol, "
+        "status = excluded.status, terminal = excluded.terminal, updated_at = excluded.updated_at, body = excluded.body "
+        "WHERE orders.terminal = 0"
+    )
+    _UPSERT_IDEM = (
+        "INSERT INTO idempotency (idem_key, order_id, body_hash, accepted) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(idem_key) DO UPDATE SET order_id = excluded.order_id, body_hash = excluded.body_hash, "
+        "accepted = excluded.accepted"
+    )
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = str(path)
+        self._lock_fp = None
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            # one owning process: every owner re-queues NEW rows at startup and would re-send them
+            self._lock_fp = lock_exclusive(Path(f"{self.path}.lock"), f"ORDER_STORE_PATH {self.path}")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.writes = 0
+        self.transactions = 0
+        with self._transaction():
+            for statement in self._SCHEMA:
+                self._conn.execute(statement)
+        self.jobs = _TableView(self.get, self._order_ids, self._clear_orders)
+        self.idem = _TableView(self._get_accepted, self._idem_keys, self._clear_idem)
+        self.idem_body_hash = _TableView(self._get_body_hash, self._idem_keys, self._clear_idem)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self.transactions += 1
+
+    @staticmethod
+    def _row(job: dict) -> tuple:
+        request = job.get("request", {})
+        return (
+            job["order_id"],
+            str(request.get("account_id", "")),
+            str(request.get("symbol", "")),
+            str(job.get("status", "")),
+            1 if job.get("terminal") else 0,
+            int(job.get("created_at", 0)),
+            int(job.get("updated_at", 0)),
+            json.dumps(job, separators=(",", ":"), ensure_ascii=False),
+        )
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get(self, order_id: str) -> dict | None:
+        rows = self._query("SELECT body FROM orders WHERE order_id = ?", (order_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def put(self, job: dict) -> None:
+        with self._transaction() as conn:
+            conn.execute(self._UPSERT, self._row(job))
+            self.writes += 1
+
+    def put_many(self, jobs: list[dict], idem: list[tuple[str, OrderAccepted, str]] = ()) -> None:
+        if not jobs and not idem:
+            return
+        with self._transaction() as conn:
+            conn.executemany(self._UPSERT, [self._row(job) for job in jobs])
+            conn.executemany(self._UPSERT_IDEM, [self._idem_row(*entry) for entry in idem])
+            self.writes += len(jobs) + len(idem)
+
+    def get_idem(self, key: str) -> tuple[OrderAccepted, str | None] | None:
+        rows = self._query("SELECT accepted, body_hash FROM idempotency WHERE idem_key = ?", (key,))
+        if not rows:
+            return None
+        return OrderAccepted(**json.loads(rows[0][0])), rows[0][1]
+
+    def put_idem(self, key: str, accepted: OrderAccepted, body_hash: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(self._UPSERT_IDEM, self._idem_row(key, accepted, body_hash))
+
+    @staticmethod
+    def _idem_row(key: str, accepted: OrderAccepted, body_hash: str) -> tuple:
+        return key, accepted.order_id, body_hash, json.dumps(accepted.model_dump(), separators=(",", ":"))
+
+    def accept(self, job: dict, key: str, accepted: OrderAccepted, body_hash: str) -> None:
+        # the order row and its idempotency record commit together or not at all
+        with self._transaction() as conn:
+            conn.execute(self._UPSERT, self._row(job))
+            conn.execute(self._UPSERT_IDEM, self._idem_row(key, accepted, body_hash))
+            self.writes += 2
+
+    def list_jobs(
+        self,
+        *,
+        status: str | None = None,
+        account_id: str | None = None,
+        symbol: str | None = None,
+        updated_since: int | None = None,
+        limit: int = DEFAULT_LIST_LIMIT,
+    ) -> list[dict]:
+        clauses = []
+        params: list[Any] = []
+        for column, value in (("status", status), ("account_id", account_id), ("symbol", symbol)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if updated_since is not None:
+            clauses.append("updated_at >= ?")
+            params.append(int(updated_since))
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        params.append(max(0, int(limit)))
+        sql = f"SELECT body FROM orders {where}ORDER BY updated_at DESC, order_id LIMIT ?"
+        return [json.loads(body) for (body,) in self._query(sql, tuple(params))]
+
+    def list_active(self) -> list[dict]:
+        rows = self._query("SELECT body FROM orders WHERE terminal = 0 ORDER BY created_at, rowid")
+        return [json.loads(body) for (body,) in rows]
+
+    def explain(self, sql: str, params: tuple = ()) -> list[str]:
+        """``EXPLAIN QUERY PLAN`` details, used to check that listings hit an index."""
+        return [row[-1] for row in self._query(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    def dump(self) -> dict[str, dict]:
+        with self._lock:
+            jobs = {oid: json.loads(body) for oid, body in self._conn.execute("SELECT order_id, body FROM orders")}
+            idem_rows = self._conn.execute("SELECT idem_key, body_hash, accepted FROM idempotency").fetchall()
+        return {
+            "jobs": jobs,
+            "idem": {key: json.loads(accepted) for key, _, accepted in idem_rows},
+            "idem_body_hash": {key: body_hash for key, body_hash, _ in idem_rows},
+        }
+
+    def _order_ids(self) -> list[str]:
+        return [oid for (oid,) in self._query("SELECT order_id FROM orders")]
+
+    def _idem_keys(self) -> list[str]:
+        return [key for (key,) in self._query("SELECT idem_key FROM idempotency")]
+
+    def _get_accepted(self, key: str) -> OrderAccepted | None:
+        entry = self.get_idem(key)
+        return None if entry is None else entry[0]
+
+    def _get_body_hash(self, key: str) -> str | None:
+        entry = self.get_idem(key)
+        return None if entry is None else entry[1]
+
+    def _clear_orders(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM orders")
+
+    def _clear_idem(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM idempotency")
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM orders")[0][0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        if self._lock_fp is not None and not self._lock_fp.closed:
+            unlock(self._lock_fp)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "store_backend": "sqlite",
+            "store_jobs": len(self),
+            "store_writes": self.writes,
+            "store_transactions": self.transactions,
+        }
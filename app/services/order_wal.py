@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+FSYNC_ALWAYS = "always"
+FSYNC_GROUP = "group"
+FSYNC_INTERVAL = "interval"
+FSYNC_OFF = "off"
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_GROUP, FSYNC_INTERVAL, FSYNC_OFF)
+
+_SNAPSHOT_NAME = "orders.snapshot.json"
+_LOCK_NAME = "orders.lock"
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def lock_exclusive(path: Path, what: str):
+    """Take a non-blocking exclusive ``flock`` on ``path`` for the life of the returned file.
+
+    Order state must have exactly one owning process: a second one (another uvicorn worker,
+    the ingest process) would recover the same NEW orders and send them again. Raises
+    ``RuntimeError`` naming the holder's pid instead of starting.
+    """
+    fp = open(path, "a+")
+    try:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        fp.seek(0)
+        holder = fp.read().strip() or "unknown"
+        fp.close()
+        raise RuntimeError(
+            f"ORDER_STATE_LOCKED: {what} is owned by pid {holder}; run a single order process "
+            f"(uvicorn --workers 1) per order state"
+        ) from None
+    fp.seek(0)
+    fp.truncate()
+    fp.write(str(os.getpid()))
+    fp.flush()
+    return fp
+
+
+def unlock(fp) -> None:
+    fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+    fp.close()
+
+
+def _truncate_torn_tail(path: Path) -> int:
+    """Cut a partial last record left by a crash mid-write; returns the bytes dropped.
+
+    Without this, the next append would land on the same line as the torn bytes and the
+    merged (unparseable) line would take a valid record down with it.
+    """
+    try:
+        fp = open(path, "r+b")
+    except FileNotFoundError:
+        return 0
+    with fp:
+        size = fp.seek(0, os.SEEK_END)
+        keep = 0
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            fp.seek(start)
+            newline = fp.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                keep = start + newline + 1
+                break
+            end = start
+        if keep < size:
+            fp.truncate(keep)
+            fp.flush()
+            os.fsync(fp.fileno())
+        return size - keep
+
+
+class _SnapshotGate:
+    """Shared/exclusive gate between ``OrderQueue`` mutations and ``OrderWal.snapshot``.
+
+    Mutations hold the shared side from their log append until the store reflects them, so
+    they still run (and group-commit) concurrently; a snapshot takes the exclusive side. A
+    waiting snapshot holds off new mutations so a steady stream of orders cannot starve it.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._active = 0
+        self._exclusive = False
+        self._waiting = 0
+
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            while self._exclusive or self._waiting:
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                if self._active == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            self._waiting += 1
+            while self._exclusive or self._active:
+                self._cond.wait()
+            self._waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
+
+
+class OrderWal:
+    """Append-only JSON-lines log of ``OrderQueue`` mutations with group commit.
+
+    Every record is a full image (an accepted order with its idempotency entry, or a job's
+    state after a transition), so replaying a record twice is harmless. ``fsync_policy``:
+
+    * ``group`` (default): ``append`` returns once the record is fsynced; concurrent callers
+      share one write+fsync (the first waiter flushes everything queued behind it), so a
+      burst costs a handful of fsyncs instead of one per order.
+    * ``always``: one fsync per record, serialized.
+    * ``interval``: ``append`` returns after the OS write; a background thread fsyncs every
+      ``interval_sec``, bounding loss on power failure to that window.
+    * ``off``: OS write only; survives a process crash, not a host crash.
+
+    ``snapshot`` writes the full state and starts a new log generation, so the log never
+    has to be replayed from the beginning of time; callers wrap each append and the state
+    change it describes in ``mutation()`` so a snapshot never captures one without the
+    other. A write failure poisons the log: later appends raise instead of accepting orders
+    that would not survive a restart. The directory is ``flock``-ed by one process at a time
+    (``orders.lock``).
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        fsync_policy: str = FSYNC_GROUP,
+        interval_sec: float = 0.05,
+        snapshot_every: int = 10000,
+    ) -> None:
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"ORDER_WAL_FSYNC must be one of: {', '.join(FSYNC_POLICIES)}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # before anything is read or repaired: a second owner would recover and re-send orders
+        self._lock_fp = lock_exclusive(self.directory / _LOCK_NAME, f"ORDER_WAL_DIR {self.directory}")
+        self.fsync_policy = fsync_policy
+        self.interval_sec = max(0.001, float(interval_sec))
+        self.snapshot_every = max(0, int(snapshot_every))
+        self._cond = threading.Condition()
+        self._gate = _SnapshotGate()
+        self._pending: list[bytes] = []
+        self._appended = 0
+        self._durable = 0
+        self._flushing = False
+        self._dirty = False
+        self._error: BaseException | None = None
+        self.generation = self._read_snapshot_generation()
+        dropped = _truncate_torn_tail(self._log_path(self.generation))
+        if dropped:
+            print(f"[ORDER][wal_torn_tail] bytes={dropped} path={self._log_path(self.generation)}", flush=True)
+        self._fp = open(self._log_path(self.generation), "ab")
+        self.records = 0
+        self.records_since_snapshot = 0
+        self.fsyncs = 0
+        self.snapshots = 0
+        self._stop_event = threading.Event()
+        self._syncer: threading.Thread | None = None
+        if fsync_policy == FSYNC_INTERVAL:
+            self._syncer = threading.Thread(target=self._sync_loop, daemon=True, name="order-wal-sync")
+            self._syncer.start()
+
+    def _log_path(self, generation: int) -> Path:
+        return self.directory / f"orders.{generation:08d}.wal"
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.directory / _SNAPSHOT_NAME
+
+    def _read_snapshot_generation(self) -> int:
+        snapshot = self._read_snapshot()
+        return int(snapshot.get("generation", 0)) if snapshot else 0
+
+    def _read_snapshot(self) -> dict | None:
+        try:
+            return json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    # -- append -----------------------------------------------------------------------------
+
+    def _check_error(self) -> None:
+        if self._error is not None:
+            raise OSError(f"order WAL unavailable: {self._error}") from self._error
+
+    def _write(self, lines: list[bytes], *, sync: bool) -> None:
+        # caller holds the condition, or is the group-commit leader (only one at a time)
+        try:
+            self._fp.write(b"".join(lines))
+            self._fp.flush()
+            if sync:
+                os.fsync(self._fp.fileno())
+                self.fsyncs += 1
+        except BaseException as exc:
+            self._error = exc
+            raise
+
+    def append(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+        if self.fsync_policy == FSYNC_GROUP:
+            self._append_group(line)
+        else:
+            with self._cond:
+                self._check_error()
+                self._write([line], sync=self.fsync_policy == FSYNC_ALWAYS)
+                self._dirty = True
+                self.records += 1
+                self.records_since_snapshot += 1
+
+    def _append_group(self, line: bytes) -> None:
+        with self._cond:
+            self._check_error()
+            self._pending.append(line)
+            self._appended += 1
+            ticket = self._appended
+            while self._durable < ticket:
+                self._check_error()
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                # become the leader: flush everything queued so far in one write+fsync
+                self._flushing = True
+                batch, self._pending = self._pending, []
+                upto = self._appended
+                self._cond.release()
+                try:
+                    self._write(batch, sync=True)
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    self._cond.notify_all()
+                self._durable = upto
+                self.records += len(batch)
+                self.records_since_snapshot += len(batch)
+
+    def _sync_loop(self) -> None:
+        while not self._stop_event.wait(self.interval_sec):
+            self.sync()
+
+    def sync(self) -> None:
+        with self._cond:
+            if not self._dirty or self._error is not None:
+                return
+            try:
+                os.fsync(self._fp.fileno())
+                self.fsyncs += 1
+                self._dirty = False
+            except OSError as exc:
+                self._error = exc
+                print(f"[ORDER][wal_error] op=fsync err={exc}", flush=True)
+
+    def mutation(self):
+        """Context manager held from ``append`` until the logged change is applied to the state."""
+        return self._gate.shared()
+
+    def snapshot_due(self) -> bool:
+        return self.snapshot_every > 0 and self.records_since_snapshot >= self.snapshot_every
+
+    # -- snapshot / recovery ----------------------------------------------------------------
+
+    def snapshot(self, capture: Callable[[], dict[str, Any]]) -> None:
+        """Persist ``capture()`` as the new base state and switch to an empty log generation.
+
+        Waits for in-progress ``mutation()`` blocks to finish and holds new ones off while the
+        state is captured, so every logged mutation is either applied in the snapshot or
+        in the new log (or both; records are full images).
+        """
+        with self._gate.exclusive(), self._cond:
+            while self._flushing:
+                self._cond.wait()
+            self._check_error()
+            if self._pending:
+                self._write(self._pending, sync=True)
+                self.records += len(self._pending)
+                self._durable = self._appended
+                self._pending = []
+            elif self._dirty:
+                os.fsync(self._fp.fileno())
+            state = capture()
+            next_generation = self.generation + 1
+            state["generation"] = next_generation
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as fp:
+                json.dump(state, fp, separators=(",", ":"), ensure_ascii=False)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            # the snapshot now points at the new generation; the old log is dead weight
+            self._fp.close()
+            previous_log = self._log_path(self.generation)
+            self.generation = next_generation
+            self._fp = open(self._log_path(next_generation), "ab")
+            _fsync_dir(self.directory)
+            previous_log.unlink(missing_ok=True)
+            self._dirty = False
+            self.records_since_snapshot = 0
+            self.snapshots += 1
+            self._cond.notify_all()
+
+    def load(self) -> tuple[dict | None, list[dict]]:
+        """The last snapshot (if any) and the records logged after it, in order."""
+        snapshot = self._read_snapshot()
+        records: list[dict] = []
+        path = self._log_path(self.generation)
+        if not path.exists():
+            return snapshot, records
+        with open(path, "rb") as fp:
+            lines = fp.read().split(b"\n")
+        for number, raw in enumerate(lines):
+            if not raw.strip():
+                continue
+            try:
+                records.append(json.loads(raw))
+            except ValueError:
+                # a torn tail from a crash mid-write is expected; anything earlier is not
+                if number < len(lines) - 2:
+                    print(f"[ORDER][wal_corrupt_record] line={number + 1} path={path}", flush=True)
+                continue
+        return snapshot, records
+
+    def close(self) -> None:
+        self._stop_event.set()
+        if self._syncer is not None:
+            self._syncer.join(timeout=1.0)
+        self.sync()
+        with self._cond:
+            self._fp.close()
+        if not self._lock_fp.closed:
+            unlock(self._lock_fp)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "wal_fsync_policy": self.fsync_policy,
+            "wal_generation": self.generation,
+            "wal_records": self.records,
+            "wal_fsyncs": self.fsyncs,
+            "wal_records_per_fsync": round(self.records / self.fsyncs, 2) if self.fsyncs else None,
+            "wal_snapshots": self.snapshots,
+            "wal_healthy": self._error is None,
+        }
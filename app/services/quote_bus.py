@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from app.services.quote_stream import ConflatingQueue
+
+POLICY_LATEST = "latest"
+POLICY_FIFO = "fifo"
+
+
+class BoundedFifoQueue:
+    """Bounded tick-by-tick queue; when full the oldest tick is dropped and counted.
+
+    Same ``put``/``drain`` surface as ``ConflatingQueue`` for consumers that need every
+    tick (e.g. the cache ingest that feeds tick history).
+    """
+
+    def __init__(self, max_items: int = 100_000, on_ready: Callable[[], None] | None = None) -> None:
+        if max_items < 1:
+            raise ValueError("max_items must be >= 1")
+        self.max_items = max_items
+        self.on_ready = on_ready
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+        self.pending_since: float | None = None
+        self.enqueued = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.delivered = 0
+
+    def put(self, symbol: str, item: object) -> bool:
+        with self._lock:
+            items = self._items
+            was_empty = not items
+            if was_empty:
+                self.pending_since = time.monotonic()
+            elif len(items) >= self.max_items:
+                items.popleft()
+                self.dropped += 1
+            items.append(item)
+            self.enqueued += 1
+        if was_empty and self.on_ready is not None:
+            self.on_ready()
+        return True
+
+    def drain(self) -> list:
+        with self._lock:
+            if not self._items:
+                return []
+            items = list(self._items)
+            self._items.clear()
+            self.pending_since = None
+            self.delivered += len(items)
+        return items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class BusSubscriber:
+    """One bus consumer: a bounded queue drained by its own daemon thread."""
+
+    def __init__(self, name: str, handler: Callable[[list[dict]], None], queue) -> None:
+        self.name = name
+        self.handler = handler
+        self.queue = queue
+        self.queue.on_ready = self._wake
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.batches = 0
+        self.errors = 0
+        self.last_error: str | None = None
+
+    def _wake(self) -> None:
+        self._ready.set()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"quote-bus-{self.name}")
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop.set()
+        self._ready.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._ready.wait(timeout=1.0)
+            self._ready.clear()
+            self.drain_once()
+        # deliver whatever was enqueued before shutdown
+        self.drain_once()
+
+    def drain_once(self) -> int:
+        items = self.queue.drain()
+        if not items:
+            return 0
+        try:
+            self.handler(items)
+        except Exception as exc:
+            self.errors += 1
+            self.last_error = str(exc)
+        self.batches += 1
+        return len(items)
+
+    def metrics(self, now: float | None = None) -> dict:
+        ref = time.monotonic() if now is None else now
+        since = self.queue.pending_since
+        return {
+            "pending": len(self.queue),
+            "lag_ms": 0.0 if since is None else round(max(ref - since, 0.0) * 1000.0, 3),
+            "enqueued": self.queue.enqueued,
+            "delivered": self.queue.delivered,
+            "conflated": self.queue.conflated,
+            "dropped": self.queue.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+class QuoteBus:
+    """In-process fan-out between ``KisWsClient`` and quote consumers.
+
+    ``publish`` runs on the websocket-client thread and only enqueues into each
+    subscriber's bounded queue; subscribers drain on their own threads, so a slow
+    consumer delays only itself. ``latest`` subscribers conflate to the newest tick per
+    symbol; ``fifo`` subscribers see every tick until their bound, then lose the oldest.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # copy-on-write so publish iterates without holding the lock
+        self._subscribers: tuple[BusSubscriber, ...] = ()
+        self._running = False
+        self.published = 0
+
+    def subscribe(
+        self,
+        name: str,
+        handler: Callable[[list[dict]], None],
+        *,
+        policy: str = POLICY_LATEST,
+        max_pending: int | None = None,
+    ) -> BusSubscriber:
+        if policy == POLICY_LATEST:
+            queue = ConflatingQueue(max_symbols=max_pending or 4000)
+        elif policy == POLICY_FIFO:
+            queue = BoundedFifoQueue(max_items=max_pending or 100_000)
+        else:
+            raise ValueError("policy must be one of: latest, fifo")
+        sub = BusSubscriber(name, handler, queue)
+        with self._lock:
+            if any(s.name == name for s in self._subscribers):
+                raise ValueError(f"duplicate bus subscriber: {name}")
+            self._subscribers = self._subscribers + (sub,)
+            if self._running:
+                sub.start()
+        return sub
+
+    def unsubscribe(self, name: str) -> None:
+        with self._lock:
+            removed = [s for s in self._subscribers if s.name == name]
+            self._subscribers = tuple(s for s in self._subscribers if s.name != name)
+        for sub in removed:
+            sub.stop()
+
+    def publish(self, payloads: list[dict]) -> None:
+        self.published += len(payloads)
+        for sub in self._subscribers:
+            put = sub.queue.put
+            for payload in payloads:
+                put(payload.get("symbol", ""), payload)
+
+    def start(self) -> None:
+        with self._lock:
+            self._running = True
+            subscribers = self._subscribers
+        for sub in subscribers:
+            sub.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        with self._lock:
+            self._running = False
+            subscribers = self._subscribers
+        for sub in subscribers:
+            sub.stop(timeout=timeout)
+
+    def drain(self) -> int:
+        """Deliver pending items inline; for callers that run the bus without threads."""
+        return sum(sub.drain_once() for sub in self._subscribers)
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        return {
+            "bus_published": self.published,
+            "bus_subscribers": {sub.name: sub.metrics(now) for sub in self._subscribers},
+        }
+
+
+quote_bus = QuoteBus()
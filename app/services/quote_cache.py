@@ -1,31 +1,246 @@
 from __future__ import annotations
 
+import heapq
+import os
+import threading
 import time
+from typing import Callable, Iterable
 
 from app.schemas.quote import QuoteSnapshot
+from app.services.tick_history import TickHistory
 
 
-class QuoteCache:
+class QuoteRecord:
+    """Internal slotted quote row; converted to ``QuoteSnapshot`` only at the API boundary.
+
+    Rows stored in ``QuoteCache`` keep their ingest-time ``freshness_sec``/``state`` and are
+    never mutated by readers; use ``with_freshness`` to derive both at read time.
+    """
+
+    __slots__ = ("symbol", "price", "change_pct", "turnover", "source", "ts", "freshness_sec", "state")
+
+    def __init__(
+        self,
+        *,
+        symbol: str,
+        price: float,
+        change_pct: float = 0.0,
+        turnover: float = 0.0,
+        source: str = "kis-ws",
+        ts: int = 0,
+        freshness_sec: float = 0.0,
+        state: str = "HEALTHY",
+    ) -> None:
+        self.symbol = symbol
+        self.price = price
+        self.change_pct = change_pct
+        self.turnover = turnover
+        self.source = source
+        self.ts = ts
+        self.freshness_sec = freshness_sec
+        self.state = state
+
+    @classmethod
+    def from_payload(cls, payload: dict, *, now: int, default_source: str) -> "QuoteRecord":
+        return cls(
+            symbol=str(payload["symbol"]),
+            price=float(payload["price"]),
+            change_pct=float(payload.get("change_pct", 0.0)),
+            turnover=float(payload.get("turnover", 0.0)),
+            source=str(payload.get("source", default_source)),
+            ts=int(payload.get("ts", now)),
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: QuoteSnapshot) -> "QuoteRecord":
+        return cls(
+            symbol=snapshot.symbol,
+            price=snapshot.price,
+            change_pct=snapshot.change_pct,
+            turnover=snapshot.turnover,
+            source=snapshot.source,
+            ts=snapshot.ts,
+            freshness_sec=snapshot.freshness_sec,
+            state=snapshot.state,
+        )
+
+    def age_sec(self, now: int) -> float:
+        return float(max(now - self.ts, 0))
+
+    def with_freshness(self, now: int, stale_after_sec: int) -> "QuoteRecord":
+        age = self.age_sec(now)
+        return QuoteRecord(
+            symbol=self.symbol,
+            price=self.price,
+            change_pct=self.change_pct,
+            turnover=self.turnover,
+            source=self.source,
+            ts=self.ts,
+            freshness_sec=age,
+            state="HEALTHY" if age <= stale_after_sec else "STALE",
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"QuoteRecord(symbol={self.symbol!r}, price={self.price!r}, source={self.source!r}, "
+            f"ts={self.ts!r}, state={self.state!r})"
+        )
+
+
+class _ExpiryWheel:
+    """Incremental stale-row counter keyed by each row's last-update second (``ts``).
+
+    Rows are counted in per-second buckets. As the stale cutoff (``now - stale_after_sec``)
+    advances, buckets that fall behind it are folded into a running stale total, so a
+    count costs O(expired seconds) instead of O(cached rows).
+    """
+
     def __init__(self) -> None:
-        self._rows: dict[str, QuoteSnapshot] = {}
+        self._buckets: dict[int, int] = {}
+        self._heap: list[int] = []
+        self._cutoff: int | None = None
+        self._stale = 0
+
+    def add(self, ts: int) -> None:
+        if self._cutoff is not None and ts < self._cutoff:
+            self._stale += 1
+            return
+        count = self._buckets.get(ts)
+        if count is None:
+            # emptied buckets are dropped from the dict only; their heap entries pop lazily
+            heapq.heappush(self._heap, ts)
+            self._buckets[ts] = 1
+        else:
+            self._buckets[ts] = count + 1
+
+    def remove(self, ts: int) -> None:
+        if self._cutoff is not None and ts < self._cutoff:
+            self._stale = max(0, self._stale - 1)
+            return
+        count = self._buckets.get(ts, 0) - 1
+        if count > 0:
+            self._buckets[ts] = count
+        else:
+            self._buckets.pop(ts, None)
 
-    def upsert(self, snapshot: QuoteSnapshot) -> None:
-        self._rows[snapshot.symbol] = snapshot
+    def stale_count(self, cutoff: int, timestamps: Callable[[], Iterable[int]]) -> int:
+        if self._cutoff is not None and cutoff < self._cutoff:
+            # clock stepped back or the threshold grew: folded rows may be fresh again
+            self.reset(timestamps())
+        self._cutoff = cutoff
+        heap = self._heap
+        while heap and heap[0] < cutoff:
+            self._stale += self._buckets.pop(heapq.heappop(heap), 0)
+        return self._stale
 
-    def get(self, symbol: str) -> QuoteSnapshot | None:
+    def reset(self, timestamps: Iterable[int] = ()) -> None:
+        self._buckets.clear()
+        self._heap.clear()
+        self._cutoff = None
+        self._stale = 0
+        for ts in timestamps:
+            self.add(ts)
+
+
+class QuoteCache:
+    def __init__(self, tick_history_depth: int = 0) -> None:
+        self._rows: dict[str, QuoteRecord] = {}
+        self._lock = threading.Lock()
+        self._wheel = _ExpiryWheel()
+        # optional per-symbol ring of the last N ticks; disabled when depth is 0
+        self.tick_history = TickHistory(tick_history_depth) if tick_history_depth > 0 else None
+
+    def _put(self, row: QuoteRecord) -> None:
+        previous = self._rows.get(row.symbol)
+        if previous is not None:
+            self._wheel.remove(previous.ts)
+        self._rows[row.symbol] = row
+        self._wheel.add(row.ts)
+
+    def _store(self, row: QuoteRecord) -> None:
+        self._put(row)
+        if self.tick_history is not None:
+            self.tick_history.record(row.symbol, row.ts, row.price, row.change_pct, row.turnover)
+
+    def upsert(self, snapshot: QuoteRecord | QuoteSnapshot) -> None:
+        if not isinstance(snapshot, QuoteRecord):
+            snapshot = QuoteRecord.from_snapshot(snapshot)
+        with self._lock:
+            self._store(snapshot)
+
+    def upsert_many(self, snapshots: list[QuoteRecord]) -> None:
+        # later ticks of the same symbol within one batch win, matching sequential upserts
+        with self._lock:
+            for snapshot in snapshots:
+                self._store(snapshot)
+
+    def get(self, symbol: str) -> QuoteRecord | None:
         return self._rows.get(symbol)
 
-    def list_many(self, symbols: list[str]) -> list[QuoteSnapshot]:
-        out: list[QuoteSnapshot] = []
+    def list_many(self, symbols: list[str]) -> list[QuoteRecord]:
+        out: list[QuoteRecord] = []
         for s in symbols:
             row = self.get(s)
             if row:
                 out.append(row)
         return out
 
-    def list_all(self) -> list[QuoteSnapshot]:
+    def list_all(self) -> list[QuoteRecord]:
         return list(self._rows.values())
 
+    def ticks(self, symbol: str, since_ts: int | None = None) -> list[dict] | None:
+        """Recorded ticks for ``symbol`` newer than ``since_ts``; None if none were recorded."""
+        if self.tick_history is None:
+            return None
+        with self._lock:
+            return self.tick_history.ticks(symbol, since_ts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+            self._wheel.reset()
+            if self.tick_history is not None:
+                self.tick_history.clear()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def stale_count(self, now: int, stale_after_sec: int) -> int:
+        """Number of rows older than ``stale_after_sec`` at ``now``; does not touch the rows."""
+        with self._lock:
+            return self._wheel.stale_count(
+                now - stale_after_sec,
+                lambda: [row.ts for row in self._rows.values()],
+            )
+
+
+def create_quote_cache(mode: str | None = None, tick_history_depth: int | None = None) -> QuoteCache:
+    """Build the quote cache for ``mode`` (``QUOTE_CACHE_MODE`` env): ``dict``, ``columnar`` or ``shm``.
+
+    ``tick_history_depth`` (``QUOTE_TICK_HISTORY_DEPTH`` env, default 0=off) sizes the per-symbol tick ring.
+    ``shm`` shares one table across processes: ``QUOTE_SHM_ROLE`` picks ``writer`` (ingest
+    process) or ``reader`` (API workers), ``QUOTE_SHM_PATH``/``QUOTE_SHM_CAPACITY`` locate and size it.
+    """
+    selected = (mode or os.getenv("QUOTE_CACHE_MODE", "dict")).strip().lower()
+    if tick_history_depth is None:
+        tick_history_depth = int(os.getenv("QUOTE_TICK_HISTORY_DEPTH", "0"))
+    if selected == "columnar":
+        from app.services.quote_cache_columnar import ColumnarQuoteCache
+
+        return ColumnarQuoteCache(tick_history_depth=tick_history_depth)
+    if selected == "shm":
+        from app.services.quote_cache_shm import SharedQuoteCache
+
+        return SharedQuoteCache(
+            os.getenv("QUOTE_SHM_PATH", "/dev/shm/kis-quotes"),
+            role=os.getenv("QUOTE_SHM_ROLE", "reader").strip().lower(),
+            capacity=int(os.getenv("QUOTE_SHM_CAPACITY", "4096")),
+            tick_history_depth=tick_history_depth,
+        )
+    if selected != "dict":
+        raise ValueError("QUOTE_CACHE_MODE must be one of: dict, columnar, shm")
+    return QuoteCache(tick_history_depth=tick_history_depth)
+
 
 class QuoteIngestWorker:
     """MVP skeleton: websocket payload hook -> cache update + freshness calc."""
@@ -41,6 +256,7 @@ class QuoteIngestWorker:
         self.stale_after_sec = stale_after_sec
         self.ws_heartbeat_timeout_sec = ws_heartbeat_timeout_sec
         self.ws_messages = 0
+        self.ws_batches = 0
         self.upserts = 0
         self.ws_connected = False
         self.last_ws_message_ts: int | None = None
@@ -48,26 +264,32 @@ class QuoteIngestWorker:
         self.ws_last_error: str | None = None
         self.ws_reconnect_count = 0
         self.auto_sync_ws_state = auto_sync_ws_state
+        self._listeners: list[Callable[[list[QuoteRecord]], None]] = []
+
+    def add_listener(self, listener: Callable[[list[QuoteRecord]], None]) -> None:
+        """Register a callback that receives each ingested batch right after the cache write."""
+        self._listeners.append(listener)
 
-    def on_ws_message(self, payload: dict) -> QuoteSnapshot:
+    def on_ws_batch(self, payloads: list[dict]) -> list[QuoteRecord]:
+        """Ingest every quote of one WS frame with a single cache write pass."""
+        if not payloads:
+            return []
         now = int(time.time())
-        snapshot = QuoteSnapshot(
-            symbol=payload["symbol"],
-            price=float(payload["price"]),
-            change_pct=float(payload.get("change_pct", 0.0)),
-            turnover=float(payload.get("turnover", 0.0)),
-            source=str(payload.get("source", "kis-ws")),
-            ts=int(payload.get("ts", now)),
-            freshness_sec=0.0,
-            state="HEALTHY",
-        )
-        self.cache.upsert(snapshot)
-        self.ws_messages += 1
-        self.upserts += 1
+        snapshots = [QuoteRecord.from_payload(payload, now=now, default_source="kis-ws") for payload in payloads]
+        self.cache.upsert_many(snapshots)
+        for listener in self._listeners:
+            listener(snapshots)
+        self.ws_messages += len(snapshots)
+        self.ws_batches += 1
+        self.upserts += len(snapshots)
         self.ws_connected = True
-        self.last_ws_message_ts = snapshot.ts
+        self.last_ws_message_ts = snapshots[-1].ts
         self.last_ws_heartbeat_ts = now
-        return snapshot
+        self._publish_ws_state()
+        return snapshots
+
+    def on_ws_message(self, payload: dict) -> QuoteRecord:
+        return self.on_ws_batch([payload])[0]
 
     def sync_ws_state(
         self,
@@ -82,6 +304,27 @@ class QuoteIngestWorker:
         self.ws_last_error = last_error
         if heartbeat_ts is not None:
             self.last_ws_heartbeat_ts = int(heartbeat_ts)
+        self._publish_ws_state()
+
+    def _publish_ws_state(self) -> None:
+        # shared-memory cache: API worker processes read the ingest process's WS state from it
+        publish = getattr(self.cache, "publish_ws_state", None)
+        if publish is not None:
+            publish(
+                connected=self.ws_connected,
+                reconnect_count=self.ws_reconnect_count,
+                heartbeat_ts=self.last_ws_heartbeat_ts,
+                message_ts=self.last_ws_message_ts,
+            )
+
+    def _sync_from_shared_cache(self) -> None:
+        state = self.cache.ws_state()
+        if state is None:
+            return
+        self.ws_connected = state["connected"]
+        self.ws_reconnect_count = state["reconnect_count"]
+        self.last_ws_heartbeat_ts = state["heartbeat_ts"]
+        self.last_ws_message_ts = state["message_ts"]
 
     def _sync_from_app_ws_client(self) -> None:
         try:
@@ -95,28 +338,26 @@ class QuoteIngestWorker:
         except Exception:
             return
 
-    def refresh_freshness(self, now: int | None = None) -> None:
+    def stale_count(self, now: int | None = None) -> int:
         ref = int(time.time()) if now is None else now
-        for row in self.cache.list_all():
-            age = float(max(ref - row.ts, 0))
-            row.freshness_sec = age
-            row.state = "HEALTHY" if age <= self.stale_after_sec else "STALE"
+        return self.cache.stale_count(ref, self.stale_after_sec)
 
     def metrics(self, now: int | None = None) -> dict:
-        if self.auto_sync_ws_state:
+        if getattr(self.cache, "read_only", False):
+            self._sync_from_shared_cache()
+        elif self.auto_sync_ws_state:
             self._sync_from_app_ws_client()
         ref = int(time.time()) if now is None else now
-        self.refresh_freshness(now=ref)
-        rows = self.cache.list_all()
-        stale = sum(1 for r in rows if r.state == "STALE")
+        stale = self.stale_count(now=ref)
 
         heartbeat_fresh = False
         if self.last_ws_heartbeat_ts is not None:
             heartbeat_fresh = (ref - self.last_ws_heartbeat_ts) <= self.ws_heartbeat_timeout_sec
 
         return {
-            "cached_symbols": len(rows),
+            "cached_symbols": len(self.cache),
             "ws_messages": self.ws_messages,
+            "ws_batches": self.ws_batches,
             "upserts": self.upserts,
             "stale_symbols": stale,
             "ws_connected": self.ws_connected,
@@ -128,21 +369,10 @@ class QuoteIngestWorker:
         }
 
 
-quote_cache = QuoteCache()
+quote_cache = create_quote_cache()
 quote_ingest_worker = QuoteIngestWorker(quote_cache, auto_sync_ws_state=True)
 
 
 def seed_demo_quote(symbol: str) -> None:
     now = int(time.time())
-    quote_cache.upsert(
-        QuoteSnapshot(
-            symbol=symbol,
-            price=70000.0,
-            change_pct=0.0,
-            turnover=0.0,
-            source="demo",
-            ts=now,
-            freshness_sec=0.0,
-            state="HEALTHY",
-        )
-    )
+    quote_cache.upsert(QuoteRecord(symbol=symbol, price=70000.0, source="demo", ts=now))
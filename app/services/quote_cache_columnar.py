@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import threading
+
+from app.services.quote_cache import QuoteCache, QuoteRecord
+
+try:  # optional dependency: pip install -e .[columnar]
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy installed
+    np = None
+
+
+class ColumnarQuoteCache(QuoteCache):
+    """Whole-market quote cache backed by contiguous NumPy columns.
+
+    Each symbol owns a fixed row index; price/change_pct/turnover/ts live in typed arrays
+    so batch reads are column gathers. ``get``/``list_many``/``list_all`` materialize
+    ``QuoteRecord`` rows on read; stale counts come from the same expiry wheel as the
+    dict cache, with a vectorized ts snapshot for the rare rebuild.
+    """
+
+    def __init__(self, initial_capacity: int = 512, tick_history_depth: int = 0) -> None:
+        if np is None:
+            raise RuntimeError("columnar quote cache requires numpy (pip install -e .[columnar])")
+        super().__init__(tick_history_depth=tick_history_depth)
+        capacity = max(1, int(initial_capacity))
+        self._index: dict[str, int] = {}
+        self._symbols: list[str] = []
+        self._sources: list[str] = []
+        self._price = np.zeros(capacity, dtype=np.float64)
+        self._change_pct = np.zeros(capacity, dtype=np.float64)
+        self._turnover = np.zeros(capacity, dtype=np.float64)
+        self._ts = np.zeros(capacity, dtype=np.int64)
+
+    @property
+    def capacity(self) -> int:
+        return int(self._price.shape[0])
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_price", "_change_pct", "_turnover", "_ts"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: column.shape[0]] = column
+            setattr(self, name, grown)
+
+    def _slot(self, symbol: str) -> int:
+        idx = self._index.get(symbol)
+        if idx is not None:
+            self._wheel.remove(int(self._ts[idx]))
+            return idx
+        idx = len(self._symbols)
+        if idx >= self.capacity:
+            self._grow(idx + 1)
+        self._index[symbol] = idx
+        self._symbols.append(symbol)
+        self._sources.append("")
+        return idx
+
+    def _put(self, row: QuoteRecord) -> None:
+        idx = self._slot(row.symbol)
+        self._price[idx] = row.price
+        self._change_pct[idx] = row.change_pct
+        self._turnover[idx] = row.turnover
+        self._ts[idx] = row.ts
+        self._sources[idx] = row.source
+        self._wheel.add(row.ts)
+
+    def _materialize(self, idx: int) -> QuoteRecord:
+        return QuoteRecord(
+            symbol=self._symbols[idx],
+            price=float(self._price[idx]),
+            change_pct=float(self._change_pct[idx]),
+            turnover=float(self._turnover[idx]),
+            source=self._sources[idx],
+            ts=int(self._ts[idx]),
+        )
+
+    def _materialize_many(self, indices: list[int] | range) -> list[QuoteRecord]:
+        if not indices:
+            return []
+        # contiguous ranges gather with a slice (no copy); arbitrary sets with fancy indexing
+        if isinstance(indices, range):
+            sel = slice(indices.start, indices.stop)
+        else:
+            sel = np.asarray(indices, dtype=np.intp)
+        prices = self._price[sel].tolist()
+        change_pcts = self._change_pct[sel].tolist()
+        turnovers = self._turnover[sel].tolist()
+        timestamps = self._ts[sel].tolist()
+        return [
+            QuoteRecord(
+                symbol=self._symbols[idx],
+                price=prices[pos],
+                change_pct=change_pcts[pos],
+                turnover=turnovers[pos],
+                source=self._sources[idx],
+                ts=timestamps[pos],
+            )
+            for pos, idx in enumerate(indices)
+        ]
+
+    def get(self, symbol: str) -> QuoteRecord | None:
+        with self._lock:
+            idx = self._index.get(symbol)
+            if idx is None:
+                return None
+            return self._materialize(idx)
+
+    def list_many(self, symbols: list[str]) -> list[QuoteRecord]:
+        with self._lock:
+            indices = [self._index[s] for s in symbols if s in self._index]
+            return self._materialize_many(indices)
+
+    def list_all(self) -> list[QuoteRecord]:
+        with self._lock:
+            return self._materialize_many(range(len(self._symbols)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index.clear()
+            self._symbols.clear()
+            self._sources.clear()
+            self._wheel.reset()
+            if self.tick_history is not None:
+                self.tick_history.clear()
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def stale_count(self, now: int, stale_after_sec: int) -> int:
+        with self._lock:
+            size = len(self._symbols)
+            return self._wheel.stale_count(now - stale_after_sec, lambda: self._ts[:size].tolist())
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import time
+
+from app.services.quote_cache import QuoteCache, QuoteRecord
+
+ROLE_WRITER = "writer"
+ROLE_READER = "reader"
+
+_MAGIC = b"KISQ"
+_VERSION = 1
+# magic, version, capacity, published slot count, ws-state seq, ws_connected, reconnect_count,
+# last heartbeat ts, last message ts, writer pid
+_HEADER = struct.Struct("<4sIIIQIIqqI")
+_HEADER_SIZE = 64
+_COUNT_OFFSET = 12
+_WS_SEQ_OFFSET = 16
+_WS_STATE = struct.Struct("<IIqq")
+_WS_STATE_OFFSET = 24
+# set by a writer that replaced this table, in the header padding after the writer pid
+_RETIRED = struct.Struct("<I")
+_RETIRED_OFFSET = 52
+# seq, symbol, price, change_pct, turnover, ts, source
+_SLOT = struct.Struct("<Q16sdddq16s")
+_SEQ = struct.Struct("<Q")
+_COUNT = struct.Struct("<I")
+# a reader that keeps seeing a write in progress gives up and reports a miss
+_MAX_READ_SPINS = 1000
+_REOPEN_CHECK_SEC = 1.0
+
+
+def _encode(text: str, field: str) -> bytes:
+    raw = text.encode("utf-8")
+    if len(raw) > 16:
+        raise ValueError(f"{field} longer than 16 bytes: {text!r}")
+    return raw
+
+
+def _decode(raw: bytes) -> str:
+    return raw.rstrip(b"\x00").decode("utf-8")
+
+
+# decoded ``source`` labels; only a handful ever exist (kis-ws, kis-rest, demo)
+_SOURCES: dict[bytes, str] = {}
+
+
+class SharedQuoteTable:
+    """Fixed-slot quote table in a memory-mapped file, written by one process.
+
+    Each symbol owns a slot guarded by a sequence counter (seqlock): the writer bumps it to
+    odd, writes the fields, then bumps it to even; a reader copies the slot and retries if
+    the counter was odd or changed underneath it. Readers therefore never block the writer
+    and never take a lock. New slots become visible by bumping the header's published count
+    after the slot is written, so a reader that sees slot ``i`` in the count sees its symbol.
+
+    The ordering relies on CPython issuing each ``pack_into`` as a plain store into the
+    shared mapping and on the store order of x86-64; that is the only platform this mode is
+    deployed on.
+
+    A writer that recreates the table (restart or ``clear``) marks the table it replaced as
+    retired, so readers still mapped to it notice on their next read. The file descriptor is
+    closed once mapped; a mapping nobody closes explicitly is released with its last reference.
+    """
+
+    def __init__(self, path: str, *, capacity: int = 4096, create: bool = False) -> None:
+        self.path = path
+        self.capacity = max(1, int(capacity))
+        if create:
+            self._create()
+        fd = os.open(path, os.O_RDWR if create else os.O_RDONLY)
+        try:
+            stat = os.fstat(fd)
+            self.inode = stat.st_ino
+            access = mmap.ACCESS_WRITE if create else mmap.ACCESS_READ
+            self._buf = mmap.mmap(fd, stat.st_size, access=access)
+        finally:
+            # the mapping holds its own reference to the file
+            os.close(fd)
+        magic, version, capacity, *_ = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a v{_VERSION} shared quote table")
+        self.capacity = capacity
+
+    def _create(self) -> None:
+        # build the file aside and rename it in: readers mapped to a previous table keep a
+        # valid (if frozen) mapping instead of faulting on a truncated file
+        size = _HEADER_SIZE + self.capacity * _SLOT.size
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fp:
+            fp.truncate(size)
+            fp.write(_HEADER.pack(_MAGIC, _VERSION, self.capacity, 0, 0, 0, 0, 0, 0, os.getpid()))
+        previous = self._map_previous_header()
+        os.replace(tmp_path, self.path)
+        if previous is not None:
+            _RETIRED.pack_into(previous, _RETIRED_OFFSET, 1)
+            previous.close()
+
+    def _map_previous_header(self) -> mmap.mmap | None:
+        try:
+            fd = os.open(self.path, os.O_RDWR)
+        except OSError:
+            return None
+        try:
+            if os.fstat(fd).st_size < _HEADER_SIZE:
+                return None
+            header = mmap.mmap(fd, _HEADER_SIZE, access=mmap.ACCESS_WRITE)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+        if header[:4] != _MAGIC:
+            header.close()
+            return None
+        return header
+
+    def close(self) -> None:
+        self._buf.close()
+
+    def retired(self) -> bool:
+        return _RETIRED.unpack_from(self._buf, _RETIRED_OFFSET)[0] != 0
+
+    def count(self) -> int:
+        return _COUNT.unpack_from(self._buf, _COUNT_OFFSET)[0]
+
+    def _slot_offset(self, idx: int) -> int:
+        return _HEADER_SIZE + idx * _SLOT.size
+
+    def write(self, idx: int, row: QuoteRecord) -> None:
+        offset = self._slot_offset(idx)
+        seq = _SEQ.unpack_from(self._buf, offset)[0]
+        _SEQ.pack_into(self._buf, offset, seq + 1)
+        _SLOT.pack_into(
+            self._buf,
+            offset,
+            seq + 1,
+            _encode(row.symbol, "symbol"),
+            row.price,
+            row.change_pct,
+            row.turnover,
+            row.ts,
+            _encode(row.source, "source"),
+        )
+        _SEQ.pack_into(self._buf, offset, seq + 2)
+
+    def publish_count(self, count: int) -> None:
+        _COUNT.pack_into(self._buf, _COUNT_OFFSET, count)
+
+    def read(self, idx: int, symbol: str | None = None) -> QuoteRecord | None:
+        offset = self._slot_offset(idx)
+        buf = self._buf
+        for _ in range(_MAX_READ_SPINS):
+            before, raw_symbol, price, change_pct, turnover, ts, raw_source = _SLOT.unpack_from(buf, offset)
+            if before & 1 or _SEQ.unpack_from(buf, offset)[0] != before:
+                continue
+            source = _SOURCES.get(raw_source)
+            if source is None:
+                source = _SOURCES.setdefault(raw_source, _decode(raw_source))
+            return QuoteRecord(
+                symbol=symbol or _decode(raw_symbol),
+                price=price,
+                change_pct=change_pct,
+                turnover=turnover,
+                source=source,
+                ts=ts,
+            )
+        return None
+
+    def read_symbol(self, idx: int) -> str:
+        # a slot's symbol is written once, before the slot is published
+        return _decode(self._buf[self._slot_offset(idx) + 8 : self._slot_offset(idx) + 24])
+
+    def write_ws_state(self, *, connected: bool, reconnect_count: int, heartbeat_ts: int, message_ts: int) -> None:
+        seq = _SEQ.unpack_from(self._buf, _WS_SEQ_OFFSET)[0]
+        _SEQ.pack_into(self._buf, _WS_SEQ_OFFSET, seq + 1)
+        _WS_STATE.pack_into(self._buf, _WS_STATE_OFFSET, int(connected), reconnect_count, heartbeat_ts, message_ts)
+        _SEQ.pack_into(self._buf, _WS_SEQ_OFFSET, seq + 2)
+
+    def read_ws_state(self) -> dict | None:
+        for _ in range(_MAX_READ_SPINS):
+            before = _SEQ.unpack_from(self._buf, _WS_SEQ_OFFSET)[0]
+            connected, reconnect_count, heartbeat_ts, message_ts = _WS_STATE.unpack_from(self._buf, _WS_STATE_OFFSET)
+            if before & 1 or _SEQ.unpack_from(self._buf, _WS_SEQ_OFFSET)[0] != before:
+                continue
+            return {
+                "connected": bool(connected),
+                "reconnect_count": reconnect_count,
+                "heartbeat_ts": heartbeat_ts or None,
+                "message_ts": message_ts or None,
+            }
+        return None
+
+    def writer_pid(self) -> int:
+        return _HEADER.unpack_from(self._buf, 0)[-1]
+
+
+class SharedQuoteCache(QuoteCache):
+    """``QuoteCache`` mirrored into a ``SharedQuoteTable`` for multi-worker deployments.
+
+    The ingest process (``role="writer"``, ``python -m app.ingest``) owns the KIS websocket
+    and keeps the regular dict cache; every stored row is also written to its table slot.
+    API workers (``role="reader"``) hold no rows of their own: reads go straight to the
+    mapped table, lock-free, so HTTP reads scale across worker processes while one process
+    keeps the single KIS session. Readers are read-only and tolerate the table appearing
+    after them or being recreated by a restarted writer: every read checks the mapped
+    table's retired flag (and the path's inode once a second) and remaps. A reader works on
+    one ``(table, slots, count)`` view per call, swapped whole, so a concurrent remap never
+    pairs an index with the wrong table.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        role: str = ROLE_READER,
+        capacity: int = 4096,
+        tick_history_depth: int = 0,
+    ) -> None:
+        if role not in {ROLE_WRITER, ROLE_READER}:
+            raise ValueError("QUOTE_SHM_ROLE must be one of: writer, reader")
+        super().__init__(tick_history_depth=tick_history_depth if role == ROLE_WRITER else 0)
+        self.path = path
+        self.role = role
+        self.read_only = role == ROLE_READER
+        # writer side: the table it owns and symbol -> slot
+        self._table: SharedQuoteTable | None = None
+        self._slots: dict[str, int] = {}
+        # reader side: (mapped table, symbol -> slot, published slots indexed), replaced whole
+        self._view: tuple[SharedQuoteTable | None, dict[str, int], int] = (None, {}, 0)
+        self._next_reopen_check = 0.0
+        self.read_misses = 0
+        self.overflow_writes = 0
+        self.table_reopens = 0
+        if role == ROLE_WRITER:
+            self._table = SharedQuoteTable(path, capacity=capacity, create=True)
+        else:
+            self._reopen_if_replaced(force=True)
+
+    # -- writer ---------------------------------------------------------------------------
+
+    def _put(self, row: QuoteRecord) -> None:
+        if self.read_only:
+            raise RuntimeError("shared quote cache is read-only in API workers")
+        super()._put(row)
+        idx = self._slots.get(row.symbol)
+        if idx is None:
+            idx = len(self._slots)
+            if idx >= self._table.capacity:
+                # the dict cache still serves the ingest process; readers see a miss
+                self.overflow_writes += 1
+                return
+            self._table.write(idx, row)
+            self._slots[row.symbol] = idx
+            self._table.publish_count(idx + 1)
+            return
+        self._table.write(idx, row)
+
+    def publish_ws_state(
+        self, *, connected: bool, reconnect_count: int, heartbeat_ts: int | None, message_ts: int | None
+    ) -> None:
+        if self.read_only:
+            return
+        self._table.write_ws_state(
+            connected=connected,
+            reconnect_count=reconnect_count,
+            heartbeat_ts=heartbeat_ts or 0,
+            message_ts=message_ts or 0,
+        )
+
+    def clear(self) -> None:
+        if self.read_only:
+            raise RuntimeError("shared quote cache is read-only in API workers")
+        with self._lock:
+            super().clear()
+            capacity = self._table.capacity
+            self._table.close()
+            self._table = SharedQuoteTable(self.path, capacity=capacity, create=True)
+            self._slots.clear()
+
+    # -- reader ---------------------------------------------------------------------------
+
+    def _reopen_if_replaced(self, force: bool = False) -> tuple[SharedQuoteTable | None, dict[str, int], int]:
+        view = self._view
+        table = view[0]
+        now = time.monotonic()
+        if table is not None and table.retired():
+            force = True
+        if not force and now < self._next_reopen_check:
+            return view
+        self._next_reopen_check = now + _REOPEN_CHECK_SEC
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return view
+        if table is not None and table.inode == inode:
+            return view
+        try:
+            replacement = SharedQuoteTable(self.path)
+        except (OSError, ValueError) as exc:
+            print(f"[QUOTE][shm_open_error] path={self.path} err={exc}", flush=True)
+            return view
+        # the previous table is not closed: a concurrent call may still be reading through its
+        # own view, and the mapping goes away with the last reference
+        view = (replacement, {}, 0)
+        self._view = view
+        self.table_reopens += 1
+        return view
+
+    def _sync_slots(self) -> tuple[SharedQuoteTable | None, dict[str, int], int]:
+        view = self._reopen_if_replaced()
+        table, slots, known = view
+        if table is None:
+            return view
+        count = min(table.count(), table.capacity)
+        if count == known:
+            return view
+        slots = dict(slots)
+        for idx in range(known, count):
+            slots[table.read_symbol(idx)] = idx
+        view = (table, slots, count)
+        # publish the grown index in one assignment, unless a remap replaced the table meanwhile
+        if self._view[0] is table:
+            self._view = view
+        return view
+
+    def _read(self, table: SharedQuoteTable, idx: int, symbol: str | None = None) -> QuoteRecord | None:
+        row = table.read(idx, symbol)
+        if row is None:
+            self.read_misses += 1
+        return row
+
+    def get(self, symbol: str) -> QuoteRecord | None:
+        if not self.read_only:
+            return super().get(symbol)
+        table, slots, _ = self._reopen_if_replaced()
+        idx = slots.get(symbol)
+        if idx is None:
+            table, slots, _ = self._sync_slots()
+            idx = slots.get(symbol)
+        return None if idx is None else self._read(table, idx, symbol)
+
+    def list_many(self, symbols: list[str]) -> list[QuoteRecord]:
+        if not self.read_only:
+            return super().list_many(symbols)
+        out = []
+        for symbol in symbols:
+            row = self.get(symbol)
+            if row is not None:
+                out.append(row)
+        return out
+
+    def list_all(self) -> list[QuoteRecord]:
+        if not self.read_only:
+            return super().list_all()
+        table, _, count = self._sync_slots()
+        rows = (self._read(table, idx) for idx in range(count))
+        return [row for row in rows if row is not None]
+
+    def __len__(self) -> int:
+        if not self.read_only:
+            return super().__len__()
+        return self._sync_slots()[2]
+
+    def stale_count(self, now: int, stale_after_sec: int) -> int:
+        if not self.read_only:
+            return super().stale_count(now, stale_after_sec)
+        # metrics path only: a full scan of the mapped slots, no expiry wheel across processes
+        cutoff = now - stale_after_sec
+        return sum(1 for row in self.list_all() if row.ts < cutoff)
+
+    def ws_state(self) -> dict | None:
+        """WS session state published by the ingest process (reader side)."""
+        if not self.read_only:
+            return None
+        table = self._reopen_if_replaced()[0]
+        return None if table is None else table.read_ws_state()
+
+    def metrics(self) -> dict:
+        table, _, count = self._view if self.read_only else (self._table, self._slots, len(self._slots))
+        return {
+            "quote_shm_role": self.role,
+            "quote_shm_capacity": None if table is None else table.capacity,
+            "quote_shm_slots": count,
+            "quote_shm_read_misses": self.read_misses,
+            "quote_shm_overflow_writes": self.overflow_writes,
+            "quote_shm_table_reopens": self.table_reopens,
+            "quote_shm_writer_pid": None if table is None else table.writer_pid(),
+        }
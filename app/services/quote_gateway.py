@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import random
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from typing import Callable
 
 from app.errors import RestRateLimitCooldownError
-from app.schemas.quote import QuoteSnapshot
 from app.services.market_hours import is_market_open
-from app.services.quote_cache import QuoteCache
+from app.services.quote_cache import QuoteCache, QuoteRecord
+from app.services.single_flight import SingleFlight
 
 
 @dataclass
@@ -37,9 +40,15 @@ class QuoteGatewayService:
         rest_backoff_base_sec: float = 0.25,
         symbol_delay_min_sec: float = 0.3,
         symbol_delay_max_sec: float = 0.8,
+        auto_subscription=None,
+        async_rest_client=None,
+        rest_concurrency: int = 1,
+        batch_deadline_sec: float | None = None,
     ) -> None:
         self.quote_cache = quote_cache
         self.rest_client = rest_client
+        # optional AsyncKisRestClient used by get_quote_async (async route handlers)
+        self.async_rest_client = async_rest_client
         self.market_open_checker = market_open_checker or is_market_open
         self.stale_after_sec = stale_after_sec
         self.rest_cooldown_sec = rest_cooldown_sec
@@ -47,6 +56,16 @@ class QuoteGatewayService:
         self.rest_backoff_base_sec = max(0.01, float(rest_backoff_base_sec))
         self.symbol_delay_min_sec = max(0.0, float(symbol_delay_min_sec))
         self.symbol_delay_max_sec = max(self.symbol_delay_min_sec, float(symbol_delay_max_sec))
+        # optional AutoSubscriptionManager fed with every requested symbol
+        self.auto_subscription = auto_subscription
+        # >1 fans batch REST fallbacks out over a pool; pacing is left to the client's rate limiter
+        self.rest_concurrency = max(1, int(rest_concurrency))
+        self.batch_deadline_sec = batch_deadline_sec if batch_deadline_sec and batch_deadline_sec > 0 else None
+        self._rest_pool: ThreadPoolExecutor | None = None
+        self._rest_pool_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        # concurrent misses for one symbol share a single in-flight REST fetch
+        self._rest_flights = SingleFlight()
 
         self.rest_fallbacks = 0
         self._rest_symbol_cooldown_until: dict[str, int] = {}
@@ -59,12 +78,15 @@ class QuoteGatewayService:
         self.last_batch_market_open = True
         self.last_batch_failed_symbols: list[str] = []
         self.last_batch_missing_count = 0
+        self.last_batch_elapsed_ms = 0.0
+        self.batch_deadline_hits = 0
 
-    def _is_fresh(self, snapshot: QuoteSnapshot, now: int) -> bool:
-        age = float(max(now - snapshot.ts, 0))
-        snapshot.freshness_sec = age
-        snapshot.state = "HEALTHY" if age <= self.stale_after_sec else "STALE"
-        return age <= self.stale_after_sec
+    def _is_fresh(self, snapshot: QuoteRecord, now: int) -> bool:
+        return snapshot.age_sec(now) <= self.stale_after_sec
+
+    def _with_freshness(self, snapshot: QuoteRecord, now: int) -> QuoteRecord:
+        # cached rows are shared with the WS ingest thread; derive freshness on a copy
+        return snapshot.with_freshness(now, self.stale_after_sec)
 
     def _prune_expired_cooldowns(self, now: int) -> None:
         expired = [s for s, until in self._rest_symbol_cooldown_until.items() if until <= now]
@@ -86,78 +108,105 @@ class QuoteGatewayService:
             return code
         return None
 
-    def _last_good_quote(self, symbol: str, now: int) -> QuoteSnapshot | None:
+    def _last_good_quote(self, symbol: str, now: int) -> QuoteRecord | None:
         cached = self.quote_cache.get(symbol)
         if cached is None:
             return None
-        self._is_fresh(cached, now)
-        return cached
+        return self._with_freshness(cached, now)
 
     def _sleep_with_jitter(self) -> None:
+        # a paced KisRestClient already spaces calls at the real quota
+        if getattr(self.rest_client, "rate_limiter", None) is not None:
+            return
         if self.symbol_delay_max_sec <= 0:
             return
         delay = random.uniform(self.symbol_delay_min_sec, self.symbol_delay_max_sec)
         if delay > 0:
             time.sleep(delay)
 
-    def _sleep_backoff(self, attempt_index: int) -> None:
+    def _backoff_delay(self, attempt_index: int) -> float:
         # attempt_index starts at 0
-        delay = self.rest_backoff_base_sec * (2 ** attempt_index)
+        return self.rest_backoff_base_sec * (2 ** attempt_index)
+
+    def _sleep_backoff(self, attempt_index: int) -> None:
+        delay = self._backoff_delay(attempt_index)
         if delay > 0:
             time.sleep(delay)
 
-    def _build_snapshot(self, payload: dict, now: int) -> QuoteSnapshot:
-        return QuoteSnapshot(
-            symbol=str(payload["symbol"]),
-            price=float(payload["price"]),
-            change_pct=float(payload.get("change_pct", 0.0)),
-            turnover=float(payload.get("turnover", 0.0)),
-            source=str(payload.get("source", "kis-rest")),
-            ts=int(payload.get("ts", now)),
-            freshness_sec=0.0,
-            state="HEALTHY",
-        )
+    def _build_snapshot(self, payload: dict, now: int) -> QuoteRecord:
+        return QuoteRecord.from_payload(payload, now=now, default_source="kis-rest")
+
+    def _on_rest_error(self, symbol: str, now: int, exc: Exception, attempt: int) -> QuoteRecord | None:
+        """Cooldown / last-good handling for a failed REST attempt; ``None`` means retry."""
+        status_code = self._status_code_from_error(exc)
+        if status_code == 429:
+            self._mark_symbol_cooldown(symbol, now)
+            cached = self._last_good_quote(symbol, now)
+            if cached is not None:
+                return cached
+            raise RestRateLimitCooldownError("REST_RATE_LIMIT_COOLDOWN") from exc
+        if attempt < self.rest_retry_attempts - 1:
+            return None
+        self._mark_symbol_cooldown(symbol, now)
+        cached = self._last_good_quote(symbol, now)
+        if cached is not None:
+            return cached
+        raise exc
+
+    def _fetch_rest(self, symbol: str, now: int) -> QuoteRecord:
+        return self._rest_flights.do(symbol, lambda: self._fetch_rest_uncoalesced(symbol, now))
 
-    def _fetch_rest(self, symbol: str, now: int) -> QuoteSnapshot:
-        self.rest_fallbacks += 1
-        last_exc: Exception | None = None
+    def _fetch_rest_uncoalesced(self, symbol: str, now: int) -> QuoteRecord:
+        with self._counter_lock:
+            self.rest_fallbacks += 1
 
         for attempt in range(self.rest_retry_attempts):
             try:
                 payload = self.rest_client.get_quote(symbol)
                 return self._build_snapshot(payload, now)
             except Exception as exc:
-                last_exc = exc
-                status_code = self._status_code_from_error(exc)
-                if status_code == 429:
-                    self._mark_symbol_cooldown(symbol, now)
-                    cached = self._last_good_quote(symbol, now)
-                    if cached is not None:
-                        return cached
-                    raise RestRateLimitCooldownError("REST_RATE_LIMIT_COOLDOWN") from exc
-                if attempt < self.rest_retry_attempts - 1:
-                    self._sleep_backoff(attempt)
-                    continue
-                self._mark_symbol_cooldown(symbol, now)
-                cached = self._last_good_quote(symbol, now)
-                if cached is not None:
-                    return cached
-                raise
+                fallback = self._on_rest_error(symbol, now, exc, attempt)
+                if fallback is not None:
+                    return fallback
+                self._sleep_backoff(attempt)
+        raise RuntimeError("REST_FETCH_FAILED")
+
+    async def _fetch_rest_async(self, symbol: str, now: int) -> QuoteRecord:
+        return await self._rest_flights.do_async(symbol, lambda: self._fetch_rest_async_uncoalesced(symbol, now))
 
-        if last_exc is not None:
-            raise last_exc
+    async def _fetch_rest_async_uncoalesced(self, symbol: str, now: int) -> QuoteRecord:
+        with self._counter_lock:
+            self.rest_fallbacks += 1
+
+        for attempt in range(self.rest_retry_attempts):
+            try:
+                payload = await self.async_rest_client.get_quote(symbol)
+                return self._build_snapshot(payload, now)
+            except Exception as exc:
+                fallback = self._on_rest_error(symbol, now, exc, attempt)
+                if fallback is not None:
+                    return fallback
+                await asyncio.sleep(self._backoff_delay(attempt))
         raise RuntimeError("REST_FETCH_FAILED")
 
-    def _get_cached_ws(self, symbol: str, now: int) -> QuoteSnapshot | None:
+    def _get_cached_ws(self, symbol: str, now: int) -> QuoteRecord | None:
         cached = self.quote_cache.get(symbol)
         if cached is None:
             return None
         if self._is_fresh(cached, now):
-            return cached
+            return self._with_freshness(cached, now)
         return None
 
-    def get_quote(self, symbol: str) -> QuoteSnapshot:
-        now = int(time.time())
+    def _record_demand(self, symbol: str, *, ws_miss: bool) -> None:
+        if self.auto_subscription is None:
+            return
+        try:
+            self.auto_subscription.record(symbol, ws_miss=ws_miss)
+        except Exception as exc:
+            print(f"[QUOTE][auto_subscribe_error] symbol={symbol} error={exc}", flush=True)
+
+    def _resolve_without_rest(self, symbol: str, now: int) -> QuoteRecord | None:
+        """Cooldown and fresh-WS short circuits shared by the sync and async paths."""
         self._prune_expired_cooldowns(now)
         if self._is_symbol_cooldown(symbol, now):
             cached = self._last_good_quote(symbol, now)
@@ -168,12 +217,98 @@ class QuoteGatewayService:
         if self.market_open_checker():
             cached = self.quote_cache.get(symbol)
             if cached is not None and self._is_fresh(cached, now):
-                return cached
-            return self._fetch_rest(symbol, now)
+                self._record_demand(symbol, ws_miss=False)
+                return self._with_freshness(cached, now)
+            self._record_demand(symbol, ws_miss=True)
+            return None
+        # WS is silent outside market hours, so off-hours misses do not promote
+        self._record_demand(symbol, ws_miss=False)
+        return None
+
+    def get_quote(self, symbol: str) -> QuoteRecord:
+        now = int(time.time())
+        resolved = self._resolve_without_rest(symbol, now)
+        if resolved is not None:
+            return resolved
         return self._fetch_rest(symbol, now)
 
-    def get_quotes(self, symbols: list[str]) -> tuple[list[QuoteSnapshot], QuoteBatchMeta]:
+    async def get_quote_async(self, symbol: str) -> QuoteRecord:
+        """``get_quote`` for ``async def`` handlers; requires ``async_rest_client``."""
         now = int(time.time())
+        resolved = self._resolve_without_rest(symbol, now)
+        if resolved is not None:
+            return resolved
+        return await self._fetch_rest_async(symbol, now)
+
+    def _deadline_left(self, started: float) -> float | None:
+        if self.batch_deadline_sec is None:
+            return None
+        return self.batch_deadline_sec - (time.monotonic() - started)
+
+    def _fetch_one_for_batch(self, symbol: str, now: int) -> QuoteRecord | None:
+        try:
+            return self._fetch_rest(symbol, now)
+        except RestRateLimitCooldownError:
+            return None
+        except Exception as exc:
+            print(
+                f"[QUOTE][rest_fallback_error] symbol={symbol} error={exc}",
+                flush=True,
+            )
+            return None
+
+    def _fetch_rest_sequential(
+        self, symbols: list[str], now: int, started: float
+    ) -> tuple[dict[str, QuoteRecord], list[str]]:
+        rows: dict[str, QuoteRecord] = {}
+        for idx, symbol in enumerate(symbols):
+            left = self._deadline_left(started)
+            if left is not None and left <= 0:
+                return rows, symbols[idx:]
+            if idx > 0:
+                self._sleep_with_jitter()
+            row = self._fetch_one_for_batch(symbol, now)
+            if row is not None:
+                rows[symbol] = row
+        return rows, []
+
+    def _rest_executor(self) -> ThreadPoolExecutor:
+        with self._rest_pool_lock:
+            if self._rest_pool is None:
+                self._rest_pool = ThreadPoolExecutor(max_workers=self.rest_concurrency, thread_name_prefix="quote-rest")
+            return self._rest_pool
+
+    def _fetch_rest_concurrent(
+        self, symbols: list[str], now: int, started: float
+    ) -> tuple[dict[str, QuoteRecord], list[str]]:
+        executor = self._rest_executor()
+        futures: dict[Future, str] = {executor.submit(self._fetch_one_for_batch, symbol, now): symbol for symbol in symbols}
+        rows: dict[str, QuoteRecord] = {}
+        pending = set(futures)
+        while pending:
+            left = self._deadline_left(started)
+            if left is not None and left <= 0:
+                break
+            done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                row = future.result()
+                if row is not None:
+                    rows[futures[future]] = row
+        for future in pending:
+            # not started yet -> dropped; already in flight -> finishes in the background, result discarded
+            future.cancel()
+        timed_out = [futures[f] for f in futures if f in pending]
+        return rows, timed_out
+
+    def close(self) -> None:
+        with self._rest_pool_lock:
+            pool, self._rest_pool = self._rest_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_quotes(self, symbols: list[str]) -> tuple[list[QuoteRecord], QuoteBatchMeta]:
+        now = int(time.time())
+        started = time.monotonic()
         self._prune_expired_cooldowns(now)
 
         unique_symbols: list[str] = []
@@ -186,50 +321,54 @@ class QuoteGatewayService:
             unique_symbols.append(value)
 
         market_open = self.market_open_checker()
-        ws_rows: dict[str, QuoteSnapshot] = {}
+        ws_rows: dict[str, QuoteRecord] = {}
         for symbol in unique_symbols:
             cached = self._get_cached_ws(symbol, now)
             if cached is not None:
                 ws_rows[symbol] = cached
+            self._record_demand(symbol, ws_miss=market_open and cached is None)
 
         target_count = len(unique_symbols)
         ws_count = len(ws_rows)
-        rest_filled_count = 0
         fallback_triggered = (not market_open) or (ws_count < target_count)
 
-        out: list[QuoteSnapshot] = []
-        failed_symbols: list[str] = []
-        rest_attempt_index = 0
+        rest_symbols: list[str] = []
+        cooldown_rows: dict[str, QuoteRecord] = {}
         for symbol in unique_symbols:
             if symbol in ws_rows:
-                out.append(ws_rows[symbol])
                 continue
-
             if self._is_symbol_cooldown(symbol, now):
                 cached = self._last_good_quote(symbol, now)
                 if cached is not None:
-                    out.append(cached)
-                else:
-                    failed_symbols.append(symbol)
+                    cooldown_rows[symbol] = cached
                 continue
+            rest_symbols.append(symbol)
+
+        if self.rest_concurrency > 1 and len(rest_symbols) > 1:
+            rest_rows, timed_out = self._fetch_rest_concurrent(rest_symbols, now, started)
+        else:
+            rest_rows, timed_out = self._fetch_rest_sequential(rest_symbols, now, started)
+        rest_filled_count = len(rest_rows)
+        if timed_out:
+            self.batch_deadline_hits += 1
+            print(f"[QUOTE][batch_deadline] timed_out_symbols={timed_out}", flush=True)
+            for symbol in timed_out:
+                cached = self._last_good_quote(symbol, now)
+                if cached is not None:
+                    cooldown_rows[symbol] = cached
 
-            try:
-                if rest_attempt_index > 0:
-                    self._sleep_with_jitter()
-                rest_attempt_index += 1
-                quote = self._fetch_rest(symbol, now)
-                out.append(quote)
-                rest_filled_count += 1
-            except RestRateLimitCooldownError:
-                failed_symbols.append(symbol)
-                continue
-            except Exception as exc:
-                print(
-                    f"[QUOTE][rest_fallback_error] symbol={symbol} error={exc}",
-                    flush=True,
-                )
+        out: list[QuoteRecord] = []
+        failed_symbols: list[str] = []
+        for symbol in unique_symbols:
+            row = ws_rows.get(symbol)
+            if row is None:
+                row = rest_rows.get(symbol)
+            if row is None:
+                row = cooldown_rows.get(symbol)
+            if row is None:
                 failed_symbols.append(symbol)
-                continue
+            else:
+                out.append(row)
 
         self.ws_count = ws_count
         self.rest_filled_count = rest_filled_count
@@ -238,6 +377,7 @@ class QuoteGatewayService:
         self.last_batch_market_open = market_open
         self.last_batch_failed_symbols = list(failed_symbols)
         self.last_batch_missing_count = max(0, target_count - len(out))
+        self.last_batch_elapsed_ms = round((time.monotonic() - started) * 1000.0, 3)
         if fallback_triggered:
             self.fallback_triggered += 1
 
@@ -246,7 +386,7 @@ class QuoteGatewayService:
             f"market_open={market_open} target_count={target_count} ws_count={ws_count} "
             f"rest_filled_count={rest_filled_count} final_count={len(out)} "
             f"failed_symbols={failed_symbols} missing_count={self.last_batch_missing_count} "
-            f"fallback_triggered={int(fallback_triggered)}",
+            f"fallback_triggered={int(fallback_triggered)} elapsed_ms={self.last_batch_elapsed_ms}",
             flush=True,
         )
 
@@ -257,7 +397,7 @@ class QuoteGatewayService:
         )
 
     def metrics(self) -> dict[str, int | bool | list[str]]:
-        return {
+        out = {
             "rest_fallbacks": self.rest_fallbacks,
             "fallback_triggered": self.fallback_triggered,
             "rest_filled_count": self.rest_filled_count,
@@ -267,4 +407,11 @@ class QuoteGatewayService:
             "batch_market_open": self.last_batch_market_open,
             "batch_failed_symbols": list(self.last_batch_failed_symbols),
             "batch_missing_count": self.last_batch_missing_count,
+            "batch_elapsed_ms": self.last_batch_elapsed_ms,
+            "batch_deadline_hits": self.batch_deadline_hits,
+            "rest_concurrency": self.rest_concurrency,
+            **self._rest_flights.metrics(),
         }
+        if self.auto_subscription is not None:
+            out.update(self.auto_subscription.metrics())
+        return out
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Iterable
+
+if TYPE_CHECKING:
+    from app.services.quote_cache import QuoteRecord
+
+
+def quote_delta(row: "QuoteRecord") -> dict:
+    return {
+        "symbol": row.symbol,
+        "price": row.price,
+        "change_pct": row.change_pct,
+        "turnover": row.turnover,
+        "source": row.source,
+        "ts": row.ts,
+    }
+
+
+class ConflatingQueue:
+    """Bounded latest-value-per-symbol queue.
+
+    A symbol that is already pending has its value replaced in place (``conflated``), so a
+    slow consumer only ever sees the newest tick per symbol. At most ``max_symbols`` distinct
+    symbols are pending; ticks for further symbols are dropped and counted.
+    ``on_ready`` fires when the queue goes from empty to non-empty; ``pending_since`` is the
+    monotonic time of that transition (None while empty) and drives lag metrics.
+    """
+
+    def __init__(self, max_symbols: int = 2000, on_ready: Callable[[], None] | None = None) -> None:
+        if max_symbols < 1:
+            raise ValueError("max_symbols must be >= 1")
+        self.max_symbols = max_symbols
+        self.on_ready = on_ready
+        self._pending: OrderedDict[str, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self.pending_since: float | None = None
+        self.enqueued = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.delivered = 0
+
+    def put(self, symbol: str, item: object) -> bool:
+        with self._lock:
+            pending = self._pending
+            if symbol in pending:
+                pending[symbol] = item
+                self.conflated += 1
+                return True
+            if len(pending) >= self.max_symbols:
+                self.dropped += 1
+                return False
+            was_empty = not pending
+            if was_empty:
+                self.pending_since = time.monotonic()
+            pending[symbol] = item
+            self.enqueued += 1
+        if was_empty and self.on_ready is not None:
+            self.on_ready()
+        return True
+
+    def drain(self) -> list:
+        with self._lock:
+            if not self._pending:
+                return []
+            items = list(self._pending.values())
+            self._pending.clear()
+            self.pending_since = None
+            self.delivered += len(items)
+        return items
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class StreamSubscription:
+    """One streaming client: symbol filter + conflating queue woken on its event loop."""
+
+    def __init__(
+        self,
+        symbols: Iterable[str] | None,
+        *,
+        loop: asyncio.AbstractEventLoop,
+        max_symbols: int,
+    ) -> None:
+        self.symbols: frozenset[str] | None = frozenset(symbols) if symbols is not None else None
+        self._loop = loop
+        self._event = asyncio.Event()
+        self.queue = ConflatingQueue(max_symbols=max_symbols, on_ready=self._wake)
+
+    def _wake(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # loop already closed; the subscription is being torn down
+            pass
+
+    def wants(self, symbol: str) -> bool:
+        return self.symbols is None or symbol in self.symbols
+
+    def set_symbols(self, symbols: Iterable[str] | None) -> None:
+        self.symbols = frozenset(symbols) if symbols is not None else None
+
+    async def next_batch(self, timeout: float | None = None) -> list[dict]:
+        """Wait for pending deltas; returns ``[]`` when ``timeout`` elapses first."""
+        items = self.queue.drain()
+        if items:
+            return items
+        self._event.clear()
+        items = self.queue.drain()
+        if items:
+            return items
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        return self.queue.drain()
+
+
+class QuoteStreamHub:
+    """Push fan-out of ingested quotes to streaming clients (``/v1/stream/quotes``).
+
+    ``publish`` runs on the ingest thread and only enqueues; each client drains its own
+    queue on the event loop, so a slow client never blocks ingest or other clients.
+    """
+
+    def __init__(self, max_pending_symbols: int = 2000) -> None:
+        self.max_pending_symbols = max_pending_symbols
+        self._lock = threading.Lock()
+        # copy-on-write so publish iterates without holding the lock
+        self._subscriptions: tuple[StreamSubscription, ...] = ()
+        self.published = 0
+
+    def subscribe(self, symbols: Iterable[str] | None = None) -> StreamSubscription:
+        sub = StreamSubscription(
+            symbols,
+            loop=asyncio.get_running_loop(),
+            max_symbols=self.max_pending_symbols,
+        )
+        with self._lock:
+            self._subscriptions = self._subscriptions + (sub,)
+        return sub
+
+    def unsubscribe(self, sub: StreamSubscription) -> None:
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not sub)
+
+    def publish(self, rows: list["QuoteRecord"]) -> None:
+        subscriptions = self._subscriptions
+        self.published += len(rows)
+        if not subscriptions:
+            return
+        for row in rows:
+            delta = None
+            for sub in subscriptions:
+                if sub.wants(row.symbol):
+                    if delta is None:
+                        delta = quote_delta(row)
+                    sub.queue.put(row.symbol, delta)
+
+    def metrics(self) -> dict:
+        subscriptions = self._subscriptions
+        return {
+            "stream_subscribers": len(subscriptions),
+            "stream_published": self.published,
+            "stream_delivered": sum(s.queue.delivered for s in subscriptions),
+            "stream_conflated": sum(s.queue.conflated for s in subscriptions),
+            "stream_dropped": sum(s.queue.dropped for s in subscriptions),
+        }
+
+
+quote_stream_hub = QuoteStreamHub()
@@ -84,7 +84,9 @@ class ReconciliationService:
         corrected = 0
         events: list[dict] = []
 
-        for order_id, job in list(self.order_queue.jobs.items()):
+        # terminal orders never change again; only the active set is compared against the broker
+        for job in self.order_queue.active_jobs():
+            order_id = job["order_id"]
             checked += 1
             broker_status = self.broker_status_provider(order_id, job)
             if not broker_status:
@@ -97,6 +99,9 @@ class ReconciliationService:
 
             mismatched += 1
             corrected_status = self._apply_correction(job=job, broker_status=normalized_broker)
+            persist = getattr(self.order_queue, "persist", None)
+            if persist is not None:
+                persist(job)
             corrected += 1
             event = {
                 "order_id": order_id,
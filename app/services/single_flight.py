@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) runs ``fn``; callers arriving while it is in
+    flight block until it finishes and receive the same result or exception. Nothing is
+    cached: once the flight lands, the next call starts a new one. ``do`` serves threads,
+    ``do_async`` serves coroutines on one event loop; the two keep separate flights. An async
+    flight runs as its own task, so a cancelled leader leaves it running for the waiters.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._async_flights: dict[Hashable, asyncio.Task] = {}
+        self.issued = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.issued += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            task = self._async_flights.get(key)
+            if task is None:
+                # the flight owns the call, so cancelling whoever started it does not fail the others
+                task = asyncio.ensure_future(fn())
+                self._async_flights[key] = task
+                task.add_done_callback(lambda done, key=key: self._land_async(key, done))
+                self.issued += 1
+            else:
+                self.coalesced += 1
+        # shield: a cancelled caller (leader or waiter) must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _land_async(self, key: Hashable, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._async_flights.get(key) is task:
+                del self._async_flights[key]
+        if not task.cancelled():
+            # retrieved here so an exception nobody awaited is not logged as lost
+            task.exception()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights) + len(self._async_flights)
+
+    def metrics(self) -> dict[str, int]:
+        return {
+            "rest_fetch_issued": self.issued,
+            "rest_fetch_coalesced": self.coalesced,
+            "rest_fetch_in_flight": self.in_flight(),
+        }
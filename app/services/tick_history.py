@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from array import array
+
+
+class TickRing:
+    """Fixed-capacity per-symbol tick buffer backed by preallocated typed arrays.
+
+    Memory is ``capacity * 32`` bytes regardless of tick rate; appends overwrite the
+    oldest slot in place and never grow the buffer.
+    """
+
+    __slots__ = ("capacity", "_ts", "_price", "_change_pct", "_turnover", "_count")
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("tick ring capacity must be >= 1")
+        self.capacity = capacity
+        self._ts = array("q", bytes(8 * capacity))
+        self._price = array("d", bytes(8 * capacity))
+        self._change_pct = array("d", bytes(8 * capacity))
+        self._turnover = array("d", bytes(8 * capacity))
+        self._count = 0
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in (self._ts, self._price, self._change_pct, self._turnover))
+
+    def append(self, ts: int, price: float, change_pct: float, turnover: float) -> None:
+        pos = self._count % self.capacity
+        self._ts[pos] = ts
+        self._price[pos] = price
+        self._change_pct[pos] = change_pct
+        self._turnover[pos] = turnover
+        self._count += 1
+
+    def since(self, since_ts: int | None = None) -> list[dict]:
+        """Ticks oldest-first with ``ts > since_ts``; ``seq`` increases by one per appended tick."""
+        capacity = self.capacity
+        out: list[dict] = []
+        for seq in range(max(0, self._count - capacity), self._count):
+            pos = seq % capacity
+            ts = self._ts[pos]
+            if since_ts is not None and ts <= since_ts:
+                continue
+            out.append(
+                {
+                    "seq": seq + 1,
+                    "ts": ts,
+                    "price": self._price[pos],
+                    "change_pct": self._change_pct[pos],
+                    "turnover": self._turnover[pos],
+                }
+            )
+        return out
+
+
+class TickHistory:
+    """Per-symbol ``TickRing`` registry; a ring is preallocated on a symbol's first tick."""
+
+    def __init__(self, depth: int = 1024) -> None:
+        if depth < 1:
+            raise ValueError("tick history depth must be >= 1")
+        self.depth = depth
+        self._rings: dict[str, TickRing] = {}
+
+    def record(self, symbol: str, ts: int, price: float, change_pct: float, turnover: float) -> None:
+        ring = self._rings.get(symbol)
+        if ring is None:
+            ring = self._rings[symbol] = TickRing(self.depth)
+        ring.append(ts, price, change_pct, turnover)
+
+    def ticks(self, symbol: str, since_ts: int | None = None) -> list[dict] | None:
+        ring = self._rings.get(symbol)
+        if ring is None:
+            return None
+        return ring.since(since_ts)
+
+    def clear(self) -> None:
+        self._rings.clear()
+
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for ring in self._rings.values())
@@ -0,0 +1,92 @@
+"""Benchmark OrderQueue.enqueue throughput and latency for each WAL fsync policy.
+
+``--threads`` clients each enqueue ``--orders`` orders as fast as they can (the shape of a
+burst of API requests). ``memory`` is the baseline without a WAL. The WAL directory must
+be on the disk you deploy on: tmpfs makes every fsync free and the comparison meaningless.
+
+Usage:
+    python scripts/bench_order_wal.py [--threads 8] [--orders 500] [--dir /var/tmp]
+        [--policies memory,off,interval,group,always]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.schemas.order import OrderRequest
+from app.services.order_queue import OrderQueue
+from app.services.order_wal import OrderWal
+
+
+def _run(policy: str, threads: int, orders: int, base_dir: str | None) -> dict:
+    with tempfile.TemporaryDirectory(dir=base_dir) as directory:
+        wal = None if policy == "memory" else OrderWal(directory, fsync_policy=policy, snapshot_every=0)
+        queue = OrderQueue(wal=wal)
+        latencies: list[float] = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads + 1)
+
+        def client(n: int) -> None:
+            local = []
+            barrier.wait()
+            for i in range(orders):
+                req = OrderRequest(account_id="A1", symbol="005930", side="BUY", qty=i + 1, price=70000.0)
+                started = time.perf_counter()
+                queue.enqueue(req, f"idem-{n}-{i}")
+                local.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(local)
+
+        workers = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+        for t in workers:
+            t.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - started
+        metrics = queue.metrics()
+        if wal is not None:
+            wal.close()
+
+    latencies.sort()
+    total = threads * orders
+    return {
+        "policy": policy,
+        "orders_per_sec": round(total / elapsed),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+        "fsyncs": metrics.get("wal_fsyncs", 0),
+        "records_per_fsync": metrics.get("wal_records_per_fsync"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--dir", default=None, help="parent directory for the WAL (default: system temp)")
+    parser.add_argument("--policies", default="memory,off,interval,group,always")
+    args = parser.parse_args()
+
+    print(f"threads={args.threads} orders/thread={args.orders}")
+    print(f"{'policy':<10}{'orders/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'fsyncs':>9}{'rec/fsync':>11}")
+    for policy in args.policies.split(","):
+        row = _run(policy.strip(), args.threads, args.orders, args.dir)
+        print(
+            f"{row['policy']:<10}{row['orders_per_sec']:>10}{row['p50_ms']:>10}{row['p99_ms']:>10}"
+            f"{row['fsyncs']:>9}{str(row['records_per_fsync']):>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark dict vs columnar QuoteCache stale counts and batch reads over a universe.
+
+Usage:
+    python scripts/bench_quote_cache.py [--symbols 350] [--rounds 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.services.quote_cache import QuoteCache, QuoteRecord, create_quote_cache
+
+
+def fill(cache: QuoteCache, symbols: list[str], now: int) -> None:
+    cache.upsert_many(
+        [QuoteRecord(symbol=s, price=70000.0 + i, ts=now - (i % 10)) for i, s in enumerate(symbols)]
+    )
+
+
+def per_call_us(fn: Callable[[], object], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=350)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    now = 1_700_000_000
+    symbols = [f"{i:06d}" for i in range(args.symbols)]
+    batch = symbols[:: max(1, len(symbols) // 40)][:40]
+
+    print(f"{'mode':>9} {'stale us':>11} {'list_many(40) us':>17} {'list_all us':>12}")
+    for mode in ("dict", "columnar"):
+        cache = create_quote_cache(mode)
+        fill(cache, symbols, now)
+        stale = per_call_us(lambda: cache.stale_count(now, 5), args.rounds)
+        many = per_call_us(lambda: cache.list_many(batch), args.rounds)
+        every = per_call_us(cache.list_all, max(1, args.rounds // 10))
+        print(f"{mode:>9} {stale:>11,.1f} {many:>17,.1f} {every:>12,.1f}")
+
+
+if __name__ == "__main__":
+    main()
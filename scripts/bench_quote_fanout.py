@@ -0,0 +1,139 @@
+"""Benchmark batch quote REST fallback: sequential+jitter vs concurrent fan-out.
+
+Starts a local fake KIS server (token + inquire-price) that answers after ``--latency-ms``
+and reports the peak number of requests it saw in any one-second window, so the run
+also checks that the token bucket keeps fan-out under the configured quota.
+
+Variants (cold cache, market closed, so every symbol goes to REST):
+  * ``sequential``: previous behaviour, unpaced client with 0.3-0.8s random sleeps
+  * ``concurrent``: ``--concurrency`` workers over a client paced by ``RestRateLimiter``
+
+Usage:
+    python scripts/bench_quote_fanout.py [--symbols 20] [--latency-ms 80] [--concurrency 8]
+        [--rate 18] [--deadline-sec 0] [--skip-sequential]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.integrations.kis_rest import KisRestClient
+from app.integrations.rate_limiter import RestRateLimiter
+from app.services.quote_cache import QuoteCache
+from app.services.quote_gateway import QuoteGatewayService
+
+
+class _FakeKisServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # listen backlog; the stdlib default of 5 stalls bursts on SYN retries
+
+    def __init__(self, latency_ms: float) -> None:
+        super().__init__(("127.0.0.1", 0), _FakeKisHandler)
+        self.latency_sec = latency_ms / 1000.0
+        self.per_second: Counter = Counter()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def peak_per_second(self) -> int:
+        with self.lock:
+            return max(self.per_second.values(), default=0)
+
+
+class _FakeKisHandler(BaseHTTPRequestHandler):
+    server: _FakeKisServer
+    protocol_version = "HTTP/1.1"  # keep-alive, as KIS serves it
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler signature
+        pass
+
+    def _reply(self, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        self._reply({"access_token": "bench-token", "expires_in": 86400})
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.per_second[int(time.time())] += 1
+            self.server.in_flight += 1
+            self.server.peak_in_flight = max(self.server.peak_in_flight, self.server.in_flight)
+        time.sleep(self.server.latency_sec)
+        with self.server.lock:
+            self.server.in_flight -= 1
+        self._reply({"rt_cd": "0", "output": {"stck_prpr": "70000", "prdy_ctrt": "0.5", "acml_tr_pbmn": "1"}})
+
+
+def _symbols(count: int) -> list[str]:
+    return [f"{100000 + idx:06d}" for idx in range(count)]
+
+
+def run_variant(name: str, server: _FakeKisServer, args: argparse.Namespace) -> None:
+    rate_limiter = None
+    if name == "concurrent":
+        rate_limiter = RestRateLimiter(rate_per_sec=args.rate)
+    client = KisRestClient(app_key="bench", app_secret="bench", base_url=server.base_url, rate_limiter=rate_limiter)
+    client.get_access_token()
+    service = QuoteGatewayService(
+        quote_cache=QuoteCache(),
+        rest_client=client,
+        market_open_checker=lambda: False,
+        rest_concurrency=args.concurrency if name == "concurrent" else 1,
+        batch_deadline_sec=args.deadline_sec,
+    )
+    with server.lock:
+        server.per_second.clear()
+    started = time.perf_counter()
+    quotes, meta = service.get_quotes(_symbols(args.symbols))
+    elapsed = time.perf_counter() - started
+    service.close()
+    print(
+        f"{name:>10}: {elapsed * 1000:8.1f}ms final={meta.final_count}/{meta.target_count} "
+        f"missing={meta.missing_count} peak_req_per_sec={server.peak_per_second()}",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=18.0)
+    parser.add_argument("--deadline-sec", type=float, default=0.0)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    server = _FakeKisServer(args.latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        variants = ["concurrent"] if args.skip_sequential else ["sequential", "concurrent"]
+        for name in variants:
+            run_variant(name, server, args)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
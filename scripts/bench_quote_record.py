@@ -0,0 +1,77 @@
+"""Benchmark per-tick build cost and per-symbol memory of cached quote rows.
+
+Compares the pydantic ``QuoteSnapshot`` schema (previously built on every tick) with the
+slotted ``QuoteRecord`` now stored by ``QuoteCache``.
+
+Usage:
+    python scripts/bench_quote_record.py [--ticks 200000] [--symbols 10000]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.schemas.quote import QuoteSnapshot
+from app.services.quote_cache import QuoteRecord
+
+
+def build_pydantic(payload: dict, now: int) -> QuoteSnapshot:
+    return QuoteSnapshot(
+        symbol=payload["symbol"],
+        price=float(payload["price"]),
+        change_pct=float(payload.get("change_pct", 0.0)),
+        turnover=float(payload.get("turnover", 0.0)),
+        source=str(payload.get("source", "kis-ws")),
+        ts=int(payload.get("ts", now)),
+        freshness_sec=0.0,
+        state="HEALTHY",
+    )
+
+
+def build_record(payload: dict, now: int) -> QuoteRecord:
+    return QuoteRecord.from_payload(payload, now=now, default_source="kis-ws")
+
+
+def per_tick_ns(build: Callable[[dict, int], Any], ticks: int) -> float:
+    payload = {"symbol": "005930", "price": 71300.0, "change_pct": 1.49, "turnover": 2233445566.0, "ts": 1700000000}
+    started = time.perf_counter_ns()
+    for _ in range(ticks):
+        build(payload, 1700000000)
+    return (time.perf_counter_ns() - started) / ticks
+
+
+def bytes_per_symbol(build: Callable[[dict, int], Any], symbols: int) -> float:
+    payloads = [
+        {"symbol": f"{idx:06d}", "price": 70000.0 + idx, "change_pct": 0.5, "turnover": 1e9 + idx, "ts": 1700000000}
+        for idx in range(symbols)
+    ]
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    rows = {p["symbol"]: build(p, 1700000000) for p in payloads}
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(rows) == symbols
+    return (after - before) / symbols
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=200_000)
+    parser.add_argument("--symbols", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'row type':>14} {'ns/tick':>10} {'bytes/symbol':>14}")
+    for name, build in (("QuoteSnapshot", build_pydantic), ("QuoteRecord", build_record)):
+        print(f"{name:>14} {per_tick_ns(build, args.ticks):>10,.0f} {bytes_per_symbol(build, args.symbols):>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
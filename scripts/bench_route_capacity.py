@@ -0,0 +1,155 @@
+"""Load test: concurrent request capacity of portfolio/quote routes, sync vs async REST client.
+
+Runs the gateway under uvicorn (lifespan off) in front of the local fake KIS server from
+``bench_quote_fanout.py`` and fires ``--requests`` concurrent GETs at ``--path``.
+
+  * ``sync``: ``KisRestClient`` called via Starlette's threadpool (``--threadpool`` workers,
+    Starlette default 40) -- each in-flight KIS call holds one worker
+  * ``async``: ``AsyncKisRestClient`` awaited on the event loop
+
+The fake KIS server and the load generator run in separate processes. Reports wall time,
+throughput and the peak number of KIS calls in flight (i.e. how many requests the gateway
+could actually serve concurrently).
+
+Usage:
+    python scripts/bench_route_capacity.py [--requests 400] [--latency-ms 200]
+        [--path /v1/positions?account_id=12345678-01] [--threadpool 40]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import anyio.to_thread
+import httpx
+import uvicorn
+
+from app.integrations.http_session import PooledSession
+from app.integrations.kis_rest import KisRestClient
+from app.integrations.kis_rest_async import AsyncKisRestClient
+from app.main import app
+from bench_quote_fanout import _FakeKisServer
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _kis_process(latency_ms: float, ready: mp.Queue, peak: mp.Value, reset: mp.Event) -> None:
+    kis = _FakeKisServer(latency_ms)
+    ready.put(kis.base_url)
+
+    def _publish_peak() -> None:
+        while True:
+            if reset.is_set():
+                with kis.lock:
+                    kis.peak_in_flight = 0
+                reset.clear()
+            peak.value = kis.peak_in_flight
+            time.sleep(0.05)
+
+    threading.Thread(target=_publish_peak, daemon=True).start()
+    kis.serve_forever()
+
+
+def _load_process(url: str, count: int, out: mp.Queue) -> None:
+    out.put(asyncio.run(_fire(url, count)))
+
+
+class _ThreadpoolLimit:
+    """Sets Starlette's (anyio) threadpool size once the server loop is running."""
+
+    def __init__(self, tokens: int) -> None:
+        self.tokens = tokens
+
+    async def __call__(self, scope, receive, send):
+        anyio.to_thread.current_default_thread_limiter().total_tokens = self.tokens
+        await app(scope, receive, send)
+
+
+def _serve(port: int, threadpool: int) -> uvicorn.Server:
+    config = uvicorn.Config(_ThreadpoolLimit(threadpool), host="127.0.0.1", port=port, lifespan="off", log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def _fire(url: str, count: int) -> tuple[float, int]:
+    limits = httpx.Limits(max_connections=count, max_keepalive_connections=count)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        await client.get(url)  # warm-up: token issuance, connection pools
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(url) for _ in range(count)))
+        elapsed = time.perf_counter() - started
+    return elapsed, sum(1 for r in responses if r.status_code == 200)
+
+
+def run_mode(mode: str, kis_url: str, kis_peak: mp.Value, kis_reset: mp.Event, args: argparse.Namespace) -> None:
+    service = app.state.quote_gateway_service
+    service.market_open_checker = lambda: False
+    service.rest_client = KisRestClient(
+        app_key="bench", app_secret="bench", base_url=kis_url, session=PooledSession(pool_maxsize=args.requests)
+    )
+    service.async_rest_client = None
+    if mode == "async":
+        service.async_rest_client = AsyncKisRestClient(
+            app_key="bench", app_secret="bench", base_url=kis_url, max_connections=args.requests
+        )
+    port = _free_port()
+    server = _serve(port, args.threadpool)
+    try:
+        kis_reset.set()
+        time.sleep(0.2)
+        out: mp.Queue = mp.Queue()
+        loader = mp.Process(target=_load_process, args=(f"http://127.0.0.1:{port}{args.path}", args.requests, out))
+        loader.start()
+        elapsed, ok = out.get()
+        loader.join()
+    finally:
+        server.should_exit = True
+    print(
+        f"{mode:>6}: {elapsed * 1000:8.1f}ms ok={ok}/{args.requests} "
+        f"throughput={ok / elapsed:7.1f} req/s peak_kis_in_flight={kis_peak.value}",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--path", default="/v1/positions?account_id=12345678-01")
+    parser.add_argument("--threadpool", type=int, default=40)
+    args = parser.parse_args()
+
+    # fake KIS and the load generator run in their own processes so they do not share the GIL
+    ready: mp.Queue = mp.Queue()
+    kis_peak = mp.Value("i", 0)
+    kis_reset = mp.Event()
+    kis = mp.Process(target=_kis_process, args=(args.latency_ms, ready, kis_peak, kis_reset), daemon=True)
+    kis.start()
+    kis_url = ready.get()
+    try:
+        for mode in ("sync", "async"):
+            run_mode(mode, kis_url, kis_peak, kis_reset, args)
+    finally:
+        kis.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Micro-benchmark for the H0STCNT0 pipe-frame decoder and batch ingest.
+
+Compares the current decoder in ``app.integrations.kis_ws`` against the previous
+list-of-stripped-fields + per-record ``re.fullmatch`` implementation (kept here
+verbatim as the baseline) and prints frames/sec for single- and multi-record frames.
+It then measures end-to-end frame ingest (parse + cache write) for 1/5/50 records
+per frame, dispatching per quote (on_message) versus once per frame (on_batch).
+
+Usage:
+    python scripts/bench_ws_decode.py [--frames 200000]
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.integrations.kis_ws import KisWsClient, _decode_pipe_realtime_records, _to_float_default
+from app.services.quote_cache import QuoteCache, QuoteIngestWorker
+
+
+def _baseline_decode(payload: str) -> Dict[str, Any] | None:
+    if "|" not in payload or "^" not in payload:
+        return None
+    parts = payload.split("|", 3)
+    if len(parts) < 4:
+        return None
+    if parts[1].strip() != "H0STCNT0":
+        return None
+    try:
+        data_cnt = int(parts[2].strip())
+    except (TypeError, ValueError):
+        return None
+    if data_cnt <= 0:
+        return None
+
+    fields = [f.strip() for f in parts[3].split("^")]
+    chunk_size = 46
+    if len(fields) != data_cnt * chunk_size:
+        return None
+
+    for idx in range(data_cnt):
+        chunk = fields[idx * chunk_size : (idx + 1) * chunk_size]
+        symbol = chunk[0]
+        if not re.fullmatch(r"\d{6}", symbol):
+            continue
+        try:
+            price = float(chunk[2])
+        except (TypeError, ValueError):
+            continue
+        if price <= 0:
+            continue
+        quote: Dict[str, Any] = {"symbol": symbol, "price": price, "source": "kis-ws"}
+        if chunk[1]:
+            quote["trade_time"] = chunk[1]
+        quote["change_pct"] = _to_float_default(chunk[5], default=0.0)
+        quote["turnover"] = _to_float_default(chunk[14], default=0.0)
+        return quote
+    return None
+
+
+def build_frame(records: int) -> str:
+    body: list[str] = []
+    for idx in range(records):
+        fields = [str(1000 + n) for n in range(46)]
+        fields[0] = f"{5930 + idx:06d}"
+        fields[1] = "093001"
+        fields[2] = "71300"
+        fields[5] = "1.49"
+        fields[14] = "2233445566"
+        body.extend(fields)
+    return f"0|H0STCNT0|{records:03d}|" + "^".join(body)
+
+
+def measure(decode: Callable[[str], Any], frame: str, frames: int) -> float:
+    started = time.perf_counter()
+    for _ in range(frames):
+        decode(frame)
+    elapsed = time.perf_counter() - started
+    return frames / elapsed if elapsed > 0 else float("inf")
+
+
+def _first_record(frame: str) -> Dict[str, Any] | None:
+    records = _decode_pipe_realtime_records(frame)
+    return records[0] if records else None
+
+
+def measure_ingest(frame: str, frames: int, *, batched: bool) -> float:
+    worker = QuoteIngestWorker(QuoteCache())
+    if batched:
+        client = KisWsClient(on_batch=worker.on_ws_batch)
+    else:
+        client = KisWsClient(on_message=worker.on_ws_message)
+    return measure(client.handle_raw_batch, frame, frames)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # baseline decodes only the first record of a frame; the current decoder decodes all of them
+    print(f"{'records/frame':>14} {'baseline f/s':>14} {'current f/s':>14} {'speedup':>8}")
+    for records in (1, 5):
+        frame = build_frame(records)
+        assert _baseline_decode(frame) == _first_record(frame)
+        before = measure(_baseline_decode, frame, args.frames)
+        after = measure(_first_record, frame, args.frames)
+        print(f"{records:>14} {before:>14,.0f} {after:>14,.0f} {after / before:>7.2f}x")
+
+    ingest_frames = max(1, args.frames // 20)
+    print()
+    print(f"{'records/frame':>14} {'per-quote f/s':>14} {'batch f/s':>14} {'batch q/s':>14} {'speedup':>8}")
+    for records in (1, 5, 50):
+        frame = build_frame(records)
+        n = max(1, ingest_frames // records)
+        per_quote = measure_ingest(frame, n, batched=False)
+        batched = measure_ingest(frame, n, batched=True)
+        print(
+            f"{records:>14} {per_quote:>14,.0f} {batched:>14,.0f} {batched * records:>14,.0f} "
+            f"{batched / per_quote:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
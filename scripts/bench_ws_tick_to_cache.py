@@ -0,0 +1,188 @@
+"""Benchmark tick-to-cache latency of the thread vs asyncio KIS websocket clients.
+
+A producer thread plays the network: it timestamps each H0STCNT0 frame and hands it to a
+fake socket. The thread variant reads it in ``WebSocketApp.run_forever`` on its own thread
+(as ``app.main`` runs it); the async variant reads it on the event loop. Latency is measured
+from hand-off until ``QuoteIngestWorker`` has written the tick into ``QuoteCache``.
+
+``--loop-busy-ms`` adds a coroutine that holds the event loop for that long between yields,
+standing in for request handling on the uvicorn loop (the thread variant runs the same load
+on a loop in another thread, so both pay the same GIL contention).
+
+Usage:
+    python scripts/bench_ws_tick_to_cache.py [--ticks 5000] [--interval-us 200] [--loop-busy-ms 0]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import queue
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.integrations.kis_ws import KisWsClient
+from app.integrations.kis_ws_async import AsyncKisWsClient
+from app.services.quote_cache import QuoteCache, QuoteIngestWorker
+
+_STOP = object()
+
+
+def _frame(seq: int) -> str:
+    fields = ["" for _ in range(46)]
+    fields[0] = "005930"
+    fields[1] = "093001"
+    fields[2] = str(seq + 1)  # price carries the sequence number back to the collector
+    return "0|H0STCNT0|001|" + "^".join(fields)
+
+
+class _Collector:
+    def __init__(self, ticks: int) -> None:
+        self.sent_ns = [0] * ticks
+        self.latency_ns: list[int] = []
+        self.done = threading.Event()
+        self.ticks = ticks
+        self.worker = QuoteIngestWorker(QuoteCache())
+
+    def on_batch(self, quotes: list[dict]) -> None:
+        self.worker.on_ws_batch(quotes)
+        now = time.perf_counter_ns()
+        for quote in quotes:
+            self.latency_ns.append(now - self.sent_ns[int(quote["price"]) - 1])
+        if len(self.latency_ns) >= self.ticks:
+            self.done.set()
+
+
+def _produce(collector: _Collector, deliver, interval_us: int) -> None:
+    # sleep between frames so the producer releases the GIL like a blocking socket read
+    frames = [_frame(seq) for seq in range(collector.ticks)]
+    for seq, frame in enumerate(frames):
+        time.sleep(interval_us / 1_000_000)
+        collector.sent_ns[seq] = time.perf_counter_ns()
+        deliver(frame)
+    deliver(_STOP)
+
+
+async def _busy_loop(busy_ms: float, stop: threading.Event) -> None:
+    while not stop.is_set():
+        until = time.perf_counter() + busy_ms / 1000.0
+        while time.perf_counter() < until:
+            pass
+        await asyncio.sleep(0)
+
+
+def _start_background_loop(busy_ms: float, stop: threading.Event) -> threading.Thread:
+    thread = threading.Thread(target=lambda: asyncio.run(_busy_loop(busy_ms, stop)), daemon=True)
+    thread.start()
+    return thread
+
+
+def run_thread_variant(ticks: int, interval_us: int, busy_ms: float) -> list[int]:
+    collector = _Collector(ticks)
+    inbox: queue.Queue = queue.Queue()
+
+    class _FakeWebSocketApp:
+        def __init__(self, url, *, on_open=None, on_message=None, on_error=None, on_close=None):
+            self.on_open = on_open
+            self.on_message = on_message
+
+        def send(self, payload):
+            pass
+
+        def run_forever(self):
+            self.on_open(self)
+            while True:
+                frame = inbox.get()
+                if frame is _STOP:
+                    return
+                self.on_message(self, frame)
+
+        def close(self):
+            pass
+
+    client = KisWsClient(on_batch=collector.on_batch, approval_key="bench", websocket_app_factory=_FakeWebSocketApp)
+    stop = threading.Event()
+    if busy_ms > 0:
+        _start_background_loop(busy_ms, stop)
+    reader = threading.Thread(target=lambda: client.connect_and_subscribe(["005930"]), daemon=True)
+    reader.start()
+    _produce(collector, inbox.put, interval_us)
+    collector.done.wait(timeout=60)
+    stop.set()
+    reader.join(timeout=5)
+    return collector.latency_ns
+
+
+def run_async_variant(ticks: int, interval_us: int, busy_ms: float) -> list[int]:
+    collector = _Collector(ticks)
+
+    async def scenario() -> None:
+        loop = asyncio.get_running_loop()
+        inbox: asyncio.Queue = asyncio.Queue()
+
+        class _FakeConnection:
+            async def send(self, payload):
+                pass
+
+            async def close(self):
+                pass
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                frame = await inbox.get()
+                if frame is _STOP:
+                    raise StopAsyncIteration
+                return frame
+
+        client = AsyncKisWsClient(
+            on_batch=collector.on_batch,
+            approval_key="bench",
+            websocket_app_factory=lambda url: _FakeConnection(),
+        )
+        stop = threading.Event()
+        busy = asyncio.create_task(_busy_loop(busy_ms, stop)) if busy_ms > 0 else None
+        reader = asyncio.create_task(client.connect_and_subscribe(["005930"]))
+        producer = threading.Thread(
+            target=_produce,
+            args=(collector, lambda frame: loop.call_soon_threadsafe(inbox.put_nowait, frame), interval_us),
+            daemon=True,
+        )
+        producer.start()
+        await reader
+        stop.set()
+        if busy is not None:
+            await busy
+        producer.join(timeout=5)
+
+    asyncio.run(scenario())
+    return collector.latency_ns
+
+
+def _summary(latency_ns: list[int]) -> str:
+    us = sorted(v / 1000.0 for v in latency_ns)
+    p99 = us[min(len(us) - 1, int(len(us) * 0.99))]
+    return f"n={len(us)} p50={statistics.median(us):8.1f}us p99={p99:8.1f}us max={us[-1]:8.1f}us"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument("--interval-us", type=int, default=200)
+    parser.add_argument("--loop-busy-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    for name, run in (("thread", run_thread_variant), ("async", run_async_variant)):
+        latency = run(args.ticks, args.interval_us, args.loop_busy_ms)
+        print(f"{name:>6}: {_summary(latency)}")
+
+
+if __name__ == "__main__":
+    main()
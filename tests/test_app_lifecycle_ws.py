@@ -1,7 +1,10 @@
+import asyncio
+import importlib
+import os
 import threading
 import time
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 from fastapi.testclient import TestClient
 
@@ -46,5 +49,30 @@ class AppLifecycleWsTest(unittest.TestCase):
             ws_client.run_with_reconnect = original_run_with_reconnect
 
 
+class IngestLifespanTest(unittest.TestCase):
+    def test_ingest_runs_quotes_only(self):
+        with patch.dict(os.environ):
+            ingest = importlib.import_module('app.ingest')
+        ws_client = app.state.ws_client
+        worker = app.state.reconciliation_worker
+        originals = (ws_client.run_with_reconnect, worker.start, app.state.order_queue)
+        ran = threading.Event()
+        ws_client.run_with_reconnect = Mock(side_effect=lambda **kwargs: ran.set())
+        worker.start = Mock()
+        app.state.order_queue = Mock()
+
+        async def run():
+            async with ingest.ingest_lifespan(app):
+                self.assertTrue(ran.wait(0.3), "WS worker did not start")
+
+        try:
+            asyncio.run(run())
+
+            worker.start.assert_not_called()
+            self.assertEqual(app.state.order_queue.mock_calls, [])
+        finally:
+            ws_client.run_with_reconnect, worker.start, app.state.order_queue = originals
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,184 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from app.integrations.kis_ws import KisWsClient
+from app.services.auto_subscription import AutoSubscriptionManager
+from app.services.quote_cache import QuoteCache
+from app.services.quote_gateway import QuoteGatewayService
+
+
+class _FakeSubscriber:
+    def __init__(self, symbols=None):
+        self.symbols = list(symbols or [])
+        self.calls = []
+
+    def active_symbols(self):
+        return list(self.symbols)
+
+    def subscribe(self, symbol):
+        self.calls.append(("subscribe", symbol))
+        self.symbols.append(symbol)
+        return True
+
+    def unsubscribe(self, symbol):
+        self.calls.append(("unsubscribe", symbol))
+        self.symbols.remove(symbol)
+        return True
+
+
+def _hit(manager, symbol, times, now, ws_miss=True):
+    for _ in range(times):
+        manager.record(symbol, ws_miss=ws_miss, now=now)
+
+
+class AutoSubscriptionManagerTest(unittest.TestCase):
+    def test_hot_symbol_is_promoted_once_score_reaches_threshold(self):
+        subscriber = _FakeSubscriber()
+        manager = AutoSubscriptionManager(subscriber=subscriber, slots=2, promote_score=3)
+
+        _hit(manager, "005930", 2, now=1000.0)
+        self.assertEqual(subscriber.calls, [])
+        _hit(manager, "005930", 2, now=1000.0)
+
+        self.assertEqual(subscriber.calls, [("subscribe", "005930")])
+        metrics = manager.metrics()
+        self.assertEqual(metrics["auto_sub_active"], ["005930"])
+        self.assertEqual(metrics["auto_sub_promotions"], 1)
+        self.assertEqual(metrics["auto_sub_events"][0]["action"], "promote")
+
+    def test_ws_hits_count_but_never_promote(self):
+        subscriber = _FakeSubscriber()
+        manager = AutoSubscriptionManager(subscriber=subscriber, slots=2, promote_score=2)
+
+        _hit(manager, "005930", 5, now=1000.0, ws_miss=False)
+
+        self.assertEqual(subscriber.calls, [])
+        self.assertAlmostEqual(manager.score("005930", now=1000.0), 5.0)
+
+    def test_score_decays_with_half_life(self):
+        manager = AutoSubscriptionManager(subscriber=_FakeSubscriber(), slots=1, half_life_sec=10)
+        _hit(manager, "005930", 4, now=1000.0, ws_miss=False)
+
+        self.assertAlmostEqual(manager.score("005930", now=1010.0), 2.0)
+        self.assertAlmostEqual(manager.score("005930", now=1020.0), 1.0)
+
+    def test_full_slots_evict_coldest_only_when_candidate_is_much_hotter(self):
+        subscriber = _FakeSubscriber()
+        manager = AutoSubscriptionManager(subscriber=subscriber, slots=1, promote_score=2, swap_ratio=2.0)
+        _hit(manager, "005930", 3, now=1000.0)
+
+        # 2 < 3 * 2: not hot enough to displace the incumbent
+        _hit(manager, "000660", 2, now=1000.0)
+        self.assertEqual(manager.metrics()["auto_sub_active"], ["005930"])
+
+        _hit(manager, "000660", 4, now=1000.0)
+        self.assertEqual(manager.metrics()["auto_sub_active"], ["000660"])
+        self.assertEqual(subscriber.calls[-2:], [("unsubscribe", "005930"), ("subscribe", "000660")])
+        self.assertEqual(manager.metrics()["auto_sub_events"][-2]["reason"], "evicted_by:000660")
+
+    def test_connection_cap_counts_static_subscriptions(self):
+        subscriber = _FakeSubscriber(["A", "B"])
+        manager = AutoSubscriptionManager(subscriber=subscriber, slots=5, subscription_cap=2, promote_score=1)
+
+        _hit(manager, "005930", 3, now=1000.0)
+
+        # no promoted symbol to evict and static symbols are never touched
+        self.assertEqual(subscriber.calls, [])
+        _hit(manager, "A", 3, now=1000.0)
+        self.assertEqual(subscriber.calls, [])
+
+    def test_cold_symbols_are_demoted_on_sweep(self):
+        subscriber = _FakeSubscriber()
+        manager = AutoSubscriptionManager(
+            subscriber=subscriber, slots=2, promote_score=2, demote_score=1.0, half_life_sec=10, sweep_interval_sec=5
+        )
+        _hit(manager, "005930", 2, now=1000.0)
+
+        manager.record("000660", ws_miss=False, now=1030.0)
+
+        self.assertEqual(subscriber.calls, [("subscribe", "005930"), ("unsubscribe", "005930")])
+        self.assertEqual(manager.metrics()["auto_sub_demotions"], 1)
+        self.assertEqual(manager.metrics()["auto_sub_events"][-1]["reason"], "cold")
+
+    def test_sweep_demotes_symbol_after_requests_stop(self):
+        subscriber = _FakeSubscriber()
+        manager = AutoSubscriptionManager(
+            subscriber=subscriber, slots=2, promote_score=2, demote_score=1.0, half_life_sec=10, sweep_interval_sec=5
+        )
+        _hit(manager, "005930", 2, now=1000.0)
+
+        manager.sweep(now=1005.0)
+        self.assertEqual(manager.metrics()["auto_sub_active"], ["005930"])
+        manager.sweep(now=1030.0)  # no record() since the burst
+
+        self.assertEqual(subscriber.calls, [("subscribe", "005930"), ("unsubscribe", "005930")])
+        self.assertEqual(manager.metrics()["auto_sub_active"], [])
+
+    def test_background_sweep_runs_without_requests(self):
+        subscriber = _FakeSubscriber()
+        manager = AutoSubscriptionManager(
+            subscriber=subscriber, slots=1, promote_score=1, demote_score=1.0, half_life_sec=0.01, sweep_interval_sec=0.01
+        )
+        _hit(manager, "005930", 1, now=time.time())
+        manager.start()
+        self.addCleanup(manager.stop)
+
+        deadline = time.time() + 1.0
+        while manager.promoted and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(subscriber.calls[-1], ("unsubscribe", "005930"))
+
+    def test_drives_runtime_subscriptions_on_ws_client(self):
+        client = KisWsClient(approval_key="approval")
+        client._base_symbols = ["005930"]
+        manager = AutoSubscriptionManager(subscriber=client, slots=1, promote_score=1)
+
+        _hit(manager, "000660", 1, now=1000.0)
+
+        self.assertEqual(client.active_symbols(), ["005930", "000660"])
+
+
+class _RestClient:
+    def get_quote(self, symbol):
+        return {"symbol": symbol, "price": 100.0, "change_pct": 0.0, "turnover": 0.0, "ts": int(time.time())}
+
+
+class GatewayDemandTrackingTest(unittest.TestCase):
+    def _service(self, market_open=True):
+        subscriber = _FakeSubscriber()
+        # gateway records on the wall clock, so allow for decay between two calls
+        manager = AutoSubscriptionManager(subscriber=subscriber, slots=2, promote_score=1.5)
+        service = QuoteGatewayService(
+            quote_cache=QuoteCache(),
+            rest_client=_RestClient(),
+            market_open_checker=lambda: market_open,
+            symbol_delay_max_sec=0,
+            auto_subscription=manager,
+        )
+        return service, subscriber
+
+    def test_repeated_rest_fallbacks_promote_symbol(self):
+        service, subscriber = self._service()
+        service.get_quote("005930")
+        service.get_quotes(["005930", "000660"])
+
+        self.assertEqual(subscriber.calls, [("subscribe", "005930")])
+        self.assertEqual(service.metrics()["auto_sub_active"], ["005930"])
+
+    def test_off_hours_requests_do_not_promote(self):
+        service, subscriber = self._service(market_open=False)
+        for _ in range(3):
+            service.get_quote("005930")
+
+        self.assertEqual(subscriber.calls, [])
+
+    def test_tracker_errors_do_not_break_quotes(self):
+        service, _ = self._service()
+        with patch.object(service.auto_subscription, "record", side_effect=RuntimeError("boom")):
+            self.assertEqual(service.get_quote("005930").symbol, "005930")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.integrations.http_session import PooledSession
+from app.integrations.kis_rest import KisRestClient
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; avoid the delayed-ACK stall on keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        self._reply({"access_token": "token", "expires_in": 86400})
+
+    def do_GET(self):
+        self._reply({"rt_cd": "0", "output": {"stck_prpr": "70000"}})
+
+
+class PooledSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def test_clients_sharing_a_session_reuse_one_connection(self):
+        session = PooledSession()
+        self.addCleanup(session.close)
+        quote_client = KisRestClient(app_key="k", app_secret="s", base_url=self.base_url, session=session)
+        approval_client = KisRestClient(app_key="k", app_secret="s", base_url=self.base_url, session=session)
+
+        for _ in range(5):
+            quote_client.get_quote("005930")
+        approval_client.get_access_token()
+
+        metrics = session.metrics()
+        self.assertEqual(metrics["http_pool_requests"], 7)
+        self.assertEqual(metrics["http_pool_connections_opened"], 1)
+        self.assertEqual(metrics["http_pool_connections_reused"], 6)
+        self.assertAlmostEqual(metrics["http_pool_reuse_ratio"], 0.857)
+
+    def test_default_client_session_is_pooled(self):
+        client = KisRestClient(app_key="k", app_secret="s", env="mock")
+        self.assertIsInstance(client.session, PooledSession)
+        self.assertIsNone(client.session.metrics()["http_pool_reuse_ratio"])
+
+
+if __name__ == "__main__":
+    unittest.main()
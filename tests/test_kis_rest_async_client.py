@@ -0,0 +1,180 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import MagicMock
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.errors import RestRateLimitCooldownError
+from app.integrations.kis_rest_async import AsyncKisRestClient, KisHttpError
+from app.main import app
+from app.services.quote_cache import QuoteCache
+from app.services.quote_gateway import QuoteGatewayService
+
+
+class _FakeKis:
+    """httpx.MockTransport handler answering the KIS endpoints used by the client."""
+
+    def __init__(self, quote_status: int = 200) -> None:
+        self.quote_status = quote_status
+        self.token_calls = 0
+        self.requests = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        path = request.url.path
+        if path == "/oauth2/tokenP":
+            self.token_calls += 1
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"access_token": "token-1", "expires_in": 86400})
+        if path.endswith("/inquire-price"):
+            if self.quote_status != 200:
+                return httpx.Response(self.quote_status, json={})
+            return httpx.Response(200, json={"output": {"stck_prpr": "70100", "prdy_ctrt": "1.5", "acml_tr_pbmn": "9"}})
+        if path.endswith("/inquire-balance"):
+            return httpx.Response(200, json={"rt_cd": "0", "output1": [{"pdno": "005930", "hldg_qty": "3"}]})
+        if path.endswith("/order-cash"):
+            return httpx.Response(200, json={"rt_cd": "0", "output": {"ODNO": "A1"}})
+        return httpx.Response(404)
+
+
+def _client(fake: _FakeKis) -> AsyncKisRestClient:
+    return AsyncKisRestClient(
+        app_key="k",
+        app_secret="s",
+        base_url="https://kis.test",
+        client=httpx.AsyncClient(transport=httpx.MockTransport(fake)),
+    )
+
+
+class AsyncKisRestClientTest(unittest.TestCase):
+    def test_methods_share_request_contract_with_sync_client(self):
+        fake = _FakeKis()
+
+        async def scenario():
+            client = _client(fake)
+            quote = await client.get_quote("005930")
+            positions = await client.get_positions("12345678-01")
+            order = await client.place_order("12345678-01", "005930", "buy", 1, 70000.0)
+            await client.aclose()
+            return quote, positions, order
+
+        quote, positions, order = asyncio.run(scenario())
+
+        self.assertEqual(quote["price"], 70100.0)
+        self.assertEqual(positions, [{"account_id": "12345678-01", "symbol": "005930", "qty": 3}])
+        self.assertEqual(order["broker_order_id"], "A1")
+        order_request = fake.requests[-1]
+        self.assertEqual(order_request.headers["tr_id"], "VTTC0802U")
+        self.assertEqual(json.loads(order_request.content)["SLL_BUY_DVSN_CD"], "02")
+        self.assertEqual(fake.requests[1].url.params["fid_input_iscd"], "005930")
+
+    def test_shared_token_manager_replaces_async_token_issuance(self):
+        fake = _FakeKis()
+        manager = MagicMock()
+        manager.token_is_valid.return_value = True
+        manager.get_access_token.return_value = "shared-token"
+
+        async def scenario():
+            client = AsyncKisRestClient(
+                app_key="k",
+                app_secret="s",
+                base_url="https://kis.test",
+                client=httpx.AsyncClient(transport=httpx.MockTransport(fake)),
+                token_manager=manager,
+            )
+            await client.get_quote("005930")
+            await client.aclose()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(fake.token_calls, 0)
+        self.assertEqual(fake.requests[0].headers["authorization"], "Bearer shared-token")
+
+    def test_concurrent_calls_issue_a_single_token(self):
+        fake = _FakeKis()
+
+        async def scenario():
+            client = _client(fake)
+            await asyncio.gather(*(client.get_quote("005930") for _ in range(10)))
+            await client.aclose()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(fake.token_calls, 1)
+
+    def test_http_errors_surface_as_request_exceptions_with_status(self):
+        fake = _FakeKis(quote_status=429)
+
+        async def scenario():
+            client = _client(fake)
+            try:
+                await client.get_quote("005930")
+            finally:
+                await client.aclose()
+
+        with self.assertRaises(KisHttpError) as ctx:
+            asyncio.run(scenario())
+        self.assertEqual(ctx.exception.response.status_code, 429)
+
+    def test_gateway_async_path_applies_429_cooldown(self):
+        fake = _FakeKis(quote_status=429)
+        service = QuoteGatewayService(
+            quote_cache=QuoteCache(),
+            rest_client=None,
+            market_open_checker=lambda: False,
+        )
+
+        async def scenario():
+            service.async_rest_client = _client(fake)
+            try:
+                await service.get_quote_async("005930")
+            finally:
+                await service.async_rest_client.aclose()
+
+        with self.assertRaises(RestRateLimitCooldownError):
+            asyncio.run(scenario())
+        self.assertIn("005930", service._rest_symbol_cooldown_until)
+
+
+class AsyncRoutesTest(unittest.TestCase):
+    def setUp(self):
+        self.service = app.state.quote_gateway_service
+        self.fake = _FakeKis()
+        self.service.async_rest_client = _client(self.fake)
+        self.addCleanup(setattr, self.service, "async_rest_client", None)
+        self.client = TestClient(app)
+
+    def test_quote_and_positions_routes_use_async_client(self):
+        self.service.market_open_checker, original = (lambda: False), self.service.market_open_checker
+        self.addCleanup(setattr, self.service, "market_open_checker", original)
+
+        quote = self.client.get("/v1/quotes/005930")
+        positions = self.client.get("/v1/positions", params={"account_id": "12345678-01"})
+
+        self.assertEqual(quote.status_code, 200)
+        self.assertEqual(quote.json()["price"], 70100.0)
+        self.assertEqual(positions.json(), [{"account_id": "12345678-01", "symbol": "005930", "qty": 3}])
+        self.assertEqual(self.fake.token_calls, 1)
+
+    def test_async_provider_failure_maps_to_503(self):
+        self.service.async_rest_client = AsyncKisRestClient(
+            app_key="k",
+            app_secret="s",
+            base_url="https://kis.test",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(_refuse_connection)),
+        )
+
+        res = self.client.get("/v1/balances", params={"account_id": "12345678-01"})
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {"detail": "PORTFOLIO_PROVIDER_UNAVAILABLE"})
+
+
+async def _refuse_connection(request):
+    raise httpx.ConnectError("connection refused", request=request)
+
+
+if __name__ == "__main__":
+    unittest.main()
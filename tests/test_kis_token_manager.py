@@ -0,0 +1,175 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from app.integrations.kis_rest import KisRestClient
+from app.integrations.kis_token import KisTokenManager
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _response(payload: dict) -> MagicMock:
+    response = MagicMock()
+    response.json.return_value = payload
+    response.raise_for_status.return_value = None
+    return response
+
+
+def _issuing_session(expires_in: int = 86400) -> MagicMock:
+    session = MagicMock()
+    counter = {"token": 0, "approval": 0}
+
+    def post(url, **kwargs):
+        if url.endswith("/oauth2/tokenP"):
+            counter["token"] += 1
+            return _response({"access_token": f"token-{counter['token']}", "expires_in": expires_in})
+        counter["approval"] += 1
+        return _response({"approval_key": f"approval-{counter['approval']}"})
+
+    session.post.side_effect = post
+    session.get.return_value = _response({"output": {"stck_prpr": "71200"}})
+    return session
+
+
+def _client(session, **kwargs) -> KisRestClient:
+    return KisRestClient(
+        app_key="app-key",
+        app_secret="app-secret",
+        env="mock",
+        session=session,
+        base_url="https://example.test",
+        **kwargs,
+    )
+
+
+class KisTokenManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.cache_path = os.path.join(self.tmpdir.name, "token.json")
+
+    def test_clients_sharing_a_manager_issue_one_token(self):
+        session = _issuing_session()
+        manager = KisTokenManager(_client(session), cache_path=self.cache_path)
+        clients = [_client(session, token_manager=manager) for _ in range(3)]
+
+        tokens = {client.get_access_token() for client in clients}
+        clients[1].get_quote("005930")
+
+        self.assertEqual(tokens, {"token-1"})
+        self.assertEqual(manager.tokens_issued, 1)
+        self.assertEqual(session.get.call_args.kwargs["headers"]["authorization"], "Bearer token-1")
+
+    def test_concurrent_first_calls_issue_once(self):
+        session = _issuing_session()
+        manager = KisTokenManager(_client(session))
+        barrier = threading.Barrier(8)
+        tokens = []
+
+        def worker():
+            barrier.wait()
+            tokens.append(manager.get_access_token())
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(set(tokens), {"token-1"})
+        self.assertEqual(manager.tokens_issued, 1)
+
+    def test_restart_reuses_persisted_token_and_approval_keys(self):
+        clock = FakeClock()
+        first = KisTokenManager(_client(_issuing_session()), cache_path=self.cache_path, clock=clock)
+        first.get_access_token()
+        first.get_approval_key("ws-0")
+        first.get_approval_key("ws-1")
+
+        session = _issuing_session()
+        clock.now += 3600
+        second = KisTokenManager(_client(session), cache_path=self.cache_path, clock=clock)
+
+        self.assertTrue(second.cache_loaded)
+        self.assertEqual(second.get_access_token(), "token-1")
+        self.assertEqual(second.get_approval_key("ws-0"), "approval-1")
+        self.assertEqual(second.get_approval_key("ws-1"), "approval-2")
+        session.post.assert_not_called()
+        self.assertEqual(os.stat(self.cache_path).st_mode & 0o777, 0o600)
+
+    def test_persisted_token_is_ignored_when_expired_or_for_another_app_key(self):
+        clock = FakeClock()
+        KisTokenManager(_client(_issuing_session()), cache_path=self.cache_path, clock=clock).get_access_token()
+
+        other_key = KisRestClient(
+            app_key="other-key",
+            app_secret="app-secret",
+            env="mock",
+            session=_issuing_session(),
+            base_url="https://example.test",
+        )
+        self.assertFalse(KisTokenManager(other_key, cache_path=self.cache_path, clock=clock).cache_loaded)
+
+        clock.now += 86400
+        expired = KisTokenManager(_client(_issuing_session()), cache_path=self.cache_path, clock=clock)
+        self.assertFalse(expired.cache_loaded)
+
+    def test_corrupt_cache_file_falls_back_to_issuing(self):
+        with open(self.cache_path, "w", encoding="utf-8") as fp:
+            fp.write("{not json")
+
+        manager = KisTokenManager(_client(_issuing_session()), cache_path=self.cache_path)
+
+        self.assertEqual(manager.get_access_token(), "token-1")
+        with open(self.cache_path, encoding="utf-8") as fp:
+            self.assertEqual(json.load(fp)["access_token"], "token-1")
+
+    def test_refresh_if_due_reissues_ahead_of_expiry(self):
+        clock = FakeClock()
+        manager = KisTokenManager(_client(_issuing_session()), refresh_ahead_sec=300, clock=clock)
+        manager.get_access_token()
+
+        self.assertEqual(manager.seconds_until_refresh(), 86400 - 300)
+        self.assertFalse(manager.refresh_if_due())
+
+        clock.now += 86400 - 299
+        # still valid for callers, but inside the refresh window
+        self.assertEqual(manager.get_access_token(), "token-1")
+        self.assertTrue(manager.refresh_if_due())
+        self.assertEqual(manager.get_access_token(), "token-2")
+        self.assertEqual(manager.metrics()["kis_token_background_refreshes"], 1)
+
+    def test_short_lived_token_refreshes_at_half_life(self):
+        clock = FakeClock()
+        manager = KisTokenManager(_client(_issuing_session(expires_in=120)), refresh_ahead_sec=300, clock=clock)
+        manager.get_access_token()
+
+        self.assertEqual(manager.seconds_until_refresh(), 60)
+
+    def test_background_thread_issues_token_before_first_request(self):
+        session = _issuing_session()
+        manager = KisTokenManager(_client(session))
+        manager.start()
+        self.addCleanup(manager.stop)
+
+        deadline = time.monotonic() + 1.0
+        while manager.tokens_issued == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(manager.tokens_issued, 1)
+        self.assertEqual(_client(session, token_manager=manager).get_access_token(), "token-1")
+        self.assertEqual(manager.tokens_issued, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.integrations.kis_ws import KisWsClient
+from app.integrations.kis_ws_async import AsyncKisWsClient
+
+
+def _h0stcnt0_frame(symbol: str, price: str) -> str:
+    fields = ["" for _ in range(46)]
+    fields[0] = symbol
+    fields[1] = "093001"
+    fields[2] = price
+    return "0|H0STCNT0|001|" + "^".join(fields)
+
+
+class _FakeAsyncServer:
+    """Fake connection: frames pushed by the test are yielded until close()."""
+
+    _CLOSED = object()
+
+    def __init__(self, frames=()):
+        self.url = None
+        self.sent_messages = []
+        self.closed = False
+        self._frames: asyncio.Queue = asyncio.Queue()
+        for frame in frames:
+            self._frames.put_nowait(frame)
+
+    async def send(self, payload):
+        self.sent_messages.append(payload)
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            self._frames.put_nowait(self._CLOSED)
+
+    def push(self, frame):
+        self._frames.put_nowait(frame)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        frame = await self._frames.get()
+        if frame is self._CLOSED:
+            raise StopAsyncIteration
+        return frame
+
+
+class AsyncKisWsClientTest(unittest.TestCase):
+    def test_connect_subscribe_and_dispatch_on_loop(self):
+        approval_client = MagicMock()
+        approval_client.issue_approval_key.return_value = "approval-123"
+        batches = []
+        servers = []
+
+        async def factory(url):
+            server = _FakeAsyncServer(
+                [
+                    json.dumps({"header": {"tr_id": "PINGPONG"}}),
+                    _h0stcnt0_frame("005930", "71300"),
+                ]
+            )
+            server.url = url
+            servers.append(server)
+            return server
+
+        client = AsyncKisWsClient(
+            on_batch=batches.append,
+            approval_key_client=approval_client,
+            websocket_app_factory=factory,
+        )
+
+        async def scenario():
+            task = asyncio.create_task(client.connect_and_subscribe(symbols=["005930", "000660"]))
+            while not batches:
+                await asyncio.sleep(0)
+            await servers[0].close()
+            return await task
+
+        server = asyncio.run(scenario())
+
+        self.assertEqual(server.url, "ws://ops.koreainvestment.com:31000")
+        self.assertEqual(
+            [json.loads(m)["body"]["input"]["tr_key"] for m in server.sent_messages],
+            ["005930", "000660"],
+        )
+        self.assertEqual(batches[0][0]["symbol"], "005930")
+        self.assertEqual(batches[0][0]["price"], 71300.0)
+        self.assertEqual(client.metrics()["ws_frames_realtime"], 1)
+        self.assertEqual(client.metrics()["ws_frames_control"], 1)
+
+    def test_reconnect_uses_same_backoff_sequence_as_thread_client(self):
+        client = AsyncKisWsClient()
+        sleeps = []
+
+        async def connect_once():
+            raise RuntimeError("disconnect")
+
+        async def sleep_fn(sec):
+            sleeps.append(sec)
+
+        result = asyncio.run(
+            client.run_with_reconnect(
+                connect_once=connect_once,
+                sleep_fn=sleep_fn,
+                max_retries=3,
+                backoff_base_sec=1.0,
+                backoff_cap_sec=10.0,
+            )
+        )
+
+        self.assertFalse(result)
+        self.assertEqual(sleeps, [1.0, 2.0])
+        self.assertEqual(client.reconnect_count, 3)
+        self.assertEqual(client.last_error, "disconnect")
+
+    def test_stop_closes_live_socket_and_exits_reconnect_loop(self):
+        servers = []
+        state_updates = []
+
+        def factory(url):
+            server = _FakeAsyncServer()
+            servers.append(server)
+            return server
+
+        client = AsyncKisWsClient(
+            approval_key="approval-123",
+            websocket_app_factory=factory,
+            on_state_change=lambda **kwargs: state_updates.append(kwargs),
+        )
+
+        async def scenario():
+            task = asyncio.create_task(
+                client.run_with_reconnect(connect_once=lambda: client.connect_and_subscribe(symbols=["005930"]))
+            )
+            while not servers:
+                await asyncio.sleep(0)
+            client.stop()
+            return await asyncio.wait_for(task, timeout=1.0)
+
+        self.assertFalse(asyncio.run(scenario()))
+        self.assertEqual(len(servers), 1)
+        self.assertTrue(servers[0].closed)
+        self.assertFalse(client.running)
+        self.assertTrue(any(update["connected"] is True for update in state_updates))
+
+
+class WsClientModeSelectionTest(unittest.TestCase):
+    def test_ws_mode_env_selects_client_variant(self):
+        from app.main import _create_ws_client
+
+        with patch.dict(os.environ, {"KIS_WS_MODE": "async"}):
+            self.assertIsInstance(_create_ws_client(), AsyncKisWsClient)
+        with patch.dict(os.environ, {"KIS_WS_MODE": "thread"}):
+            client = _create_ws_client()
+            self.assertIsInstance(client, KisWsClient)
+            self.assertNotIsInstance(client, AsyncKisWsClient)
+        with patch.dict(os.environ, {"KIS_WS_MODE": "bogus"}):
+            with self.assertRaises(ValueError):
+                _create_ws_client()
+
+
+if __name__ == "__main__":
+    unittest.main()
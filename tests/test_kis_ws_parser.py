@@ -1,6 +1,14 @@
 import unittest
 
-from app.integrations.kis_ws import KisWsClient, parse_message
+from app.integrations.kis_ws import (
+    FRAME_CONTROL,
+    FRAME_REALTIME,
+    FRAME_UNKNOWN,
+    KisWsClient,
+    classify_frame,
+    parse_message,
+    parse_messages,
+)
 
 
 class TestKisWsParser(unittest.TestCase):
@@ -114,6 +122,85 @@ class TestKisWsParser(unittest.TestCase):
         self.assertEqual(parsed["symbol"], "005930")
         self.assertEqual(parsed["price"], 71300.0)
 
+    def _build_h0stcnt0_frame(self, record_count: int) -> str:
+        fields: list[str] = []
+        for idx in range(record_count):
+            fields.extend(
+                self._build_h0stcnt0_record(symbol=f"{idx + 1:06d}", price=str(70000 + idx))
+            )
+        return f"0|H0STCNT0|{record_count:03d}|" + "^".join(fields)
+
+    def test_parse_messages_pipe_realtime_returns_every_record_in_frame_order(self):
+        for record_count in (1, 5, 50):
+            with self.subTest(record_count=record_count):
+                parsed = parse_messages(self._build_h0stcnt0_frame(record_count))
+
+                self.assertEqual(len(parsed), record_count)
+                self.assertEqual([q["symbol"] for q in parsed], [f"{i + 1:06d}" for i in range(record_count)])
+                self.assertEqual(parsed[-1]["price"], float(70000 + record_count - 1))
+
+    def test_parse_messages_json_payload_returns_single_quote(self):
+        parsed = parse_messages({"symbol": "005930", "price": "70000"})
+
+        self.assertEqual(len(parsed), 1)
+        self.assertEqual(parsed[0]["symbol"], "005930")
+
+    def test_client_on_batch_is_called_once_per_frame(self):
+        batches = []
+        single = []
+        client = KisWsClient(on_message=single.append, on_batch=batches.append)
+
+        quotes = client.handle_raw_batch(self._build_h0stcnt0_frame(5))
+
+        self.assertEqual(len(quotes), 5)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0], quotes)
+        self.assertEqual(single, [])
+
+    def test_client_on_message_receives_each_quote_of_multi_record_frame(self):
+        received = []
+        client = KisWsClient(on_message=received.append)
+
+        client.handle_raw_batch(self._build_h0stcnt0_frame(5))
+
+        self.assertEqual(len(received), 5)
+
+    def test_classify_frame_routes_by_first_bytes(self):
+        self.assertEqual(classify_frame("0|H0STCNT0|001|005930^093001"), FRAME_REALTIME)
+        self.assertEqual(classify_frame(b"1|H0STCNT0|001|encrypted"), FRAME_REALTIME)
+        self.assertEqual(classify_frame('{"header":{"tr_id":"PINGPONG"}}'), FRAME_CONTROL)
+        self.assertEqual(classify_frame(b'  {"header":{}}'), FRAME_CONTROL)
+        self.assertEqual(classify_frame({"symbol": "005930"}), FRAME_CONTROL)
+        self.assertEqual(classify_frame("not-json"), FRAME_UNKNOWN)
+        self.assertEqual(classify_frame(""), FRAME_UNKNOWN)
+        self.assertEqual(classify_frame(None), FRAME_UNKNOWN)
+
+    def test_client_counts_frames_per_class_including_skipped_frames(self):
+        client = KisWsClient()
+
+        client.handle_raw_batch(self._build_h0stcnt0_frame(2))
+        with self.assertRaises(ValueError):
+            client.handle_raw_batch('{"header":{"tr_id":"PINGPONG"}}')
+        with self.assertRaises(ValueError):
+            client.handle_raw_batch("garbage")
+
+        metrics = client.metrics()
+        self.assertEqual(
+            {key: metrics[key] for key in ("ws_frames_realtime", "ws_frames_control", "ws_frames_unknown")},
+            {"ws_frames_realtime": 1, "ws_frames_control": 1, "ws_frames_unknown": 1},
+        )
+
+    def test_parse_message_pipe_realtime_skips_invalid_symbol_record(self):
+        rec1 = self._build_h0stcnt0_record(symbol="KR5930", price="71300")
+        rec2 = self._build_h0stcnt0_record(symbol=" 000660 ", price=" 198500 ", trade_time=" 093002 ")
+        payload = "0|H0STCNT0|002|" + "^".join(rec1 + rec2)
+
+        parsed = parse_message(payload)
+
+        self.assertEqual(parsed["symbol"], "000660")
+        self.assertEqual(parsed["price"], 198500.0)
+        self.assertEqual(parsed["change_pct"], 1.49)
+
     def test_parse_message_pipe_realtime_rejects_malformed_field_count(self):
         malformed = self._build_h0stcnt0_record(symbol="005930")[:-1]
         payload = "0|H0STCNT0|001|" + "^".join(malformed)
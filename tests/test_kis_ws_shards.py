@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.integrations.kis_ws import KisWsClient
+from app.integrations.kis_ws_shards import KisWsShardManager
+
+
+class _FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _BlockingWebSocketApp:
+    """Opens, records subscribe frames, then blocks in run_forever until closed."""
+
+    instances = []
+
+    def __init__(self, url, *, on_open=None, on_message=None, on_error=None, on_close=None):
+        self.on_open = on_open
+        self.on_message = on_message
+        self.sent_messages = []
+        self._closed = threading.Event()
+        _BlockingWebSocketApp.instances.append(self)
+
+    def send(self, payload):
+        self.sent_messages.append(payload)
+
+    def run_forever(self):
+        self.on_open(self)
+        self._closed.wait(timeout=5)
+
+    def close(self):
+        self._closed.set()
+
+
+def _connect(manager: KisWsShardManager, idx: int, connected: bool = True) -> None:
+    manager.shards[idx].client._emit_state(connected=connected)
+
+
+class KisWsShardManagerTest(unittest.TestCase):
+    def test_assign_partitions_symbols_evenly_and_caps_per_shard(self):
+        manager = KisWsShardManager(shard_count=3, max_symbols_per_shard=2)
+        manager.assign(["A", "B", "C", "D", "E", "F", "G", "A"])
+
+        self.assertEqual([s.symbols for s in manager.shards], [["A", "B"], ["C", "D"], ["E", "F"]])
+        self.assertEqual(manager.unassigned, ["G"])
+
+    def test_down_shard_symbols_move_to_connected_shards_after_grace(self):
+        clock = _FakeClock()
+        manager = KisWsShardManager(shard_count=3, max_symbols_per_shard=3, failover_after_sec=5.0, clock=clock)
+        manager.assign(["A", "B", "C", "D", "E", "F"])
+        _connect(manager, 0)
+        _connect(manager, 1)
+        _connect(manager, 2)
+        _connect(manager, 2, connected=False)
+
+        with patch.object(KisWsClient, "recycle") as recycle:
+            clock.now += 4.0
+            self.assertEqual(manager.check_failover(), [])
+            clock.now += 1.0
+            recycled = manager.check_failover()
+
+        self.assertEqual(recycled, [0, 1])
+        self.assertEqual(recycle.call_count, 2)
+        self.assertEqual(manager.shards[2].symbols, [])
+        self.assertEqual(sorted(manager.shards[0].symbols + manager.shards[1].symbols), ["A", "B", "C", "D", "E", "F"])
+        self.assertEqual(manager.failovers, 1)
+        self.assertEqual(manager.unassigned, [])
+
+    def test_first_connect_gets_its_own_grace_period(self):
+        clock = _FakeClock()
+        manager = KisWsShardManager(shard_count=2, failover_after_sec=5.0, connect_grace_sec=30.0, clock=clock)
+        manager.assign(["A", "B"])
+        _connect(manager, 0)
+        _connect(manager, 1, connected=False)  # first connect attempt failed, still retrying
+
+        with patch.object(KisWsClient, "recycle"):
+            clock.now += 10.0
+            manager.check_failover()
+            self.assertEqual(manager.shards[1].symbols, ["B"])
+            clock.now += 20.0
+            manager.check_failover()
+
+        self.assertEqual(manager.shards[1].symbols, [])
+        self.assertEqual(manager.shards[0].symbols, ["A", "B"])
+        self.assertEqual(manager.failovers, 1)
+
+    def test_failover_registers_symbols_on_live_socket_without_recycling(self):
+        clock = _FakeClock()
+        manager = KisWsShardManager(shard_count=2, failover_after_sec=0.0, connect_grace_sec=0.0, clock=clock)
+        manager.assign(["A", "B"])
+        _connect(manager, 0)
+
+        with patch.object(KisWsClient, "subscribe", return_value=True) as subscribe, patch.object(
+            KisWsClient, "recycle"
+        ) as recycle:
+            self.assertEqual(manager.check_failover(), [])
+
+        subscribe.assert_called_once_with("B")
+        recycle.assert_not_called()
+        self.assertEqual(manager.shards[0].symbols, ["A", "B"])
+        self.assertIn("B", manager.shards[1].client._runtime_removed)
+
+    def test_orphaned_symbols_wait_when_healthy_shards_are_full(self):
+        clock = _FakeClock()
+        manager = KisWsShardManager(
+            shard_count=2, max_symbols_per_shard=2, failover_after_sec=0.0, connect_grace_sec=0.0, clock=clock
+        )
+        manager.assign(["A", "B", "C", "D"])
+        _connect(manager, 0)
+
+        with patch.object(KisWsClient, "recycle"):
+            manager.check_failover()
+
+        self.assertEqual(manager.unassigned, ["C", "D"])
+        self.assertEqual(manager.metrics()["ws_shard_unassigned"], 2)
+
+    def test_batches_are_forwarded_and_counted_per_shard(self):
+        clock = _FakeClock()
+        batches = []
+        states = []
+        manager = KisWsShardManager(
+            shard_count=2,
+            on_batch=batches.append,
+            on_state_change=lambda **kwargs: states.append(kwargs),
+            clock=clock,
+        )
+
+        manager.shards[1].client.handle_raw_batch('{"symbol":"005930","price":70000}')
+        _connect(manager, 1)
+        metrics = manager.metrics()
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(metrics["ws_shards"][1]["messages"], 1)
+        self.assertEqual(metrics["ws_shards"][1]["msg_rate_per_sec"], 0.1)
+        self.assertEqual(metrics["ws_shards"][0]["messages"], 0)
+        self.assertEqual(metrics["ws_frames_control"], 1)
+        self.assertTrue(states[-1]["connected"])
+
+    def test_start_subscribes_each_shard_over_its_own_socket(self):
+        _BlockingWebSocketApp.instances = []
+        manager = KisWsShardManager(
+            shard_count=2,
+            client_factory=lambda **kwargs: KisWsClient(
+                approval_key="approval", websocket_app_factory=_BlockingWebSocketApp, **kwargs
+            ),
+            check_interval_sec=60.0,
+        )
+        manager.start(["005930", "000660", "035420"])
+        try:
+            for _ in range(200):
+                if len(_BlockingWebSocketApp.instances) == 2 and all(a.sent_messages for a in _BlockingWebSocketApp.instances):
+                    break
+                threading.Event().wait(0.01)
+            subscribed = sorted(
+                [json.loads(m)["body"]["input"]["tr_key"] for m in app.sent_messages]
+                for app in _BlockingWebSocketApp.instances
+            )
+        finally:
+            manager.stop()
+
+        self.assertEqual(subscribed, [["005930", "000660"], ["035420"]])
+        self.assertFalse(any(shard.thread for shard in manager.shards))
+
+
+class WsShardModeSelectionTest(unittest.TestCase):
+    def test_shard_env_selects_manager(self):
+        from app.main import _create_ws_client
+
+        with patch.dict(os.environ, {"KIS_WS_SHARDS": "3", "KIS_WS_MODE": "thread"}):
+            manager = _create_ws_client()
+        self.assertIsInstance(manager, KisWsShardManager)
+        self.assertEqual(len(manager.clients), 3)
+
+        with patch.dict(os.environ, {"KIS_WS_SHARDS": "3", "KIS_WS_MODE": "async"}):
+            with self.assertRaises(ValueError):
+                _create_ws_client()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,7 +22,7 @@ class _PositionsRestClient:
 
 class Iteration1Test(unittest.TestCase):
     def setUp(self):
-        quote_cache._rows.clear()
+        quote_cache.clear()
         quote_ingest_worker.ws_messages = 0
         quote_ingest_worker.upserts = 0
 
@@ -178,13 +178,65 @@ class Iteration1Test(unittest.TestCase):
         self.assertEqual(len(body['quotes']), 1)
 
     def test_quote_ws_hook_and_freshness(self):
-        quote_ingest_worker.on_ws_message({"symbol": "005930", "price": 71200, "ts": int(time.time()) - 10})
-        quote_ingest_worker.refresh_freshness(now=int(time.time()))
-        row = quote_cache.get("005930")
-        self.assertIsNotNone(row)
-        assert row
+        now = int(time.time())
+        quote_ingest_worker.on_ws_message({"symbol": "005930", "price": 71200, "ts": now - 10})
+        self.assertEqual(quote_ingest_worker.stale_count(now=now), 1)
+        stored = quote_cache.get("005930")
+        self.assertIsNotNone(stored)
+        assert stored
+        row = stored.with_freshness(now, quote_ingest_worker.stale_after_sec)
         self.assertEqual(row.state, "STALE")
         self.assertGreaterEqual(row.freshness_sec, 10.0)
+        # readers derive freshness on a copy; the shared cached row is left untouched
+        self.assertEqual(stored.state, "HEALTHY")
+        self.assertEqual(stored.freshness_sec, 0.0)
+
+    def test_quote_ws_batch_upserts_every_quote_in_one_pass(self):
+        batches_before = quote_ingest_worker.ws_batches
+        snapshots = quote_ingest_worker.on_ws_batch(
+            [
+                {"symbol": "005930", "price": 71200, "ts": 1700000000},
+                {"symbol": "000660", "price": 198500, "ts": 1700000001},
+                {"symbol": "005930", "price": 71300, "ts": 1700000002},
+            ]
+        )
+
+        self.assertEqual(len(snapshots), 3)
+        self.assertEqual(quote_ingest_worker.ws_messages, 3)
+        self.assertEqual(quote_ingest_worker.upserts, 3)
+        self.assertEqual(quote_ingest_worker.ws_batches, batches_before + 1)
+        self.assertEqual(quote_ingest_worker.last_ws_message_ts, 1700000002)
+        self.assertEqual(quote_cache.get("005930").price, 71300.0)
+        self.assertEqual(quote_cache.get("000660").price, 198500.0)
+
+    def test_quote_cache_stores_slotted_records_and_api_returns_schema(self):
+        from app.schemas.quote import QuoteSnapshot
+        from app.services.quote_cache import QuoteRecord
+
+        quote_cache.upsert(
+            QuoteSnapshot(
+                symbol='000660',
+                price=198500.0,
+                change_pct=-0.52,
+                turnover=1.0,
+                source='kis-ws',
+                ts=1700000000,
+                freshness_sec=0.0,
+                state='HEALTHY',
+            )
+        )
+        quote_ingest_worker.on_ws_message({'symbol': '005930', 'price': 70100})
+
+        self.assertIsInstance(quote_cache.get('000660'), QuoteRecord)
+        self.assertIsInstance(quote_cache.get('005930'), QuoteRecord)
+        self.assertFalse(hasattr(quote_cache.get('005930'), '__dict__'))
+
+        app.state.quote_gateway_service.market_open_checker = lambda: True
+        r = self.client.get('/v1/quotes/005930')
+
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(set(r.json()), set(QuoteSnapshot.model_fields))
+        self.assertEqual(r.json()['source'], 'kis-ws')
 
     def test_order_idempotency(self):
         req = OrderRequest(account_id="A1", symbol="005930", side="BUY", qty=1)
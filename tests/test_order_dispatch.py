@@ -0,0 +1,293 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import _order_worker_loop, app
+from app.schemas.order import OrderRequest
+from app.services.latency_histogram import LatencyHistogram
+from app.services.order_queue import OrderQueue, order_queue
+
+
+def _req(symbol: str = "005930", qty: int = 1) -> OrderRequest:
+    return OrderRequest(account_id="A1", symbol=symbol, side="BUY", qty=qty, price=70000.0)
+
+
+class _Adapter:
+    def __init__(self):
+        self.calls = []
+        self.sent = threading.Event()
+
+    def place_order(self, **kwargs):
+        self.calls.append(kwargs["symbol"])
+        self.sent.set()
+        return {"broker_order_id": f"B{len(self.calls)}"}
+
+
+class OrderWorkerLoopTest(unittest.TestCase):
+    def _start(self, queue: OrderQueue, adapter, interval_sec: float = 30.0):
+        app = SimpleNamespace(state=SimpleNamespace(order_queue=queue, quote_gateway_service=SimpleNamespace(rest_client=adapter)))
+        stop_event = threading.Event()
+        thread = threading.Thread(target=_order_worker_loop, args=(app, stop_event, interval_sec), daemon=True)
+        thread.start()
+
+        def stop():
+            stop_event.set()
+            queue.wake()
+            thread.join(timeout=2.0)
+
+        self.addCleanup(stop)
+        return stop, thread
+
+    def test_enqueue_wakes_worker_without_waiting_for_interval(self):
+        queue = OrderQueue()
+        adapter = _Adapter()
+        self._start(queue, adapter, interval_sec=30.0)
+
+        accepted = queue.enqueue(_req(), "idem-1")
+
+        self.assertTrue(adapter.sent.wait(2.0))
+        deadline = time.monotonic() + 2.0
+        while queue.get_status(accepted.order_id) != "SENT" and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(queue.get_status(accepted.order_id), "SENT")
+
+    def test_worker_drains_burst_back_to_back(self):
+        queue = OrderQueue()
+        adapter = _Adapter()
+        for i in range(20):
+            queue.enqueue(_req(qty=i + 1), f"idem-{i}")
+        self._start(queue, adapter, interval_sec=30.0)
+
+        deadline = time.monotonic() + 2.0
+        while queue.metrics()["sent"] < 20 and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+        self.assertEqual(queue.metrics()["sent"], 20)
+        self.assertEqual(queue.metrics()["dispatch_latency_count"], 20)
+
+    def test_stop_wakes_idle_worker(self):
+        stop, thread = self._start(OrderQueue(), _Adapter(), interval_sec=30.0)
+
+        started = time.monotonic()
+        stop()
+
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.monotonic() - started, 1.0)
+
+
+class _BlockingAdapter:
+    """Records calls per partition; symbols in ``hold`` block until ``release`` is set."""
+
+    def __init__(self, hold=(), fail_first=()):
+        self.hold = set(hold)
+        self.fail_first = set(fail_first)
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.sequence: dict[str, list[int]] = {}
+        self.active: dict[str, int] = {}
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.max_per_key = 0
+
+    def place_order(self, **kwargs):
+        key = f"{kwargs['account_id']}:{kwargs['symbol']}"
+        with self.lock:
+            self.sequence.setdefault(key, []).append(kwargs["qty"])
+            self.active[key] = self.active.get(key, 0) + 1
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+            self.max_per_key = max(self.max_per_key, self.active[key])
+        try:
+            if kwargs["symbol"] in self.hold:
+                self.release.wait(5.0)
+            else:
+                time.sleep(0.002)
+            if kwargs["qty"] in self.fail_first:
+                self.fail_first.discard(kwargs["qty"])
+                raise RuntimeError("RATE_LIMIT")
+            return {"broker_order_id": "B"}
+        finally:
+            with self.lock:
+                self.active[key] -= 1
+                self.concurrent -= 1
+
+
+def _wait_until(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class PartitionedDispatchTest(unittest.TestCase):
+    def _start_workers(self, queue: OrderQueue, adapter, count: int):
+        app = SimpleNamespace(state=SimpleNamespace(order_queue=queue, quote_gateway_service=SimpleNamespace(rest_client=adapter)))
+        stop_event = threading.Event()
+        threads = [
+            threading.Thread(target=_order_worker_loop, args=(app, stop_event, 30.0), daemon=True) for _ in range(count)
+        ]
+        for t in threads:
+            t.start()
+
+        def stop():
+            stop_event.set()
+            adapter.release.set()
+            queue.wake()
+            for t in threads:
+                t.join(timeout=2.0)
+
+        self.addCleanup(stop)
+
+    def test_slow_partition_does_not_block_other_symbols(self):
+        queue = OrderQueue()
+        adapter = _BlockingAdapter(hold={"005930"})
+        queue.enqueue(_req("005930", qty=1), "idem-slow")
+        queue.enqueue(_req("005930", qty=2), "idem-slow-2")
+        for i in range(5):
+            queue.enqueue(_req("000660", qty=10 + i), f"idem-fast-{i}")
+        self._start_workers(queue, adapter, count=2)
+
+        self.assertTrue(_wait_until(lambda: queue.metrics()["sent"] == 5))
+        metrics = queue.metrics()
+        self.assertEqual((metrics["in_flight"], metrics["queue_depth"]), (1, 1))
+        self.assertEqual(metrics["partition_depths"], {"A1:005930": 1})
+
+        adapter.release.set()
+        self.assertTrue(_wait_until(lambda: queue.metrics()["sent"] == 7))
+        self.assertEqual(adapter.sequence["A1:005930"], [1, 2])
+
+    def test_each_partition_sends_in_order_one_at_a_time(self):
+        queue = OrderQueue()
+        adapter = _BlockingAdapter(fail_first={3})
+        symbols = ["005930", "000660", "035420"]
+        for i in range(30):
+            queue.enqueue(_req(symbols[i % 3], qty=i + 1), f"idem-{i}")
+        self._start_workers(queue, adapter, count=4)
+
+        self.assertTrue(_wait_until(lambda: queue.metrics()["sent"] == 30))
+        for n, symbol in enumerate(symbols):
+            expected = list(range(n + 1, 31, 3))
+            if symbol == "035420":
+                expected.insert(0, 3)  # the RATE_LIMIT retry stays ahead of later orders
+            self.assertEqual(adapter.sequence[f"A1:{symbol}"], expected)
+        self.assertEqual(adapter.max_per_key, 1)
+        self.assertGreater(adapter.max_concurrent, 1)
+
+    def test_global_in_flight_cap(self):
+        queue = OrderQueue(max_in_flight=2)
+        symbols = ["005930", "000660", "035420", "051910"]
+        adapter = _BlockingAdapter(hold=set(symbols))
+        for i, symbol in enumerate(symbols):
+            queue.enqueue(_req(symbol, qty=i + 1), f"idem-{i}")
+        self._start_workers(queue, adapter, count=4)
+
+        self.assertTrue(_wait_until(lambda: queue.metrics()["in_flight"] == 2))
+        time.sleep(0.05)
+        self.assertEqual(adapter.max_concurrent, 2)
+        self.assertEqual(queue.metrics()["partitions_queued"], 2)
+
+        adapter.release.set()
+        self.assertTrue(_wait_until(lambda: queue.metrics()["sent"] == 4))
+        self.assertEqual(adapter.max_concurrent, 2)
+
+
+class RetryBackoffTest(unittest.TestCase):
+    def test_backoff_doubles_per_attempt_with_jitter_and_cap(self):
+        queue = OrderQueue(retry_backoff_sec=0.2, retry_backoff_max_sec=1.0)
+
+        with patch("app.services.order_queue.random.uniform", side_effect=lambda lo, hi: hi):
+            upper = [queue.retry_delay(n) for n in range(1, 6)]
+        with patch("app.services.order_queue.random.uniform", side_effect=lambda lo, hi: lo):
+            lower = [queue.retry_delay(n) for n in range(1, 6)]
+
+        self.assertEqual([round(d, 3) for d in upper], [0.2, 0.4, 0.8, 1.0, 1.0])
+        self.assertEqual([round(d, 3) for d in lower], [0.1, 0.2, 0.4, 0.5, 0.5])
+
+    def test_parked_retry_holds_its_partition_only_and_worker_does_not_spin(self):
+        queue = OrderQueue(retry_backoff_sec=0.3)
+        adapter = _BlockingAdapter(fail_first={1})
+        waits = []
+        wait_for_work = queue.wait_for_work
+        queue.wait_for_work = lambda timeout=None: waits.append(timeout) or wait_for_work(timeout)
+        first = queue.enqueue(_req("005930", qty=1), "idem-retry")
+        queue.enqueue(_req("005930", qty=2), "idem-behind")
+        queue.enqueue(_req("000660", qty=3), "idem-other")
+        app_state = SimpleNamespace(order_queue=queue, quote_gateway_service=SimpleNamespace(rest_client=adapter))
+        stop_event = threading.Event()
+        thread = threading.Thread(
+            target=_order_worker_loop, args=(SimpleNamespace(state=app_state), stop_event, 30.0), daemon=True
+        )
+        started = time.monotonic()
+        thread.start()
+        self.addCleanup(thread.join, 2.0)
+        self.addCleanup(queue.wake)
+        self.addCleanup(stop_event.set)
+
+        self.assertTrue(_wait_until(lambda: adapter.sequence.get("A1:000660") == [3]))
+        self.assertEqual(adapter.sequence["A1:005930"], [1])
+        self.assertIsNotNone(queue.get_job(first.order_id)["next_attempt_at"])
+        self.assertEqual(queue.metrics()["retry_parked"], 1)
+
+        self.assertTrue(_wait_until(lambda: queue.metrics()["sent"] == 3))
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+        self.assertEqual(adapter.sequence["A1:005930"], [1, 1, 2])
+        self.assertIsNone(queue.get_job(first.order_id)["next_attempt_at"])
+        self.assertLess(len(waits), 15)
+
+    def test_order_state_exposes_next_attempt_at(self):
+        order_queue.queue.clear()
+        order_queue.idem.clear()
+        order_queue.idem_body_hash.clear()
+        order_queue.jobs.clear()
+        accepted = order_queue.enqueue(_req("005930"), "idem-state-retry")
+
+        class _RateLimited:
+            def place_order(self, **kwargs):
+                raise RuntimeError("RATE_LIMIT")
+
+        with patch("app.services.order_queue.time.time", return_value=1000.0):
+            order_queue.process_next(adapter=_RateLimited())
+        body = TestClient(app).get(f"/v1/orders/{accepted.order_id}/state").json()
+
+        self.assertEqual(body["status"], "NEW")
+        self.assertGreater(body["next_attempt_at"], 1000.0)
+        self.assertLessEqual(body["next_attempt_at"], 1000.0 + order_queue.retry_backoff_sec)
+
+
+class DispatchLatencyTest(unittest.TestCase):
+    def test_latency_is_recorded_from_accept_to_sent_only(self):
+        queue = OrderQueue()
+        sent = queue.enqueue(_req("005930"), "idem-1")
+        rejected = queue.enqueue(_req("000660"), "idem-2")
+
+        queue.process_next(adapter=_Adapter())
+        queue.process_next(success=False, reason="TEST")
+
+        metrics = queue.metrics()
+        self.assertEqual(queue.get_status(sent.order_id), "SENT")
+        self.assertEqual(queue.get_status(rejected.order_id), "REJECTED")
+        self.assertEqual(metrics["dispatch_latency_count"], 1)
+        self.assertEqual(metrics["dispatch_latency_buckets_ms"]["+Inf"], 1)
+        self.assertEqual(queue._enqueued_at, {})
+
+    def test_histogram_percentiles_use_bucket_upper_bounds(self):
+        histogram = LatencyHistogram("x", bounds_ms=(1, 10, 100))
+        for seconds in [0.0005] * 90 + [0.005] * 9 + [0.5]:
+            histogram.observe(seconds)
+
+        metrics = histogram.metrics()
+
+        self.assertEqual((metrics["x_p50_ms"], metrics["x_p90_ms"], metrics["x_p99_ms"]), (1, 1, 10))
+        self.assertEqual(metrics["x_max_ms"], 500.0)
+        self.assertEqual(metrics["x_buckets_ms"], {"1": 90, "10": 99, "100": 99, "+Inf": 100})
+        self.assertIsNone(LatencyHistogram("empty").metrics()["empty_p50_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
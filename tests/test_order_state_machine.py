@@ -21,7 +21,8 @@ class _FlakyAdapter:
 
 class OrderStateMachineTest(unittest.TestCase):
     def setUp(self):
-        self.q = OrderQueue()
+        self.now = 0.0
+        self.q = OrderQueue(clock=lambda: self.now)
         self.client = TestClient(app)
         order_queue.queue.clear()
         order_queue.idem.clear()
@@ -52,7 +53,12 @@ class OrderStateMachineTest(unittest.TestCase):
         adapter = _FlakyAdapter(failures=2)
 
         first_status = self.q.process_next(adapter=adapter)["status"]
+        # the retry is parked until its backoff expires
+        self.assertIsNone(self.q.process_next(adapter=adapter))
+        self.assertIsNotNone(self.q.jobs[accepted.order_id]["next_attempt_at"])
+        self.now += 10
         second_status = self.q.process_next(adapter=adapter)["status"]
+        self.now += 10
         third_status = self.q.process_next(adapter=adapter)["status"]
 
         self.assertEqual(first_status, "NEW")
@@ -66,7 +72,9 @@ class OrderStateMachineTest(unittest.TestCase):
         adapter = _FlakyAdapter(failures=99)
 
         self.q.process_next(adapter=adapter)
+        self.now += 10
         self.q.process_next(adapter=adapter)
+        self.now += 10
         last = self.q.process_next(adapter=adapter)
 
         self.assertEqual(last["status"], "REJECTED")
@@ -0,0 +1,210 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.order import OrderRequest
+from app.services.order_queue import OrderQueue, create_order_queue, order_queue
+from app.services.order_store import InMemoryOrderStore, SqliteOrderStore
+from app.services.reconciliation import ReconciliationService
+
+
+def _req(account_id: str = "A1", symbol: str = "005930", qty: int = 1) -> OrderRequest:
+    return OrderRequest(account_id=account_id, symbol=symbol, side="BUY", qty=qty, price=70000.0)
+
+
+class _Adapter:
+    def place_order(self, **kwargs):
+        return {"broker_order_id": "B1"}
+
+
+class OrderStoreContractTest(unittest.TestCase):
+    """Both backends answer the same queries the same way."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "orders.sqlite3")
+
+    def _stores(self):
+        sqlite_store = SqliteOrderStore(self.path)
+        self.addCleanup(sqlite_store.close)
+        return {"memory": InMemoryOrderStore(), "sqlite": sqlite_store}
+
+    def test_listing_filters_and_orders_by_recency(self):
+        for name, store in self._stores().items():
+            with self.subTest(store=name):
+                q = OrderQueue(store=store)
+                with patch("app.services.order_queue.time.time", return_value=100):
+                    a = q.enqueue(_req("A1", "005930"), "idem-1")
+                with patch("app.services.order_queue.time.time", return_value=200):
+                    b = q.enqueue(_req("A1", "000660"), "idem-2")
+                with patch("app.services.order_queue.time.time", return_value=300):
+                    c = q.enqueue(_req("A2", "005930"), "idem-3")
+                    q.process_next(adapter=_Adapter())  # a -> SENT at 300
+
+                ids = lambda jobs: [job["order_id"] for job in jobs]  # noqa: E731
+                self.assertEqual(ids(q.list_jobs()), sorted([a.order_id, c.order_id]) + [b.order_id])
+                self.assertEqual(ids(q.list_jobs(account_id="A1")), [a.order_id, b.order_id])
+                self.assertEqual(ids(q.list_jobs(symbol="005930", status="NEW")), [c.order_id])
+                self.assertEqual(ids(q.list_jobs(status="SENT")), [a.order_id])
+                self.assertEqual(ids(q.list_jobs(updated_since=250, account_id="A2")), [c.order_id])
+                self.assertEqual(len(q.list_jobs(limit=1)), 1)
+                self.assertEqual(sorted(ids(q.active_jobs())), sorted([a.order_id, b.order_id, c.order_id]))
+                q.mark_execution_result(a.order_id, "FILLED")
+                self.assertEqual(sorted(ids(q.active_jobs())), sorted([b.order_id, c.order_id]))
+
+    def test_idempotency_is_enforced_by_every_backend(self):
+        for name, store in self._stores().items():
+            with self.subTest(store=name):
+                q = OrderQueue(store=store)
+                first = q.enqueue(_req(), "idem-1")
+                self.assertEqual(q.enqueue(_req(), "idem-1"), first)
+                with self.assertRaises(ValueError):
+                    q.enqueue(_req(qty=2), "idem-1")
+                self.assertEqual(q.metrics()["deduplicated"], 1)
+
+
+class SqliteOrderStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "orders.sqlite3")
+
+    def _store(self) -> SqliteOrderStore:
+        store = SqliteOrderStore(self.path)
+        self.addCleanup(store.close)
+        return store
+
+    def test_restart_requeues_new_orders_and_flags_in_flight(self):
+        q = OrderQueue(store=self._store())
+        sent = q.enqueue(_req(symbol="005930"), "idem-1")
+        dispatching = q.enqueue(_req(symbol="000660"), "idem-2")
+        queued = q.enqueue(_req(symbol="035420"), "idem-3")
+        q.process_next(adapter=_Adapter())
+
+        class _Crash(BaseException):
+            pass
+
+        class _CrashingAdapter:
+            def place_order(self, **kwargs):
+                raise _Crash()
+
+        with self.assertRaises(_Crash):
+            q.process_next(adapter=_CrashingAdapter())
+        q.store.close()
+
+        recovered = OrderQueue(store=self._store())
+
+        self.assertEqual(recovered.get_job(sent.order_id)["broker_order_id"], "B1")
+        self.assertEqual(list(recovered.queue), [queued.order_id])
+        self.assertEqual(recovered.get_job(dispatching.order_id)["error"], "RECOVERED_IN_FLIGHT")
+        self.assertEqual(recovered.enqueue(_req(symbol="005930"), "idem-1").order_id, sent.order_id)
+        self.assertEqual(recovered.metrics()["store_recovered_in_flight"], 1)
+
+    def test_second_owner_of_database_is_refused(self):
+        store = self._store()
+
+        with self.assertRaises(RuntimeError) as ctx:
+            SqliteOrderStore(self.path)
+        self.assertIn("ORDER_STATE_LOCKED", str(ctx.exception))
+
+        store.close()
+        self._store()
+
+    def test_stale_copy_cannot_reopen_terminal_order(self):
+        for name, store in self._stores_for_overwrite().items():
+            with self.subTest(store=name):
+                q = OrderQueue(store=store)
+                accepted = q.enqueue(_req(), "idem-1")
+                worker_copy = dict(q.get_job(accepted.order_id))
+                q.mark_execution_result(accepted.order_id, "FILLED")
+
+                worker_copy["status"] = "SENT"
+                q.persist(worker_copy)
+
+                job = q.get_job(accepted.order_id)
+                self.assertEqual((job["status"], job["terminal"]), ("FILLED", True))
+                self.assertEqual(q.active_jobs(), [])
+
+    def _stores_for_overwrite(self):
+        return {"memory": InMemoryOrderStore(), "sqlite": self._store()}
+
+    def test_listing_queries_use_indexes(self):
+        store = self._store()
+        plans = {
+            "status": store.explain("SELECT body FROM orders WHERE status = ? ORDER BY updated_at DESC", ("NEW",)),
+            "account": store.explain("SELECT body FROM orders WHERE account_id = ? ORDER BY updated_at DESC", ("A1",)),
+            "symbol": store.explain("SELECT body FROM orders WHERE symbol = ? ORDER BY updated_at DESC", ("005930",)),
+            "updated": store.explain("SELECT body FROM orders WHERE updated_at >= ?", (0,)),
+            "active": store.explain("SELECT body FROM orders WHERE terminal = 0 ORDER BY created_at, rowid"),
+        }
+
+        for name, plan in plans.items():
+            with self.subTest(query=name):
+                self.assertTrue(any("USING INDEX" in step for step in plan), plan)
+                self.assertFalse(any("TEMP B-TREE" in step for step in plan), plan)
+
+    def test_accept_writes_order_and_idempotency_in_one_transaction(self):
+        store = self._store()
+        q = OrderQueue(store=store)
+        before = store.transactions
+
+        q.enqueue(_req(), "idem-1")
+
+        self.assertEqual(store.transactions - before, 1)
+        self.assertEqual(len(store.idem), 1)
+
+    def test_reconciliation_checks_only_active_orders(self):
+        q = OrderQueue(store=self._store())
+        open_order = q.enqueue(_req(symbol="005930"), "idem-1")
+        done = q.enqueue(_req(symbol="000660"), "idem-2")
+        q.mark_execution_result(done.order_id, "FILLED")
+        seen = []
+
+        def provider(order_id, _job):
+            seen.append(order_id)
+            return "FILLED"
+
+        result = ReconciliationService(order_queue=q, broker_status_provider=provider).reconcile_once()
+
+        self.assertEqual(seen, [open_order.order_id])
+        self.assertEqual(result["corrected"], 1)
+        self.assertTrue(q.get_job(open_order.order_id)["terminal"])
+
+    def test_create_order_queue_selects_backend_from_env(self):
+        with patch.dict(os.environ, {"ORDER_STORE": "sqlite", "ORDER_STORE_PATH": self.path, "ORDER_WAL_DIR": ""}):
+            q = create_order_queue()
+        self.addCleanup(q.store.close)
+
+        self.assertIsInstance(q.store, SqliteOrderStore)
+        with patch.dict(os.environ, {"ORDER_STORE": "redis"}):
+            with self.assertRaises(ValueError):
+                create_order_queue()
+
+
+class OrderListRouteTest(unittest.TestCase):
+    def setUp(self):
+        order_queue.queue.clear()
+        order_queue.idem.clear()
+        order_queue.idem_body_hash.clear()
+        order_queue.jobs.clear()
+        self.client = TestClient(app)
+
+    def test_list_orders_filters(self):
+        first = order_queue.enqueue(_req("A1", "005930"), "idem-list-1")
+        order_queue.enqueue(_req("A2", "000660"), "idem-list-2")
+
+        res = self.client.get("/v1/orders", params={"account_id": "A1", "status": "new"})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([row["order_id"] for row in res.json()], [first.order_id])
+        self.assertEqual(res.json()[0]["symbol"], "005930")
+        self.assertEqual(self.client.get("/v1/orders", params={"limit": 0}).json()["detail"], "INVALID_LIMIT")
+
+
+if __name__ == "__main__":
+    unittest.main()
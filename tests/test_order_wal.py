@@ -0,0 +1,300 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.schemas.order import OrderRequest
+from app.services import order_wal
+from app.services.order_queue import OrderQueue
+from app.services.order_store import SqliteOrderStore
+from app.services.order_wal import FSYNC_POLICIES, OrderWal
+
+
+def _req(symbol: str = "005930", qty: int = 1) -> OrderRequest:
+    return OrderRequest(account_id="A1", symbol=symbol, side="BUY", qty=qty, price=70000.0)
+
+
+class _Adapter:
+    def __init__(self, error: str | None = None):
+        self.error = error
+
+    def place_order(self, **kwargs):
+        if self.error:
+            raise RuntimeError(self.error)
+        return {"broker_order_id": "B1"}
+
+
+class OrderWalRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+
+    def _queue(self, **kwargs) -> OrderQueue:
+        wal = OrderWal(self.dir, **kwargs)
+        self.addCleanup(wal.close)
+        return OrderQueue(wal=wal)
+
+    def test_restart_rebuilds_jobs_queue_and_idempotency(self):
+        q = self._queue()
+        first = q.enqueue(_req("005930"), "idem-1")
+        second = q.enqueue(_req("000660"), "idem-2")
+        third = q.enqueue(_req("035420"), "idem-3")
+        q.process_next(adapter=_Adapter())  # first -> SENT
+        q.process_next(adapter=_Adapter("RATE_LIMIT"))  # second retried
+        q.request_cancel(third.order_id)
+        q.wal.close()
+
+        recovered = self._queue()
+
+        self.assertEqual(recovered.jobs[first.order_id]["status"], "SENT")
+        self.assertEqual(recovered.jobs[first.order_id]["broker_order_id"], "B1")
+        self.assertEqual(recovered.jobs[second.order_id]["attempts"], 1)
+        self.assertEqual(recovered.jobs[third.order_id]["status"], "CANCEL_PENDING")
+        self.assertEqual(list(recovered.queue), [second.order_id, third.order_id])
+        # a client retry after the restart dedups instead of double-submitting
+        self.assertEqual(recovered.enqueue(_req("005930"), "idem-1").order_id, first.order_id)
+        with self.assertRaises(ValueError):
+            recovered.enqueue(_req("005930", qty=2), "idem-1")
+        self.assertEqual(recovered.metrics()["wal_recovered_jobs"], 3)
+
+    def test_order_in_flight_at_crash_is_not_resent(self):
+        q = self._queue()
+        accepted = q.enqueue(_req(), "idem-1")
+
+        class _Crash(BaseException):
+            pass
+
+        class _CrashingAdapter:
+            def place_order(self, **kwargs):
+                raise _Crash()
+
+        with self.assertRaises(_Crash):
+            q.process_next(adapter=_CrashingAdapter())
+        q.wal.close()
+
+        recovered = self._queue()
+
+        job = recovered.jobs[accepted.order_id]
+        self.assertEqual((job["status"], job["error"]), ("DISPATCHING", "RECOVERED_IN_FLIGHT"))
+        self.assertEqual(len(recovered.queue), 0)
+        self.assertEqual(recovered.metrics()["wal_recovered_in_flight"], 1)
+
+    def test_retried_order_keeps_its_place_in_partition_after_restart(self):
+        q = self._queue()
+        q.retry_backoff_sec = 0.0
+        x = q.enqueue(_req(), "idem-x")
+        y = q.enqueue(_req(), "idem-y")
+        q.process_next(adapter=_Adapter("RATE_LIMIT"))  # x retried, y still behind it
+        q.wal.close()
+
+        recovered = self._queue()
+        recovered.retry_backoff_sec = 0.0
+
+        self.assertEqual(recovered.queued_ids(), [x.order_id, y.order_id])
+        self.assertEqual(recovered.process_next(adapter=_Adapter())["order_id"], x.order_id)
+        self.assertEqual(recovered.process_next(adapter=_Adapter())["order_id"], y.order_id)
+
+    def test_retry_recovered_mid_backoff_stays_parked(self):
+        q = self._queue()
+        q.retry_backoff_sec = 60.0
+        accepted = q.enqueue(_req(), "idem-1")
+        q.process_next(adapter=_Adapter("RATE_LIMIT"))
+        q.wal.close()
+
+        recovered = self._queue()
+
+        self.assertIsNone(recovered.process_next(adapter=_Adapter()))
+        self.assertEqual(recovered.metrics()["retry_parked"], 1)
+        self.assertEqual(recovered.get_status(accepted.order_id), "NEW")
+
+    def test_terminal_transitions_survive_restart(self):
+        q = self._queue()
+        accepted = q.enqueue(_req(), "idem-1")
+        q.process_next(adapter=_Adapter())
+        q.mark_execution_result(accepted.order_id, "FILLED")
+        q.wal.close()
+
+        recovered = self._queue()
+
+        self.assertEqual(recovered.jobs[accepted.order_id]["status"], "FILLED")
+        self.assertTrue(recovered.jobs[accepted.order_id]["terminal"])
+
+    def test_stale_copy_logged_after_terminal_is_ignored_on_replay(self):
+        q = self._queue()
+        accepted = q.enqueue(_req(), "idem-1")
+        stale = dict(q.jobs[accepted.order_id], status="SENT")
+        q.mark_execution_result(accepted.order_id, "FILLED")
+        q.persist(stale)
+        q.wal.close()
+
+        recovered = self._queue()
+
+        self.assertEqual(recovered.jobs[accepted.order_id]["status"], "FILLED")
+
+    def test_snapshot_truncates_log_and_recovers(self):
+        q = self._queue(snapshot_every=4)
+        accepted = [q.enqueue(_req(qty=i + 1), f"idem-{i}") for i in range(5)]
+        q.process_next(adapter=_Adapter())
+        q.wal.close()
+
+        self.assertEqual(q.wal.snapshots, 1)
+        self.assertEqual(sorted(os.listdir(self.dir)), ["orders.00000001.wal", "orders.lock", "orders.snapshot.json"])
+        recovered = self._queue(snapshot_every=4)
+
+        self.assertEqual(len(recovered.jobs), 5)
+        self.assertEqual(recovered.jobs[accepted[0].order_id]["status"], "SENT")
+        self.assertEqual(list(recovered.queue), [a.order_id for a in accepted[1:]])
+        self.assertEqual(recovered.enqueue(_req(qty=3), "idem-2").order_id, accepted[2].order_id)
+
+    def _race_snapshot_into(self, q: OrderQueue, method: str) -> threading.Thread:
+        # runs a snapshot from another thread in the gap between the log append and the store apply
+        apply = getattr(q.store, method)
+        snapshotter = threading.Thread(target=q.snapshot)
+
+        def racing_apply(*args):
+            if not snapshotter.is_alive() and not q.wal.snapshots:
+                snapshotter.start()
+                snapshotter.join(0.2)
+            apply(*args)
+
+        setattr(q.store, method, racing_apply)
+        return snapshotter
+
+    def test_snapshot_racing_enqueue_keeps_the_order(self):
+        q = self._queue()
+        snapshotter = self._race_snapshot_into(q, "accept")
+
+        accepted = q.enqueue(_req(), "idem-1")
+        snapshotter.join()
+        q.wal.close()
+        recovered = self._queue()
+
+        self.assertEqual(q.wal.snapshots, 1)
+        self.assertEqual(list(recovered.jobs), [accepted.order_id])
+        self.assertEqual(recovered.queued_ids(), [accepted.order_id])
+        self.assertEqual(recovered.enqueue(_req(), "idem-1").order_id, accepted.order_id)
+
+    def test_snapshot_racing_transition_keeps_it(self):
+        store_path = os.path.join(self.dir, "orders.sqlite3")
+        wal = OrderWal(self.dir)
+        q = OrderQueue(wal=wal, store=SqliteOrderStore(store_path))
+        accepted = q.enqueue(_req(), "idem-1")
+        snapshotter = self._race_snapshot_into(q, "put")
+
+        class _Crash(BaseException):
+            pass
+
+        class _CrashingAdapter:
+            def place_order(self, **kwargs):
+                raise _Crash()
+
+        with self.assertRaises(_Crash):
+            q.process_next(adapter=_CrashingAdapter())
+        snapshotter.join()
+        wal.close()
+        q.store.close()
+        recovered = OrderQueue(wal=OrderWal(self.dir), store=SqliteOrderStore(store_path))
+        self.addCleanup(recovered.wal.close)
+        self.addCleanup(recovered.store.close)
+
+        # logged as DISPATCHING before the crash: flagged in flight, never re-sent
+        self.assertEqual(recovered.get_job(accepted.order_id)["error"], "RECOVERED_IN_FLIGHT")
+        self.assertEqual(recovered.queued_ids(), [])
+
+    def test_torn_tail_record_is_ignored(self):
+        q = self._queue()
+        accepted = q.enqueue(_req(), "idem-1")
+        q.wal.close()
+        with open(os.path.join(self.dir, "orders.00000000.wal"), "ab") as fp:
+            fp.write(b'{"op":"accept","idem_key":"idem-2","bo')
+
+        recovered = self._queue()
+
+        self.assertEqual(list(recovered.jobs), [accepted.order_id])
+        # the next append must start on its own line, not extend the torn bytes
+        after = recovered.enqueue(_req(qty=2), "idem-2")
+        recovered.wal.close()
+
+        reopened = self._queue()
+
+        self.assertEqual(set(reopened.jobs), {accepted.order_id, after.order_id})
+        self.assertEqual(reopened.enqueue(_req(qty=2), "idem-2").order_id, after.order_id)
+
+    def test_every_fsync_policy_round_trips(self):
+        for policy in FSYNC_POLICIES:
+            with self.subTest(policy=policy), tempfile.TemporaryDirectory() as directory:
+                wal = OrderWal(directory, fsync_policy=policy)
+                accepted = OrderQueue(wal=wal).enqueue(_req(), "idem-1")
+                wal.close()
+                reopened = OrderWal(directory, fsync_policy=policy)
+                self.addCleanup(reopened.close)
+                self.assertIn(accepted.order_id, OrderQueue(wal=reopened).jobs)
+
+    def test_second_owner_of_directory_is_refused(self):
+        wal = OrderWal(self.dir)
+
+        with self.assertRaises(RuntimeError) as ctx:
+            OrderWal(self.dir)
+        self.assertIn("ORDER_STATE_LOCKED", str(ctx.exception))
+        self.assertIn(str(os.getpid()), str(ctx.exception))
+
+        wal.close()
+        reopened = OrderWal(self.dir)
+        self.addCleanup(reopened.close)
+
+    def test_invalid_fsync_policy_rejected(self):
+        with self.assertRaises(ValueError):
+            OrderWal(self.dir, fsync_policy="sometimes")
+
+
+class OrderWalGroupCommitTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+
+    def test_concurrent_appends_share_fsyncs(self):
+        wal = OrderWal(self.dir, fsync_policy="group")
+        self.addCleanup(wal.close)
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            time.sleep(0.005)
+            real_fsync(fd)
+
+        barrier = threading.Barrier(16)
+
+        def worker(n):
+            barrier.wait()
+            for i in range(10):
+                wal.append({"op": "job", "job": {"order_id": f"{n}-{i}"}})
+
+        with patch.object(order_wal.os, "fsync", slow_fsync):
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(16)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(wal.records, 160)
+        self.assertLess(wal.fsyncs, 80)
+        _, records = wal.load()
+        self.assertEqual(len(records), 160)
+
+    def test_write_failure_poisons_log(self):
+        wal = OrderWal(self.dir, fsync_policy="group")
+        self.addCleanup(wal.close)
+
+        with patch.object(order_wal.os, "fsync", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                wal.append({"op": "job", "job": {"order_id": "1"}})
+        with self.assertRaises(OSError):
+            wal.append({"op": "job", "job": {"order_id": "2"}})
+        self.assertFalse(wal.metrics()["wal_healthy"])
+
+
+if __name__ == "__main__":
+    unittest.main()
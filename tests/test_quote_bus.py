@@ -0,0 +1,114 @@
+import threading
+import unittest
+
+from app.main import app
+from app.services.quote_bus import POLICY_FIFO, BoundedFifoQueue, QuoteBus
+from app.services.quote_cache import quote_cache
+
+
+def _tick(symbol: str, price: float) -> dict:
+    return {"symbol": symbol, "price": price}
+
+
+class BoundedFifoQueueTest(unittest.TestCase):
+    def test_keeps_every_tick_and_drops_oldest_when_full(self):
+        queue = BoundedFifoQueue(max_items=3)
+        for price in range(5):
+            queue.put("005930", price)
+
+        self.assertEqual(queue.drain(), [2, 3, 4])
+        self.assertEqual(queue.dropped, 2)
+        self.assertIsNone(queue.pending_since)
+
+
+class QuoteBusTest(unittest.TestCase):
+    def test_publish_only_enqueues_until_subscriber_drains(self):
+        bus = QuoteBus()
+        received = []
+        bus.subscribe("recorder", received.extend)
+
+        bus.publish([_tick("005930", 1), _tick("005930", 2), _tick("000660", 3)])
+
+        self.assertEqual(received, [])
+        self.assertEqual(bus.metrics()["bus_subscribers"]["recorder"]["pending"], 2)
+        bus.drain()
+        self.assertEqual(received, [_tick("005930", 2), _tick("000660", 3)])
+        self.assertEqual(bus.metrics()["bus_subscribers"]["recorder"]["conflated"], 1)
+
+    def test_fifo_subscriber_sees_every_tick(self):
+        bus = QuoteBus()
+        received = []
+        bus.subscribe("ingest", received.extend, policy=POLICY_FIFO)
+
+        bus.publish([_tick("005930", 1), _tick("005930", 2)])
+        bus.drain()
+
+        self.assertEqual([t["price"] for t in received], [1, 2])
+
+    def test_slow_subscriber_does_not_block_others(self):
+        bus = QuoteBus()
+        release = threading.Event()
+        fast_done = threading.Event()
+        slow_calls = []
+
+        def slow(batch):
+            slow_calls.append(batch)
+            release.wait(timeout=5)
+
+        bus.subscribe("slow", slow)
+        bus.subscribe("fast", lambda batch: fast_done.set())
+        bus.start()
+        try:
+            bus.publish([_tick("005930", 1)])
+            self.assertTrue(fast_done.wait(timeout=2))
+            fast_done.clear()
+            for price in range(2, 6):
+                bus.publish([_tick("005930", price)])
+            self.assertTrue(fast_done.wait(timeout=2))
+
+            slow_metrics = bus.metrics()["bus_subscribers"]["slow"]
+            self.assertEqual(slow_metrics["pending"], 1)
+            self.assertGreaterEqual(slow_metrics["conflated"], 3)
+            self.assertGreaterEqual(slow_metrics["lag_ms"], 0.0)
+        finally:
+            release.set()
+            bus.stop()
+
+        self.assertEqual(slow_calls[-1], [_tick("005930", 5)])
+
+    def test_handler_errors_are_counted_not_raised(self):
+        bus = QuoteBus()
+
+        def broken(batch):
+            raise RuntimeError("boom")
+
+        bus.subscribe("broken", broken)
+        bus.publish([_tick("005930", 1)])
+        bus.drain()
+
+        metrics = bus.metrics()["bus_subscribers"]["broken"]
+        self.assertEqual(metrics["errors"], 1)
+        self.assertEqual(metrics["last_error"], "boom")
+
+    def test_duplicate_subscriber_name_is_rejected(self):
+        bus = QuoteBus()
+        bus.subscribe("recorder", lambda batch: None)
+
+        with self.assertRaises(ValueError):
+            bus.subscribe("recorder", lambda batch: None)
+
+
+class AppQuoteBusWiringTest(unittest.TestCase):
+    def setUp(self):
+        quote_cache.clear()
+
+    def test_ws_frames_reach_cache_through_bus(self):
+        app.state.ws_client.handle_raw_batch('{"symbol":"005930","price":70000,"ts":100}')
+
+        self.assertIsNone(quote_cache.get("005930"))
+        app.state.quote_bus.drain()
+        self.assertEqual(quote_cache.get("005930").price, 70000.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+from app.schemas.quote import QuoteSnapshot
+from app.services.quote_cache import QuoteCache, QuoteIngestWorker, QuoteRecord, create_quote_cache
+
+try:
+    import numpy  # noqa: F401
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+@unittest.skipUnless(numpy is not None, "numpy not installed")
+class ColumnarQuoteCacheTest(unittest.TestCase):
+    def setUp(self):
+        from app.services.quote_cache_columnar import ColumnarQuoteCache
+
+        self.cache = ColumnarQuoteCache(initial_capacity=2)
+
+    def test_create_quote_cache_selects_mode(self):
+        from app.services.quote_cache_columnar import ColumnarQuoteCache
+
+        self.assertIsInstance(create_quote_cache("columnar"), ColumnarQuoteCache)
+        self.assertIs(type(create_quote_cache("dict")), QuoteCache)
+        with self.assertRaises(ValueError):
+            create_quote_cache("redis")
+
+    def test_upsert_get_and_list_keep_dict_cache_semantics(self):
+        self.cache.upsert(QuoteRecord(symbol="005930", price=71300.0, change_pct=1.49, turnover=10.0, ts=100))
+        self.cache.upsert_many(
+            [
+                QuoteRecord(symbol="000660", price=198500.0, source="kis-rest", ts=101),
+                QuoteRecord(symbol="035420", price=210000.0, ts=102),
+                QuoteRecord(symbol="005930", price=71400.0, ts=103),
+            ]
+        )
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertGreaterEqual(self.cache.capacity, 3)
+        row = self.cache.get("005930")
+        self.assertIsInstance(row, QuoteRecord)
+        self.assertEqual(row.price, 71400.0)
+        self.assertEqual(row.ts, 103)
+        self.assertIsNone(self.cache.get("999999"))
+        self.assertEqual([r.symbol for r in self.cache.list_many(["035420", "999999", "000660"])], ["035420", "000660"])
+        self.assertEqual(self.cache.list_many(["000660"])[0].source, "kis-rest")
+        self.assertEqual([r.symbol for r in self.cache.list_all()], ["005930", "000660", "035420"])
+
+    def test_upsert_accepts_pydantic_snapshot(self):
+        self.cache.upsert(
+            QuoteSnapshot(
+                symbol="005930",
+                price=70000.0,
+                change_pct=0.0,
+                turnover=0.0,
+                source="demo",
+                ts=100,
+                freshness_sec=0.0,
+                state="HEALTHY",
+            )
+        )
+
+        self.assertEqual(self.cache.get("005930").source, "demo")
+
+    def test_stale_count_tracks_updates_without_touching_rows(self):
+        self.cache.upsert_many(
+            [
+                QuoteRecord(symbol="005930", price=1.0, ts=100),
+                QuoteRecord(symbol="000660", price=1.0, ts=95),
+                QuoteRecord(symbol="035420", price=1.0, ts=120),
+            ]
+        )
+
+        self.assertEqual(self.cache.stale_count(now=105, stale_after_sec=5), 1)
+        self.assertEqual(self.cache.get("000660").state, "HEALTHY")
+        self.assertEqual(self.cache.get("000660").with_freshness(105, 5).state, "STALE")
+
+        self.cache.upsert(QuoteRecord(symbol="000660", price=2.0, ts=105))
+        self.assertEqual(self.cache.stale_count(now=105, stale_after_sec=5), 0)
+        self.assertEqual(self.cache.stale_count(now=111, stale_after_sec=5), 2)
+
+    def test_ingest_worker_metrics_on_columnar_cache(self):
+        worker = QuoteIngestWorker(self.cache, stale_after_sec=5)
+        worker.on_ws_batch([{"symbol": "005930", "price": 1, "ts": 100}, {"symbol": "000660", "price": 2, "ts": 90}])
+
+        metrics = worker.metrics(now=100)
+
+        self.assertEqual(metrics["cached_symbols"], 2)
+        self.assertEqual(metrics["stale_symbols"], 1)
+
+    def test_clear_resets_symbols(self):
+        self.cache.upsert(QuoteRecord(symbol="005930", price=1.0, ts=1))
+        self.cache.clear()
+
+        self.assertEqual(len(self.cache), 0)
+        self.assertIsNone(self.cache.get("005930"))
+        self.assertEqual(self.cache.list_all(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import random
+import unittest
+
+from app.services.quote_cache import QuoteCache, QuoteIngestWorker, QuoteRecord
+
+
+class QuoteCacheFreshnessTest(unittest.TestCase):
+    def _brute_force_stale(self, cache: QuoteCache, now: int, stale_after_sec: int) -> int:
+        return sum(1 for row in cache.list_all() if row.with_freshness(now, stale_after_sec).state == "STALE")
+
+    def test_stale_count_matches_full_scan_under_random_updates(self):
+        rng = random.Random(7)
+        cache = QuoteCache()
+        symbols = [f"{idx:06d}" for idx in range(50)]
+        now = 1_700_000_000
+
+        for _ in range(500):
+            now += rng.choice([0, 0, 1, 2])
+            cache.upsert(QuoteRecord(symbol=rng.choice(symbols), price=1.0, ts=now - rng.randint(0, 12)))
+            self.assertEqual(cache.stale_count(now, 5), self._brute_force_stale(cache, now, 5))
+
+    def test_stale_count_rebuilds_when_clock_steps_back(self):
+        cache = QuoteCache()
+        cache.upsert_many(
+            [
+                QuoteRecord(symbol="005930", price=1.0, ts=100),
+                QuoteRecord(symbol="000660", price=1.0, ts=110),
+            ]
+        )
+
+        self.assertEqual(cache.stale_count(200, 5), 2)
+        self.assertEqual(cache.stale_count(112, 5), 1)
+        self.assertEqual(cache.stale_count(112, 60), 0)
+
+    def test_clear_resets_stale_counter(self):
+        cache = QuoteCache()
+        cache.upsert(QuoteRecord(symbol="005930", price=1.0, ts=100))
+        self.assertEqual(cache.stale_count(200, 5), 1)
+
+        cache.clear()
+
+        self.assertEqual(cache.stale_count(200, 5), 0)
+
+    def test_metrics_do_not_mutate_cached_rows(self):
+        cache = QuoteCache()
+        worker = QuoteIngestWorker(cache, stale_after_sec=5)
+        worker.on_ws_message({"symbol": "005930", "price": 1, "ts": 100})
+
+        metrics = worker.metrics(now=200)
+
+        self.assertEqual(metrics["stale_symbols"], 1)
+        self.assertEqual(cache.get("005930").state, "HEALTHY")
+        self.assertEqual(cache.get("005930").freshness_sec, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
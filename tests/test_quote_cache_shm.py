@@ -0,0 +1,176 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+from unittest.mock import patch
+
+from app.services.quote_cache import QuoteIngestWorker, QuoteRecord, create_quote_cache
+from app.services.quote_cache_shm import SharedQuoteCache, SharedQuoteTable
+
+
+class SharedQuoteCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "quotes")
+
+    def _writer(self, capacity: int = 8) -> SharedQuoteCache:
+        return SharedQuoteCache(self.path, role="writer", capacity=capacity)
+
+    def test_reader_sees_writer_rows_without_local_state(self):
+        writer = self._writer()
+        reader = SharedQuoteCache(self.path, role="reader")
+        writer.upsert(QuoteRecord(symbol="005930", price=71300.0, change_pct=1.49, turnover=10.0, ts=100))
+        writer.upsert_many(
+            [
+                QuoteRecord(symbol="000660", price=198500.0, source="kis-rest", ts=101),
+                QuoteRecord(symbol="005930", price=71400.0, ts=103),
+            ]
+        )
+
+        row = reader.get("005930")
+        self.assertEqual((row.price, row.change_pct, row.ts, row.source), (71400.0, 0.0, 103, "kis-ws"))
+        self.assertEqual(reader.get("000660").source, "kis-rest")
+        self.assertIsNone(reader.get("999999"))
+        self.assertEqual([r.symbol for r in reader.list_many(["000660", "999999", "005930"])], ["000660", "005930"])
+        self.assertEqual(len(reader), 2)
+        self.assertEqual(reader.stale_count(now=108, stale_after_sec=5), 1)
+
+    def test_reader_is_read_only(self):
+        self._writer()
+        reader = SharedQuoteCache(self.path, role="reader")
+
+        with self.assertRaises(RuntimeError):
+            reader.upsert(QuoteRecord(symbol="005930", price=1.0, ts=1))
+
+    def test_reader_started_before_writer_picks_table_up(self):
+        reader = SharedQuoteCache(self.path, role="reader")
+        self.assertIsNone(reader.get("005930"))
+
+        writer = self._writer()
+        writer.upsert(QuoteRecord(symbol="005930", price=70000.0, ts=100))
+        reader._next_reopen_check = 0.0
+
+        self.assertEqual(reader.get("005930").price, 70000.0)
+
+    def test_restarted_writer_replaces_table_and_reader_remaps(self):
+        first = self._writer()
+        first.upsert(QuoteRecord(symbol="005930", price=70000.0, ts=100))
+        reader = SharedQuoteCache(self.path, role="reader")
+        self.assertEqual(reader.get("005930").price, 70000.0)
+
+        second = self._writer()
+        second.upsert(QuoteRecord(symbol="000660", price=198500.0, ts=101))
+        reader._next_reopen_check = 0.0
+
+        self.assertEqual(reader.get("000660").price, 198500.0)
+        self.assertIsNone(reader.get("005930"))
+        self.assertEqual(reader.metrics()["quote_shm_table_reopens"], 2)
+
+    def test_reader_follows_restarted_writer_for_known_symbol(self):
+        first = self._writer()
+        first.upsert(QuoteRecord(symbol="005930", price=100.0, ts=1))
+        reader = SharedQuoteCache(self.path, role="reader")
+        self.assertEqual(reader.get("005930").price, 100.0)
+        old_view = reader._view
+
+        second = self._writer()  # ingest restart; no reopen-timer reset this time
+        second.upsert(QuoteRecord(symbol="005930", price=200.0, ts=2))
+
+        row = reader.get("005930")
+        self.assertEqual((row.price, row.ts), (200.0, 2))
+        self.assertIsNot(reader._view[0], old_view[0])
+        # a call that picked up the previous view before the remap can still finish its read
+        self.assertEqual(old_view[0].read(old_view[1]["005930"]).price, 100.0)
+
+        second.clear()
+        second.upsert(QuoteRecord(symbol="000660", price=300.0, ts=3))
+        self.assertIsNone(reader.get("005930"))
+        self.assertEqual(reader.get("000660").price, 300.0)
+        self.assertEqual(reader.metrics()["quote_shm_table_reopens"], 3)
+
+    def test_write_in_progress_is_never_returned(self):
+        writer = self._writer()
+        writer.upsert(QuoteRecord(symbol="005930", price=70000.0, ts=100))
+        reader = SharedQuoteCache(self.path, role="reader")
+        self.assertIsNotNone(reader.get("005930"))
+
+        # leave the slot's sequence odd, as a writer that died mid-update would
+        table = writer._table
+        offset = table._slot_offset(0)
+        seq = int.from_bytes(table._buf[offset : offset + 8], "little")
+        table._buf[offset : offset + 8] = (seq + 1).to_bytes(8, "little")
+
+        self.assertIsNone(reader.get("005930"))
+        self.assertEqual(reader.metrics()["quote_shm_read_misses"], 1)
+
+    def test_overflow_keeps_writer_cache_and_counts(self):
+        writer = self._writer(capacity=1)
+        writer.upsert_many([QuoteRecord(symbol="005930", price=1.0, ts=1), QuoteRecord(symbol="000660", price=2.0, ts=1)])
+        reader = SharedQuoteCache(self.path, role="reader")
+
+        self.assertEqual(writer.get("000660").price, 2.0)
+        self.assertIsNone(reader.get("000660"))
+        self.assertEqual(writer.metrics()["quote_shm_overflow_writes"], 1)
+
+    def test_ws_state_published_by_ingest_worker_reaches_reader_metrics(self):
+        writer = self._writer()
+        ingest = QuoteIngestWorker(writer)
+        ingest.sync_ws_state(connected=True, reconnect_count=2, last_error=None, heartbeat_ts=1000)
+        ingest.on_ws_batch([{"symbol": "005930", "price": 70000.0, "ts": 1001}])
+
+        reader_worker = QuoteIngestWorker(SharedQuoteCache(self.path, role="reader"))
+        metrics = reader_worker.metrics(now=1002)
+
+        self.assertTrue(metrics["ws_connected"])
+        self.assertEqual(metrics["ws_reconnect_count"], 2)
+        self.assertEqual(metrics["last_ws_message_ts"], 1001)
+        self.assertEqual(metrics["cached_symbols"], 1)
+
+    def test_create_quote_cache_selects_shm_role_from_env(self):
+        env = {"QUOTE_SHM_PATH": self.path, "QUOTE_SHM_ROLE": "writer", "QUOTE_SHM_CAPACITY": "16"}
+        with patch.dict(os.environ, env):
+            cache = create_quote_cache("shm")
+
+        self.assertIsInstance(cache, SharedQuoteCache)
+        self.assertFalse(cache.read_only)
+        self.assertEqual(SharedQuoteTable(self.path).capacity, 16)
+
+    def test_reader_never_observes_torn_rows_from_another_process(self):
+        self._writer(capacity=4)
+        script = textwrap.dedent(
+            f"""
+            import time
+            from app.services.quote_cache import QuoteRecord
+            from app.services.quote_cache_shm import SharedQuoteCache
+            cache = SharedQuoteCache({self.path!r}, role="writer", capacity=4)
+            deadline = time.monotonic() + 0.5
+            n = 0
+            while time.monotonic() < deadline:
+                n += 1
+                cache.upsert(QuoteRecord(symbol="005930", price=float(n), change_pct=-float(n), turnover=2.0 * n, ts=n))
+            """
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        proc = subprocess.Popen([sys.executable, "-c", script], cwd=root)
+        self.addCleanup(proc.wait)
+        reader = SharedQuoteCache(self.path, role="reader")
+        reads = 0
+        deadline = time.monotonic() + 5.0
+        while proc.poll() is None and time.monotonic() < deadline:
+            reader._next_reopen_check = 0.0
+            row = reader.get("005930")
+            if row is None:
+                continue
+            reads += 1
+            self.assertEqual((row.change_pct, row.turnover, row.ts), (-row.price, 2.0 * row.price, int(row.price)))
+
+        self.assertEqual(proc.wait(timeout=5), 0)
+        self.assertGreater(reads, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
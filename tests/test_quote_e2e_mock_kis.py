@@ -43,7 +43,7 @@ class StubRestClient:
 
 class QuoteE2EMockKisTest(unittest.TestCase):
     def setUp(self):
-        quote_cache._rows.clear()
+        quote_cache.clear()
         quote_ingest_worker.ws_messages = 0
         quote_ingest_worker.upserts = 0
         quote_ingest_worker.ws_connected = False
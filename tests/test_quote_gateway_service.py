@@ -1,3 +1,5 @@
+import asyncio
+import threading
 import time
 import unittest
 
@@ -75,6 +77,42 @@ class AlwaysFailRestClient:
         raise TimeoutError(f"timeout:{symbol}")
 
 
+class SlowRestClient:
+    def __init__(self, payload: dict, delay_sec: dict[str, float]) -> None:
+        self.payload = payload
+        self.delay_sec = delay_sec
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_quote(self, symbol: str) -> dict:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay_sec.get(symbol, 0.05))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        data = dict(self.payload)
+        data["symbol"] = symbol
+        return data
+
+
+class SlowAsyncRestClient:
+    def __init__(self, payload: dict, delay_sec: float = 0.05) -> None:
+        self.payload = payload
+        self.delay_sec = delay_sec
+        self.calls = 0
+
+    async def get_quote(self, symbol: str) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.delay_sec)
+        data = dict(self.payload)
+        data["symbol"] = symbol
+        return data
+
+
 class QuoteGatewayServiceTest(unittest.TestCase):
     def test_market_open_with_fresh_ws_cache_uses_ws(self):
         cache = QuoteCache()
@@ -413,5 +451,198 @@ class QuoteGatewayServiceTest(unittest.TestCase):
         self.assertEqual(rest_client.calls_by_symbol["051910"], 2)
 
 
+    def test_batch_fans_out_rest_fallbacks_concurrently_in_input_order(self):
+        now = int(time.time())
+        symbols = ["005930", "000660", "035420", "051910", "068270", "105560"]
+        rest_client = SlowRestClient({"price": 70000.0, "source": "kis-rest", "ts": now}, {})
+        service = QuoteGatewayService(
+            quote_cache=QuoteCache(),
+            rest_client=rest_client,
+            market_open_checker=lambda: False,
+            rest_concurrency=3,
+        )
+        self.addCleanup(service.close)
+
+        started = time.monotonic()
+        quotes, meta = service.get_quotes(symbols)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([q.symbol for q in quotes], symbols)
+        self.assertEqual(meta.missing_count, 0)
+        self.assertEqual(rest_client.max_in_flight, 3)
+        self.assertLess(elapsed, 0.25)
+        self.assertEqual(service.metrics()["rest_filled_count"], 6)
+
+    def test_batch_deadline_returns_ready_rows_as_partial(self):
+        cache = QuoteCache()
+        now = int(time.time())
+        cache.upsert(
+            QuoteSnapshot(
+                symbol="035420",
+                price=200000.0,
+                change_pct=0.0,
+                turnover=1.0,
+                source="kis-ws",
+                ts=now - 30,
+                freshness_sec=0.0,
+                state="STALE",
+            )
+        )
+        rest_client = SlowRestClient(
+            {"price": 70000.0, "source": "kis-rest", "ts": now},
+            {"005930": 0.01, "000660": 1.0, "035420": 1.0},
+        )
+        service = QuoteGatewayService(
+            quote_cache=cache,
+            rest_client=rest_client,
+            market_open_checker=lambda: False,
+            rest_concurrency=3,
+            batch_deadline_sec=0.2,
+        )
+        self.addCleanup(service.close)
+
+        quotes, meta = service.get_quotes(["005930", "000660", "035420"])
+
+        # 035420 times out but still has a last good quote; 000660 has nothing to fall back on
+        self.assertEqual([q.symbol for q in quotes], ["005930", "035420"])
+        self.assertEqual(quotes[1].source, "kis-ws")
+        self.assertEqual(meta.failed_symbols, ["000660"])
+        self.assertEqual(meta.missing_count, 1)
+        self.assertEqual(service.metrics()["batch_deadline_hits"], 1)
+        self.assertLess(service.metrics()["batch_elapsed_ms"], 900)
+
+    def test_sequential_batch_honours_deadline(self):
+        now = int(time.time())
+        rest_client = SlowRestClient({"price": 70000.0, "source": "kis-rest", "ts": now}, {"005930": 0.15})
+        service = QuoteGatewayService(
+            quote_cache=QuoteCache(),
+            rest_client=rest_client,
+            market_open_checker=lambda: False,
+            symbol_delay_max_sec=0.0,
+            batch_deadline_sec=0.1,
+        )
+
+        quotes, meta = service.get_quotes(["005930", "000660"])
+
+        self.assertEqual([q.symbol for q in quotes], ["005930"])
+        self.assertEqual(meta.failed_symbols, ["000660"])
+
+    def test_concurrent_misses_for_one_symbol_share_a_single_rest_fetch(self):
+        now = int(time.time())
+        rest_client = SlowRestClient({"price": 70000.0, "source": "kis-rest", "ts": now}, {"005930": 0.1})
+        service = QuoteGatewayService(
+            quote_cache=QuoteCache(),
+            rest_client=rest_client,
+            market_open_checker=lambda: False,
+        )
+        results = []
+        barrier = threading.Barrier(5)
+
+        def worker():
+            barrier.wait()
+            results.append(service.get_quote("005930"))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(q.price == 70000.0 and q.source == "kis-rest" for q in results))
+        self.assertEqual(rest_client.max_in_flight, 1)
+        metrics = service.metrics()
+        self.assertEqual(metrics["rest_fallbacks"], 1)
+        self.assertEqual(metrics["rest_fetch_issued"], 1)
+        self.assertEqual(metrics["rest_fetch_coalesced"], 4)
+        self.assertEqual(metrics["rest_fetch_in_flight"], 0)
+
+    def test_coalesced_waiters_receive_the_leader_failure(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        class BlockingFailClient:
+            calls = 0
+
+            def get_quote(self, symbol: str) -> dict:
+                BlockingFailClient.calls += 1
+                started.set()
+                release.wait(1.0)
+                raise RuntimeError("rest down")
+
+        service = QuoteGatewayService(
+            quote_cache=QuoteCache(),
+            rest_client=BlockingFailClient(),
+            market_open_checker=lambda: False,
+            rest_retry_attempts=1,
+        )
+        errors = []
+
+        def worker():
+            try:
+                service.get_quote("005930")
+            except RuntimeError as exc:
+                errors.append(str(exc))
+
+        leader = threading.Thread(target=worker)
+        leader.start()
+        started.wait(1.0)
+        waiters = [threading.Thread(target=worker) for _ in range(3)]
+        for t in waiters:
+            t.start()
+        while service.metrics()["rest_fetch_coalesced"] < 3:
+            time.sleep(0.005)
+        release.set()
+        for t in [leader, *waiters]:
+            t.join()
+
+        self.assertEqual(BlockingFailClient.calls, 1)
+        self.assertEqual(errors, ["rest down"] * 4)
+
+    def test_async_misses_for_one_symbol_share_a_single_rest_fetch(self):
+        now = int(time.time())
+        rest_client = SlowAsyncRestClient({"price": 70000.0, "source": "kis-rest", "ts": now})
+        service = QuoteGatewayService(
+            quote_cache=QuoteCache(),
+            rest_client=StubRestClient({"price": 1.0, "source": "kis-rest", "ts": now}),
+            async_rest_client=rest_client,
+            market_open_checker=lambda: False,
+        )
+
+        async def scenario():
+            return await asyncio.gather(*(service.get_quote_async("005930") for _ in range(10)))
+
+        quotes = asyncio.run(scenario())
+
+        self.assertEqual([q.price for q in quotes], [70000.0] * 10)
+        self.assertEqual(rest_client.calls, 1)
+        self.assertEqual(service.metrics()["rest_fetch_coalesced"], 9)
+
+    def test_cancelled_async_leader_does_not_fail_waiters(self):
+        now = int(time.time())
+        rest_client = SlowAsyncRestClient({"price": 70000.0, "source": "kis-rest", "ts": now})
+        service = QuoteGatewayService(
+            quote_cache=QuoteCache(),
+            rest_client=StubRestClient({"price": 1.0, "source": "kis-rest", "ts": now}),
+            async_rest_client=rest_client,
+            market_open_checker=lambda: False,
+        )
+
+        async def scenario():
+            leader = asyncio.ensure_future(service.get_quote_async("005930"))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.ensure_future(service.get_quote_async("005930"))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return leader, await waiter
+
+        leader, quote = asyncio.run(scenario())
+
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(quote.price, 70000.0)
+        self.assertEqual(rest_client.calls, 1)
+        self.assertEqual(service.metrics()["rest_fetch_coalesced"], 1)
+
+
 if __name__ == "__main__":
     unittest.main()
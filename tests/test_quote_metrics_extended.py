@@ -8,7 +8,7 @@ from app.services.quote_cache import quote_cache, quote_ingest_worker
 
 class QuoteMetricsExtendedTest(unittest.TestCase):
     def setUp(self):
-        quote_cache._rows.clear()
+        quote_cache.clear()
         quote_ingest_worker.ws_messages = 0
         quote_ingest_worker.upserts = 0
         quote_ingest_worker.ws_connected = False
@@ -40,6 +40,9 @@ class QuoteMetricsExtendedTest(unittest.TestCase):
         self.assertIn('last_ws_message_ts', payload)
         self.assertIn('ws_last_error', payload)
         self.assertIn('ws_reconnect_count', payload)
+        self.assertIn('ws_frames_realtime', payload)
+        self.assertIn('ws_frames_control', payload)
+        self.assertIn('ws_frames_unknown', payload)
 
         self.assertEqual(payload['rest_fallbacks'], 0)
         self.assertFalse(payload['ws_connected'])
@@ -0,0 +1,149 @@
+import asyncio
+import time
+import unittest
+
+from fastapi.testclient import TestClient
+
+from app.api.routes import stream_quotes_sse
+from app.main import app
+from app.services.quote_cache import QuoteRecord, quote_cache, quote_ingest_worker
+from app.services.quote_stream import ConflatingQueue, QuoteStreamHub
+
+
+class ConflatingQueueTest(unittest.TestCase):
+    def test_slow_consumer_gets_latest_tick_per_symbol(self):
+        queue = ConflatingQueue(max_symbols=10)
+        for price in (1, 2, 3):
+            queue.put("005930", {"symbol": "005930", "price": price})
+        queue.put("000660", {"symbol": "000660", "price": 9})
+
+        items = queue.drain()
+
+        self.assertEqual(items, [{"symbol": "005930", "price": 3}, {"symbol": "000660", "price": 9}])
+        self.assertEqual(queue.conflated, 2)
+        self.assertEqual(queue.drain(), [])
+
+    def test_new_symbols_beyond_bound_are_dropped(self):
+        queue = ConflatingQueue(max_symbols=2)
+        self.assertTrue(queue.put("A", 1))
+        self.assertTrue(queue.put("B", 1))
+        self.assertFalse(queue.put("C", 1))
+        self.assertTrue(queue.put("A", 2))
+
+        self.assertEqual(len(queue), 2)
+        self.assertEqual(queue.dropped, 1)
+
+    def test_on_ready_fires_only_on_empty_to_non_empty(self):
+        calls = []
+        queue = ConflatingQueue(on_ready=lambda: calls.append(1))
+        queue.put("A", 1)
+        queue.put("B", 1)
+        queue.drain()
+        queue.put("A", 2)
+
+        self.assertEqual(len(calls), 2)
+
+
+class QuoteStreamHubTest(unittest.TestCase):
+    def test_publish_filters_by_symbol_set(self):
+        async def scenario():
+            hub = QuoteStreamHub()
+            sub = hub.subscribe(["005930"])
+            hub.publish(
+                [
+                    QuoteRecord(symbol="005930", price=1.0, ts=100),
+                    QuoteRecord(symbol="000660", price=2.0, ts=100),
+                ]
+            )
+            batch = await sub.next_batch(timeout=1.0)
+            hub.unsubscribe(sub)
+            return batch, hub.metrics()
+
+        batch, metrics = asyncio.run(scenario())
+
+        self.assertEqual([d["symbol"] for d in batch], ["005930"])
+        self.assertEqual(metrics["stream_subscribers"], 0)
+        self.assertEqual(metrics["stream_published"], 2)
+
+    def test_next_batch_times_out_empty(self):
+        async def scenario():
+            hub = QuoteStreamHub()
+            return await hub.subscribe().next_batch(timeout=0.01)
+
+        self.assertEqual(asyncio.run(scenario()), [])
+
+
+class QuoteStreamEndpointTest(unittest.TestCase):
+    def setUp(self):
+        quote_cache.clear()
+
+    def test_ws_stream_sends_snapshot_then_ingested_deltas(self):
+        quote_cache.upsert(QuoteRecord(symbol="005930", price=70000.0, ts=100))
+        client = TestClient(app)
+
+        with client.websocket_connect("/v1/stream/quotes?symbols=005930") as ws:
+            snapshot = ws.receive_json()
+            quote_ingest_worker.on_ws_batch(
+                [
+                    {"symbol": "000660", "price": 120000, "ts": 101},
+                    {"symbol": "005930", "price": 70100, "ts": 101},
+                ]
+            )
+            update = ws.receive_json()
+
+        self.assertEqual(snapshot["type"], "snapshot")
+        self.assertEqual([q["price"] for q in snapshot["quotes"]], [70000.0])
+        self.assertEqual(update["type"], "quotes")
+        self.assertEqual([(q["symbol"], q["price"]) for q in update["quotes"]], [("005930", 70100.0)])
+
+    def test_ws_stream_subscribe_control_adds_symbols(self):
+        client = TestClient(app)
+
+        with client.websocket_connect("/v1/stream/quotes?symbols=005930") as ws:
+            ws.receive_json()
+            ws.send_json({"action": "subscribe", "symbols": ["000660"]})
+            # control frames are applied by a concurrent reader; wait until it lands
+            hub = app.state.quote_stream_hub
+            for _ in range(100):
+                subs = hub._subscriptions
+                if subs and "000660" in (subs[-1].symbols or ()):
+                    break
+                time.sleep(0.01)
+            quote_ingest_worker.on_ws_batch([{"symbol": "000660", "price": 120000, "ts": 101}])
+            update = ws.receive_json()
+
+        self.assertEqual([q["symbol"] for q in update["quotes"]], ["000660"])
+
+    def test_sse_stream_emits_snapshot_and_quote_events(self):
+        quote_cache.upsert(QuoteRecord(symbol="005930", price=70000.0, ts=100))
+
+        class _Request:
+            # TestClient buffers whole responses, so drive the SSE generator directly
+            def __init__(self):
+                self.app = app
+                self.checks = 0
+
+            async def is_disconnected(self):
+                self.checks += 1
+                return self.checks > 1
+
+        async def scenario():
+            response = await stream_quotes_sse(_Request(), symbols="005930")
+            events = response.body_iterator
+            first = await events.__anext__()
+            quote_ingest_worker.on_ws_batch([{"symbol": "005930", "price": 70100, "ts": 101}])
+            second = await events.__anext__()
+            await events.aclose()
+            return response.media_type, first, second
+
+        media_type, first, second = asyncio.run(scenario())
+
+        self.assertEqual(media_type, "text/event-stream")
+        self.assertTrue(first.startswith("event: snapshot\n"))
+        self.assertTrue(second.startswith("event: quotes\n"))
+        self.assertIn('"price":70100.0', second)
+        self.assertEqual(app.state.quote_stream_hub.metrics()["stream_subscribers"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.quote_cache import QuoteCache, QuoteIngestWorker, QuoteRecord, create_quote_cache
+from app.services.quote_gateway import QuoteGatewayService
+from app.services.tick_history import TickHistory, TickRing
+
+
+class TickRingTest(unittest.TestCase):
+    def test_ring_keeps_last_capacity_ticks_oldest_first(self):
+        ring = TickRing(4)
+        for ts in range(100, 110):
+            ring.append(ts, float(ts), 0.0, 0.0)
+
+        ticks = ring.since()
+
+        self.assertEqual(len(ring), 4)
+        self.assertEqual([t["ts"] for t in ticks], [106, 107, 108, 109])
+        self.assertEqual([t["seq"] for t in ticks], [7, 8, 9, 10])
+
+    def test_since_filters_out_older_ticks(self):
+        ring = TickRing(8)
+        for ts in (100, 101, 102, 103):
+            ring.append(ts, 1.0, 0.0, 0.0)
+
+        self.assertEqual([t["ts"] for t in ring.since(101)], [102, 103])
+        self.assertEqual(ring.since(103), [])
+
+    def test_memory_is_fixed_by_capacity(self):
+        ring = TickRing(1024)
+        before = ring.nbytes
+        for ts in range(5000):
+            ring.append(ts, 1.0, 0.0, 0.0)
+
+        self.assertEqual(before, 32 * 1024)
+        self.assertEqual(ring.nbytes, before)
+
+    def test_history_returns_none_for_unknown_symbol(self):
+        history = TickHistory(depth=2)
+        history.record("005930", 100, 1.0, 0.0, 0.0)
+
+        self.assertIsNone(history.ticks("000660"))
+        self.assertEqual(history.nbytes(), 64)
+
+
+class QuoteCacheTickHistoryTest(unittest.TestCase):
+    def test_disabled_by_default(self):
+        cache = QuoteCache()
+        cache.upsert(QuoteRecord(symbol="005930", price=1.0, ts=100))
+
+        self.assertIsNone(cache.tick_history)
+        self.assertIsNone(cache.ticks("005930"))
+
+    def test_ws_batch_records_every_tick_not_only_latest(self):
+        cache = create_quote_cache("dict", tick_history_depth=16)
+        worker = QuoteIngestWorker(cache)
+        worker.on_ws_batch(
+            [
+                {"symbol": "005930", "price": 70000, "ts": 100},
+                {"symbol": "005930", "price": 70100, "ts": 101},
+                {"symbol": "000660", "price": 120000, "ts": 101},
+            ]
+        )
+
+        ticks = cache.ticks("005930")
+
+        self.assertEqual([t["price"] for t in ticks], [70000.0, 70100.0])
+        self.assertEqual(cache.get("005930").price, 70100.0)
+
+        cache.clear()
+        self.assertIsNone(cache.ticks("005930"))
+
+
+class QuoteTicksEndpointTest(unittest.TestCase):
+    def setUp(self):
+        self._original_service = app.state.quote_gateway_service
+
+    def tearDown(self):
+        app.state.quote_gateway_service = self._original_service
+
+    def _client(self, cache: QuoteCache) -> TestClient:
+        app.state.quote_gateway_service = QuoteGatewayService(
+            quote_cache=cache,
+            rest_client=None,
+            market_open_checker=lambda: True,
+        )
+        return TestClient(app)
+
+    def test_ticks_endpoint_returns_ticks_since(self):
+        cache = QuoteCache(tick_history_depth=8)
+        for ts in (100, 101, 102):
+            cache.upsert(QuoteRecord(symbol="005930", price=float(ts), ts=ts))
+        client = self._client(cache)
+
+        res = client.get("/v1/quotes/005930/ticks", params={"since": 100})
+
+        self.assertEqual(res.status_code, 200)
+        body = res.json()
+        self.assertEqual(body["depth"], 8)
+        self.assertEqual([t["ts"] for t in body["ticks"]], [101, 102])
+
+    def test_ticks_endpoint_unknown_symbol_returns_404(self):
+        client = self._client(QuoteCache(tick_history_depth=8))
+
+        res = client.get("/v1/quotes/005930/ticks")
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_ticks_endpoint_disabled_returns_503(self):
+        client = self._client(QuoteCache())
+
+        res = client.get("/v1/quotes/005930/ticks")
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()["detail"], "TICK_HISTORY_NOT_CONFIGURED")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.integrations.kis_rest import KisRestClient
+from app.integrations.rate_limiter import PRIORITY_ACCOUNT, PRIORITY_ORDER, PRIORITY_QUOTE, RestRateLimiter
+from app.services.quote_cache import QuoteCache
+from app.services.quote_gateway import QuoteGatewayService
+
+
+class _FakeClock:
+    def __init__(self, now: float = 100.0) -> None:
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _limiter(clock: _FakeClock, rate: float = 5.0, burst: float | None = None) -> RestRateLimiter:
+    return RestRateLimiter(rate_per_sec=rate, burst=burst, clock=clock, sleep=clock.sleep)
+
+
+class RestRateLimiterTest(unittest.TestCase):
+    def test_burst_then_paced_at_rate(self):
+        clock = _FakeClock()
+        limiter = _limiter(clock, rate=5.0)
+
+        waits = [limiter.acquire(PRIORITY_ORDER) for _ in range(7)]
+
+        self.assertEqual(waits[:5], [0.0] * 5)
+        self.assertAlmostEqual(waits[5], 0.2)
+        self.assertAlmostEqual(waits[6], 0.2)
+        self.assertEqual(limiter.granted[PRIORITY_ORDER], 7)
+        self.assertEqual(limiter.waited[PRIORITY_ORDER], 2)
+
+    def test_quotes_leave_reserve_for_higher_priorities(self):
+        clock = _FakeClock()
+        limiter = _limiter(clock, rate=5.0)
+
+        granted_quotes = 0
+        while limiter.try_acquire(PRIORITY_QUOTE) == 0.0:
+            granted_quotes += 1
+
+        # 40% of a 5-token bucket stays reserved for account/order calls
+        self.assertEqual(granted_quotes, 3)
+        self.assertEqual(limiter.try_acquire(PRIORITY_ACCOUNT), 0.0)
+        self.assertGreater(limiter.try_acquire(PRIORITY_ACCOUNT), 0.0)
+        self.assertEqual(limiter.try_acquire(PRIORITY_ORDER), 0.0)
+
+    def test_higher_priority_becomes_eligible_first_after_drain(self):
+        clock = _FakeClock()
+        limiter = _limiter(clock, rate=10.0, burst=10.0)
+        while limiter.try_acquire(PRIORITY_ORDER) == 0.0:
+            pass
+
+        order_wait = limiter.try_acquire(PRIORITY_ORDER)
+        account_wait = limiter.try_acquire(PRIORITY_ACCOUNT)
+        quote_wait = limiter.try_acquire(PRIORITY_QUOTE)
+
+        self.assertLess(order_wait, account_wait)
+        self.assertLess(account_wait, quote_wait)
+        self.assertAlmostEqual(quote_wait, 0.5)
+
+    def test_refill_is_capped_at_burst(self):
+        clock = _FakeClock()
+        limiter = _limiter(clock, rate=5.0)
+        limiter.acquire(PRIORITY_ORDER)
+        clock.now += 60.0
+
+        self.assertEqual(limiter.tokens(), 5.0)
+
+
+class KisRestClientPacingTest(unittest.TestCase):
+    def _client(self, limiter):
+        session = MagicMock()
+        session.post.return_value.json.return_value = {"access_token": "token", "expires_in": 86400}
+        session.get.return_value.json.return_value = {"rt_cd": "0", "output": {}, "output1": []}
+        session.post.return_value.raise_for_status.return_value = None
+        return KisRestClient(app_key="k", app_secret="s", env="mock", session=session, rate_limiter=limiter)
+
+    def test_calls_are_paced_with_their_priority_class(self):
+        limiter = MagicMock()
+        client = self._client(limiter)
+
+        client.get_quote("005930")
+        client.get_positions("12345678-01")
+        client.place_order("12345678-01", "005930", "BUY", 1, 70000.0)
+
+        self.assertEqual(
+            [c.args[0] for c in limiter.acquire.call_args_list],
+            [PRIORITY_QUOTE, PRIORITY_ACCOUNT, PRIORITY_ORDER],
+        )
+
+    def test_gateway_skips_random_jitter_when_client_is_paced(self):
+        clock = _FakeClock()
+        client = self._client(_limiter(clock))
+        service = QuoteGatewayService(
+            quote_cache=QuoteCache(),
+            rest_client=client,
+            market_open_checker=lambda: False,
+            symbol_delay_min_sec=5.0,
+            symbol_delay_max_sec=5.0,
+        )
+
+        quotes, meta = service.get_quotes(["005930", "000660", "035420"])
+
+        self.assertEqual(meta.missing_count, 0)
+        self.assertEqual(clock.sleeps, [])
+        self.assertEqual(client.rate_limiter.granted[PRIORITY_QUOTE], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,3 +18,15 @@ class RuntimePortfolioBindingTest(unittest.TestCase):
         self.assertIsInstance(app.state.quote_gateway_service.rest_client, KisRestClient)
         self.assertTrue(hasattr(app.state.quote_gateway_service.rest_client, "get_balances"))
         self.assertTrue(hasattr(app.state.quote_gateway_service.rest_client, "get_positions"))
+
+    def test_bind_runtime_clients_shares_one_http_session(self):
+        settings = SimpleNamespace(KIS_APP_KEY="dummy-key", KIS_APP_SECRET="dummy-secret", KIS_ENV="mock")
+        original_approval_client = app.state.ws_client._approval_key_client
+        app.state.ws_client._approval_key_client = None
+        self.addCleanup(setattr, app.state.ws_client, "_approval_key_client", original_approval_client)
+
+        _bind_runtime_clients(app, settings)
+
+        rest_session = app.state.quote_gateway_service.rest_client.session
+        self.assertIs(app.state.ws_client._approval_key_client.session, rest_session)
+        self.assertIs(app.state.kis_http_session, rest_session)
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import threading
+import unittest
+
+from fastapi.testclient import TestClient
+
+from app.integrations.kis_ws import KisWsClient
+from app.integrations.kis_ws_async import AsyncKisWsClient
+from app.main import app
+
+
+class _BlockingWebSocketApp:
+    def __init__(self, url, *, on_open=None, on_message=None, on_error=None, on_close=None):
+        self.on_open = on_open
+        self.on_message = on_message
+        self.on_close = on_close
+        self.sent_messages = []
+        self._closed = threading.Event()
+
+    def send(self, payload):
+        self.sent_messages.append(json.loads(payload))
+
+    def run_forever(self):
+        self.on_open(self)
+        self._closed.wait(timeout=5)
+        self.on_close(self, 1000, "bye")
+
+    def close(self):
+        self._closed.set()
+
+
+def _ack(symbol: str, rt_cd: str = "0") -> str:
+    return json.dumps(
+        {
+            "header": {"tr_id": "H0STCNT0", "tr_key": symbol, "encrypt": "N"},
+            "body": {"rt_cd": rt_cd, "msg_cd": "OPSP0000", "msg1": "SUBSCRIBE SUCCESS"},
+        }
+    )
+
+
+def _registrations(ws_app) -> list[tuple[str, str]]:
+    return [(m["header"]["tr_type"], m["body"]["input"]["tr_key"]) for m in ws_app.sent_messages]
+
+
+class _LiveConnection:
+    """Runs connect_and_subscribe on a thread and hands back the fake socket once open."""
+
+    def __init__(self, client: KisWsClient, symbols: list[str]) -> None:
+        self.apps = []
+        client._websocket_app_factory = self._factory
+        self._opened = threading.Event()
+        self.thread = threading.Thread(target=client.connect_and_subscribe, args=(symbols,), daemon=True)
+
+    def _factory(self, *args, **kwargs):
+        ws_app = _BlockingWebSocketApp(*args, **kwargs)
+        original_on_open = ws_app.on_open
+
+        def _on_open(ws):
+            original_on_open(ws)
+            self._opened.set()
+
+        ws_app.on_open = _on_open
+        self.apps.append(ws_app)
+        return ws_app
+
+    def __enter__(self):
+        self.thread.start()
+        assert self._opened.wait(timeout=2), "fake socket did not open"
+        return self.apps[-1]
+
+    def __exit__(self, *exc):
+        self.apps[-1].close()
+        self.thread.join(timeout=2)
+
+
+class KisWsRuntimeSubscriptionTest(unittest.TestCase):
+    def test_subscribe_and_unsubscribe_over_live_socket_record_ack_latency(self):
+        client = KisWsClient(approval_key="approval")
+
+        with _LiveConnection(client, ["005930"]) as ws_app:
+            self.assertTrue(client.subscribe("000660"))
+            ws_app.on_message(ws_app, _ack("000660"))
+            self.assertTrue(client.unsubscribe("005930"))
+
+            self.assertEqual(_registrations(ws_app), [("1", "005930"), ("1", "000660"), ("2", "005930")])
+
+        metrics = client.metrics()
+        self.assertEqual(client.active_symbols(), ["000660"])
+        self.assertEqual(metrics["ws_subscriptions_active"], 1)
+        self.assertIsNotNone(metrics["ws_subscribe_ack_last_ms"])
+        self.assertGreaterEqual(metrics["ws_subscribe_ack_p50_ms"], 0.0)
+        # initial 005930 ACK never came, the release frame reused its pending slot
+        self.assertEqual(metrics["ws_subscribe_ack_pending"], 1)
+
+    def test_runtime_changes_are_replayed_on_reconnect(self):
+        client = KisWsClient(approval_key="approval")
+        with _LiveConnection(client, ["005930", "035420"]):
+            client.subscribe("000660")
+            client.unsubscribe("035420")
+        self.assertFalse(client.connected)
+
+        # offline changes are recorded and only go out on the next open
+        self.assertFalse(client.subscribe("051910"))
+        with _LiveConnection(client, ["005930", "035420"]) as ws_app:
+            replayed = _registrations(ws_app)
+
+        self.assertEqual(replayed, [("1", "005930"), ("1", "000660"), ("1", "051910")])
+
+    def test_rejected_registration_counts_as_nack(self):
+        client = KisWsClient(approval_key="approval")
+        with _LiveConnection(client, ["005930"]) as ws_app:
+            ws_app.on_message(ws_app, _ack("005930", rt_cd="1"))
+
+        self.assertEqual(client.metrics()["ws_subscribe_nacks"], 1)
+
+    def test_async_client_sends_runtime_subscription_on_its_loop(self):
+        sent = []
+
+        class _Conn:
+            def __init__(self):
+                self.closed = asyncio.Event()
+
+            async def send(self, payload):
+                sent.append(json.loads(payload))
+
+            async def close(self):
+                self.closed.set()
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                await self.closed.wait()
+                raise StopAsyncIteration
+
+        conns = []
+        client = AsyncKisWsClient(
+            approval_key="approval",
+            websocket_app_factory=lambda url: conns.append(_Conn()) or conns[-1],
+        )
+
+        async def scenario():
+            task = asyncio.create_task(client.connect_and_subscribe(["005930"]))
+            while not client.connected:
+                await asyncio.sleep(0)
+            # from another thread, as a sync route handler would call it
+            await asyncio.to_thread(client.subscribe, "000660")
+            while len(sent) < 2:
+                await asyncio.sleep(0)
+            await conns[0].close()
+            await task
+
+        asyncio.run(scenario())
+
+        self.assertEqual(
+            [(m["header"]["tr_type"], m["body"]["input"]["tr_key"]) for m in sent],
+            [("1", "005930"), ("1", "000660")],
+        )
+
+
+class SubscriptionRoutesTest(unittest.TestCase):
+    def setUp(self):
+        self._original_ws_client = app.state.ws_client
+        app.state.ws_client = KisWsClient(approval_key="approval")
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.state.ws_client = self._original_ws_client
+
+    def test_post_and_delete_subscription(self):
+        res = self.client.post("/v1/subscriptions/005930")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {"symbol": "005930", "active": True, "sent": False, "active_count": 1})
+
+        self.assertEqual(self.client.get("/v1/subscriptions").json(), {"symbols": ["005930"]})
+
+        res = self.client.delete("/v1/subscriptions/005930")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["active_count"], 0)
+
+    def test_invalid_symbol_and_unknown_delete(self):
+        self.assertEqual(self.client.post("/v1/subscriptions/KR5930").json()["detail"], "INVALID_SYMBOL")
+        res = self.client.delete("/v1/subscriptions/005930")
+        self.assertEqual(res.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()